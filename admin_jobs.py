@@ -0,0 +1,397 @@
+"""
+Background Job Runner for Miraikakaku admin endpoints
+Long-running /admin tasks are enqueued into a Postgres table and executed by
+worker threads (or a standalone worker process), so HTTP requests return
+immediately with a job id instead of running into Cloud Run request timeouts.
+
+Queue: admin_jobs, claimed with FOR UPDATE SKIP LOCKED (no extra services).
+Status: queued -> running -> succeeded | failed
+Progress, partial results and errors are readable via GET /admin/jobs/{id}.
+
+A claimed job is leased to (worker, attempts). A heartbeat thread keeps the
+lease alive while the handler runs (even if it reports no progress), and
+progress/finish only write while the lease is still held, so a worker whose job
+was requeued after a heartbeat timeout cannot overwrite the rerun's status.
+
+Workers run inside the API process (ADMIN_JOB_WORKERS threads, started on
+startup); on Cloud Run that needs CPU always allocated. Alternatively set
+ADMIN_JOB_WORKERS=0 and run `python admin_jobs.py` as a separate worker.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+from psycopg2.extras import Json, RealDictCursor
+
+from db_pool import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ADMIN_JOB_WORKERS = int(os.getenv("ADMIN_JOB_WORKERS", 1))
+ADMIN_JOB_POLL_INTERVAL = float(os.getenv("ADMIN_JOB_POLL_INTERVAL", 2))
+# running のまま heartbeat がこの秒数途絶えたジョブは、インスタンス停止とみなして再実行
+ADMIN_JOB_STALE_SECONDS = float(os.getenv("ADMIN_JOB_STALE_SECONDS", 900))
+ADMIN_JOB_MAX_ATTEMPTS = int(os.getenv("ADMIN_JOB_MAX_ATTEMPTS", 2))
+# ハンドラ実行中に heartbeat_at を更新する間隔（ADMIN_JOB_STALE_SECONDS より十分短く）
+ADMIN_JOB_HEARTBEAT_INTERVAL = float(os.getenv("ADMIN_JOB_HEARTBEAT_INTERVAL", 30))
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+JOB_SUMMARY_COLUMNS = """
+    id, kind, params, status, progress_done, progress_total, progress_message,
+    error, attempts, worker, created_at, started_at, heartbeat_at, finished_at
+"""
+JOB_COLUMNS = JOB_SUMMARY_COLUMNS + ", partial_results, result"
+
+_handlers: Dict[str, Callable[[Dict[str, Any], "JobContext"], Any]] = {}
+
+
+def job_handler(kind: str):
+    """Register fn(params, job) as the handler for jobs of this kind"""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+class JobLeaseLost(Exception):
+    """The job was requeued or finished by someone else; this worker must stop"""
+
+
+class JobQueue:
+    """Postgres-backed job queue"""
+
+    def __init__(
+        self,
+        connect: Callable = get_db_connection,
+        stale_after: float = ADMIN_JOB_STALE_SECONDS,
+        max_attempts: int = ADMIN_JOB_MAX_ATTEMPTS,
+    ):
+        self._connect = connect
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def _execute(self, sql: str, params=None, fetch: str = None):
+        self.ensure_schema()
+        conn = self._connect()
+        try:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(sql, params)
+            rows = cur.fetchall() if fetch == "all" else cur.fetchone() if fetch == "one" else None
+            conn.commit()
+            cur.close()
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def ensure_schema(self):
+        if self._schema_ready:
+            return
+        with self._lock:
+            if self._schema_ready:
+                return
+            conn = self._connect()
+            try:
+                cur = conn.cursor()
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS admin_jobs (
+                        id BIGSERIAL PRIMARY KEY,
+                        kind VARCHAR(100) NOT NULL,
+                        params JSONB NOT NULL DEFAULT '{}'::jsonb,
+                        status VARCHAR(20) NOT NULL DEFAULT 'queued',
+                        progress_done INTEGER NOT NULL DEFAULT 0,
+                        progress_total INTEGER,
+                        progress_message TEXT,
+                        partial_results JSONB NOT NULL DEFAULT '[]'::jsonb,
+                        result JSONB,
+                        error TEXT,
+                        error_traceback TEXT,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        worker VARCHAR(200),
+                        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        started_at TIMESTAMP,
+                        heartbeat_at TIMESTAMP,
+                        finished_at TIMESTAMP
+                    )
+                """)
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_admin_jobs_queued
+                    ON admin_jobs (id) WHERE status = 'queued'
+                """)
+                conn.commit()
+                cur.close()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            self._schema_ready = True
+
+    # ---------------------------------------------------------------- client
+
+    def enqueue(self, kind: str, params: Optional[Dict[str, Any]] = None) -> int:
+        if kind not in _handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        row = self._execute(
+            "INSERT INTO admin_jobs (kind, params) VALUES (%s, %s) RETURNING id",
+            (kind, Json(params or {}, dumps=_dumps)),
+            fetch="one",
+        )
+        return row["id"]
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        row = self._execute(
+            f"SELECT {JOB_COLUMNS} FROM admin_jobs WHERE id = %s", (job_id,), fetch="one"
+        )
+        return dict(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        rows = self._execute(f"""
+            SELECT {JOB_SUMMARY_COLUMNS}
+            FROM admin_jobs
+            WHERE %(status)s::text IS NULL OR status = %(status)s
+            ORDER BY id DESC
+            LIMIT %(limit)s
+        """, {"status": status, "limit": limit}, fetch="all")
+        return [dict(r) for r in rows]
+
+    # ---------------------------------------------------------------- worker
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job (stale running jobs are requeued or failed first)"""
+        self._execute("""
+            UPDATE admin_jobs
+            SET status = CASE WHEN attempts < %s THEN 'queued' ELSE 'failed' END,
+                error = CASE WHEN attempts < %s THEN error
+                             ELSE 'worker stopped responding (heartbeat timeout)' END,
+                finished_at = CASE WHEN attempts < %s THEN NULL ELSE CURRENT_TIMESTAMP END
+            WHERE status = 'running'
+              AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+        """, (self.max_attempts, self.max_attempts, self.max_attempts, self.stale_after))
+        row = self._execute(f"""
+            UPDATE admin_jobs
+            SET status = 'running',
+                attempts = attempts + 1,
+                worker = %s,
+                progress_done = 0,
+                partial_results = '[]'::jsonb,
+                started_at = CURRENT_TIMESTAMP,
+                heartbeat_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM admin_jobs
+                WHERE status = 'queued'
+                ORDER BY id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING {JOB_COLUMNS}
+        """, (worker,), fetch="one")
+        return dict(row) if row else None
+
+    # progress / heartbeat / finish は (worker, attempts) のリースを持つ実行だけが書ける
+    _LEASE = "id = %(id)s AND worker = %(worker)s AND attempts = %(attempts)s AND status = 'running'"
+
+    def progress(self, job_id: int, done: int, total: Optional[int], message: Optional[str],
+                 results: Optional[List[Any]] = None, *, worker: str, attempts: int) -> bool:
+        """Record progress and heartbeat; False if the lease was lost"""
+        row = self._execute(f"""
+            UPDATE admin_jobs
+            SET progress_done = %(done)s,
+                progress_total = COALESCE(%(total)s, progress_total),
+                progress_message = COALESCE(%(message)s, progress_message),
+                partial_results = partial_results || %(results)s::jsonb,
+                heartbeat_at = CURRENT_TIMESTAMP
+            WHERE {self._LEASE}
+            RETURNING id
+        """, {"done": done, "total": total, "message": message, "results": _dumps(results or []),
+              "id": job_id, "worker": worker, "attempts": attempts}, fetch="one")
+        return row is not None
+
+    def heartbeat(self, job_id: int, *, worker: str, attempts: int) -> bool:
+        """Extend the lease; False if the lease was lost"""
+        row = self._execute(f"""
+            UPDATE admin_jobs
+            SET heartbeat_at = CURRENT_TIMESTAMP
+            WHERE {self._LEASE}
+            RETURNING id
+        """, {"id": job_id, "worker": worker, "attempts": attempts}, fetch="one")
+        return row is not None
+
+    def finish(self, job_id: int, result: Any = None, error: Optional[str] = None,
+               error_traceback: Optional[str] = None, *, worker: str, attempts: int) -> bool:
+        """Record the outcome; False (nothing written) if the lease was lost"""
+        row = self._execute(f"""
+            UPDATE admin_jobs
+            SET status = %(status)s,
+                result = %(result)s,
+                error = %(error)s,
+                error_traceback = %(traceback)s,
+                heartbeat_at = CURRENT_TIMESTAMP,
+                finished_at = CURRENT_TIMESTAMP
+            WHERE {self._LEASE}
+            RETURNING id
+        """, {
+            "status": "failed" if error else "succeeded",
+            "result": None if result is None else Json(result, dumps=_dumps),
+            "error": error, "traceback": error_traceback,
+            "id": job_id, "worker": worker, "attempts": attempts,
+        }, fetch="one")
+        return row is not None
+
+
+class JobContext:
+    """Handed to job handlers for progress reporting"""
+
+    def __init__(self, queue: JobQueue, job: Dict[str, Any]):
+        self.queue = queue
+        self.job_id = job["id"]
+        self.lease = {"worker": job["worker"], "attempts": job["attempts"]}
+        self.params = job.get("params") or {}
+        self.done = 0
+        self.total: Optional[int] = None
+        self.lease_lost = threading.Event()
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None,
+                 result: Any = None):
+        """
+        Record progress (also a heartbeat); result is appended to partial_results
+        Raises JobLeaseLost once the job has been requeued, so the handler stops
+        """
+        if self.lease_lost.is_set():
+            raise JobLeaseLost(self.job_id)
+        self.done = done
+        if total is not None:
+            self.total = total
+        if not self.queue.progress(self.job_id, done, total, message,
+                                   None if result is None else [result], **self.lease):
+            self.lease_lost.set()
+            raise JobLeaseLost(self.job_id)
+
+
+class _Heartbeat:
+    """Keeps a running job's lease alive while its handler executes"""
+
+    def __init__(self, context: JobContext, interval: float):
+        self.context = context
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"admin-job-heartbeat-{context.job_id}",
+                                        daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        context = self.context
+        while not self._stop.wait(self.interval):
+            try:
+                alive = context.queue.heartbeat(context.job_id, **context.lease)
+            except Exception as e:
+                # 一時的な DB エラーは次の間隔で再試行（途絶が続けば stale 扱い）
+                logger.warning("Admin job %s heartbeat failed: %s", context.job_id, e)
+                continue
+            if not alive:
+                context.lease_lost.set()
+                return
+
+
+def run_job(queue: JobQueue, job: Dict[str, Any],
+            heartbeat_interval: float = ADMIN_JOB_HEARTBEAT_INTERVAL) -> bool:
+    """Execute one claimed job and record its outcome; returns True on success"""
+    context = JobContext(queue, job)
+    handler = _handlers.get(job["kind"])
+    if handler is None:
+        queue.finish(job["id"], error=f"Unknown job kind: {job['kind']}", **context.lease)
+        return False
+    try:
+        with _Heartbeat(context, heartbeat_interval):
+            result = handler(context.params, context)
+    except JobLeaseLost:
+        logger.warning("Admin job %s (%s) was requeued; abandoning attempt %s",
+                       job["id"], job["kind"], job["attempts"])
+        return False
+    except Exception as e:
+        logger.exception("Admin job %s (%s) failed", job["id"], job["kind"])
+        queue.finish(job["id"], error=f"{type(e).__name__}: {e}",
+                     error_traceback=traceback.format_exc(), **context.lease)
+        return False
+    if not queue.finish(job["id"], result=result, **context.lease):
+        logger.warning("Admin job %s (%s) attempt %s finished after losing its lease; result discarded",
+                       job["id"], job["kind"], job["attempts"])
+        return False
+    return True
+
+
+class JobWorker:
+    """Polls the queue from background threads"""
+
+    def __init__(self, queue: JobQueue, threads: int = ADMIN_JOB_WORKERS,
+                 poll_interval: float = ADMIN_JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        if self._threads or self.threads < 1:
+            return
+        self._stop.clear()
+        for i in range(self.threads):
+            name = f"{socket.gethostname()}:{os.getpid()}:{i}"
+            thread = threading.Thread(target=self.run, args=(name,), name=f"admin-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run(self, name: str):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(name)
+            except Exception as e:
+                logger.warning("Admin job claim failed: %s", e)
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            run_job(self.queue, job)
+
+
+job_queue = JobQueue()
+job_worker = JobWorker(job_queue)
+
+
+if __name__ == "__main__":
+    # 単体ワーカー: API 側は ADMIN_JOB_WORKERS=0 にしてこのプロセスで実行
+    # （ハンドラは api_predictions が import した admin_jobs モジュール側に登録される）
+    logging.basicConfig(level=logging.INFO)
+    import api_predictions  # noqa: F401
+    import admin_jobs
+
+    admin_jobs.job_worker.run(f"{socket.gethostname()}:{os.getpid()}:main")
@@ -8,22 +8,13 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
-import psycopg2
 from psycopg2.extras import RealDictCursor
+from db_pool import get_db_connection
 from auth_utils import get_current_active_user
 import os
 
 router = APIRouter(prefix="/api/alerts", tags=["alerts"])
 
-def get_db_connection():
-    return psycopg2.connect(
-        host=os.getenv("POSTGRES_HOST", "localhost"),
-        port=os.getenv("POSTGRES_PORT", 5433),
-        user=os.getenv("POSTGRES_USER", "postgres"),
-        password=os.getenv("POSTGRES_PASSWORD", "Miraikakaku2024!"),
-        database=os.getenv("POSTGRES_DB", "miraikakaku"),
-    )
-
 # Enums
 class AlertType(str, Enum):
     PRICE_ABOVE = "price_above"
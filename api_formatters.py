@@ -0,0 +1,109 @@
+"""
+Response Formatters for Miraikakaku API
+Row -> JSON dict conversion shared by the sync (psycopg2) and async (asyncpg) endpoints
+"""
+
+from typing import Dict, Iterable, List, Mapping
+
+
+def format_home_stats(stats: Mapping) -> Dict:
+    return {
+        "totalSymbols": int(stats['total_symbols']),
+        "activeSymbols": int(stats['active_symbols']),
+        "activePredictions": int(stats['symbols_with_future_predictions']),
+        "totalPredictions": int(stats['symbols_with_predictions']),
+        "avgAccuracy": float(stats['avg_accuracy']),
+        "modelsRunning": int(stats['models_running'])
+    }
+
+
+def format_change_ranking(row: Mapping) -> Dict:
+    """値上がり/値下がり率ランキング"""
+    return {
+        "symbol": row['symbol'],
+        "name": row['company_name'] or row['symbol'],
+        "exchange": row['exchange'] or '',
+        "sector": row.get('sector'),
+        "price": float(row['current_price']),
+        "change": float(row['change_percent'])
+    }
+
+
+def format_volume_ranking(row: Mapping) -> Dict:
+    return {
+        "symbol": row['symbol'],
+        "name": row['company_name'] or row['symbol'],
+        "exchange": row['exchange'] or '',
+        "sector": row.get('sector'),
+        "price": float(row['price']),
+        "volume": int(row['volume'])
+    }
+
+
+def format_prediction_ranking(row: Mapping) -> Dict:
+    return {
+        "symbol": row['symbol'],
+        "name": row['company_name'] or row['symbol'],
+        "exchange": row['exchange'] or '',
+        "sector": row.get('sector'),
+        "currentPrice": float(row['current_price']),
+        "predictedPrice": float(row['ensemble_prediction']),
+        "confidence": float(row['ensemble_confidence']),
+        "predictedChange": float(row['predicted_change'])
+    }
+
+
+def format_stock_details(result: Mapping) -> Dict:
+    return {
+        "symbol": result['symbol'],
+        "companyName": result['company_name'] or result['symbol'],
+        "exchange": result['exchange'] or '',
+        "currentPrice": float(result['current_price']) if result['current_price'] else None,
+        "openPrice": float(result['open_price']) if result['open_price'] else None,
+        "highPrice": float(result['high_price']) if result['high_price'] else None,
+        "lowPrice": float(result['low_price']) if result['low_price'] else None,
+        "volume": int(result['current_volume']) if result['current_volume'] else 0,
+        "predictedPrice": float(result['ensemble_prediction']) if result['ensemble_prediction'] else None,
+        "confidence": float(result['ensemble_confidence']) if result['ensemble_confidence'] else None,
+        "predictedChange": float(result['predicted_change']) if result['predicted_change'] else None,
+        "lastUpdated": result['last_updated'].isoformat() if result['last_updated'] else None
+    }
+
+
+def format_price_row(row: Mapping) -> Dict:
+    return {
+        "date": str(row['date']),
+        "open_price": float(row['open_price']) if row['open_price'] else None,
+        "high_price": float(row['high_price']) if row['high_price'] else None,
+        "low_price": float(row['low_price']) if row['low_price'] else None,
+        "close_price": float(row['close_price']) if row['close_price'] else None,
+        "volume": int(row['volume']) if row['volume'] else None
+    }
+
+
+PRICE_COLUMNS = ("date", "open_price", "high_price", "low_price", "close_price", "volume")
+
+
+def format_price_columns(rows: Iterable[Mapping]) -> Dict[str, List]:
+    """Parallel arrays per column (same values as format_price_row, without repeated keys)"""
+    columns = {name: [] for name in PRICE_COLUMNS}
+    dates, volumes = columns["date"], columns["volume"]
+    prices = [(columns[name], name) for name in PRICE_COLUMNS[1:5]]
+    for row in rows:
+        dates.append(str(row['date']))
+        for values, name in prices:
+            value = row[name]
+            values.append(float(value) if value else None)
+        volumes.append(int(row['volume']) if row['volume'] else None)
+    return columns
+
+
+def format_prediction_row(row: Mapping) -> Dict:
+    return {
+        "prediction_date": str(row['prediction_date']),
+        "predicted_price": float(row['ensemble_prediction']),
+        "current_price": float(row['current_price']) if row['current_price'] else None,
+        "prediction_days": int(row['prediction_days']) if row['prediction_days'] else None,
+        "confidence_score": float(row['ensemble_confidence']) if row['ensemble_confidence'] else None,
+        "model_type": "ensemble"
+    }
@@ -1,11 +1,31 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from typing import Optional
+from datetime import date
 from psycopg2.extras import RealDictCursor
 import psycopg2
 import os
+import sys
 from dotenv import load_dotenv
+from db_pool import get_db_connection, get_pool
+from api_formatters import format_price_row
+from api_queries import (
+    PRICE_HISTORY_SQL,
+    PredictionPage,
+    StocksBatchRead,
+    check_columnar_format,
+    check_price_rows,
+    home_stats_read,
+    price_columnar_response,
+    price_history_response,
+    ranking_read,
+    stock_details_read,
+)
+from ranking_cache import ranking_cache
+from single_flight import single_flight
+from admin_jobs import JOB_STATUSES, job_handler, job_queue, job_worker
 
 load_dotenv()
 
@@ -19,22 +39,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_db_config():
-    host = os.getenv('POSTGRES_HOST', 'localhost')
-    config = {
-        'database': os.getenv('POSTGRES_DB', 'miraikakaku'),
-        'user': os.getenv('POSTGRES_USER', 'postgres'),
-        'password': os.getenv('POSTGRES_PASSWORD', 'Miraikakaku2024!')
-    }
-    if host.startswith('/cloudsql/'):
-        config['host'] = host
-    else:
-        config['host'] = host
-        config['port'] = int(os.getenv('POSTGRES_PORT', 5433))
-    return config
-
-def get_db_connection():
-    return psycopg2.connect(**get_db_config())
+# DB_MODE=async: asyncpg版の読み取りエンドポイントを同期版より先に登録（先勝ちルーティング）
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+if DB_MODE == "async":
+    from async_endpoints import router as async_read_router
+    app.include_router(async_read_router)
 
 @app.get("/")
 def read_root():
@@ -44,6 +53,77 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
+@app.on_event("startup")
+def warm_db_pool():
+    """起動時にmin_sizeまで接続を確立（失敗してもリクエスト時に再接続）"""
+    try:
+        get_pool().fill()
+    except Exception as e:
+        print(f"⚠️  DB pool warm-up failed: {e}")
+
+@app.on_event("startup")
+def start_admin_job_worker():
+    """/admin の長時間処理を実行するバックグラウンドワーカー（ADMIN_JOB_WORKERS=0 で無効）"""
+    job_worker.start()
+
+@app.on_event("shutdown")
+def close_db_pool():
+    job_worker.stop()
+    get_pool().closeall()
+
+@app.get("/admin/db-pool-stats")
+def get_db_pool_stats():
+    """コネクションプールの統計（管理者用）"""
+    result = {"status": "success", "db_mode": DB_MODE, "pool": get_pool().stats()}
+    if DB_MODE == "async":
+        import db_async
+        result["async_pool"] = db_async.pool_stats()
+    return result
+
+@app.get("/admin/cache-stats")
+def get_cache_stats():
+    """ランキングキャッシュの統計（管理者用）"""
+    return {
+        "status": "success",
+        "ranking_cache": ranking_cache.stats(),
+        "single_flight": single_flight.stats()
+    }
+
+def _enqueue_admin_job(kind: str, params: dict):
+    job_id = job_queue.enqueue(kind, params)
+    return {"status": "queued", "job_id": job_id, "kind": kind, "status_url": f"/admin/jobs/{job_id}"}
+
+def _sentiment_feature_store():
+    """src/ml-models の sentiment_feature_store（日次センチメント特徴量ストア）"""
+    ml_models = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'ml-models')
+    if ml_models not in sys.path:
+        sys.path.insert(0, ml_models)
+    import sentiment_feature_store
+    return sentiment_feature_store
+
+def _refresh_sentiment_features(conn, symbols=None):
+    """ニュース保存後に特徴量ストアのダーティ範囲を再計算（スキーマ未適用ならスキップ）"""
+    try:
+        return _sentiment_feature_store().refresh_dirty(conn, symbols)
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+        return {"skipped": "sentiment feature schema not applied"}
+
+@app.get("/admin/jobs")
+def list_admin_jobs(status: Optional[str] = None, limit: int = 20):
+    """バックグラウンドジョブ一覧（新しい順、部分結果は含まない）"""
+    if status is not None and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(JOB_STATUSES)}")
+    return {"jobs": job_queue.list(status, max(1, min(limit, 100)))}
+
+@app.get("/admin/jobs/{job_id}")
+def get_admin_job(job_id: int):
+    """ジョブの状態・進捗・部分結果・エラー"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
 @app.post("/admin/apply-news-schema")
 def apply_news_schema():
     """ニュースセンチメント分析スキーマを適用（管理者用）"""
@@ -320,22 +400,20 @@ def check_news_data(symbol: str = "AAPL", limit: int = 5):
             "traceback": traceback.format_exc()
         }
 
-@app.post("/admin/collect-news")
-def collect_news_sentiment(limit: int = 3):
-    """ニュース収集とセンチメント分析を実行（管理者用）"""
-    import requests
-    import time
-    from datetime import datetime, timedelta
+@job_handler("collect-news")
+def collect_news_job(params, job):
+    """ニュース収集とセンチメント分析（バックグラウンドジョブ）
 
-    ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY', 'demo')
+    Alpha Vantage の市場フィードを1回取得して全対象銘柄へ振り分け、
+    記事が得られなかった銘柄だけ個別に取得する（news_collector）
+    """
+    import news_collector
 
-    if ALPHA_VANTAGE_API_KEY == 'demo':
-        return {"status": "error", "message": "ALPHA_VANTAGE_API_KEY not configured"}
+    limit = int(params.get('limit', 3))
 
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
-
         # 米国株・日本株を優先的に取得
         cur.execute("""
             SELECT symbol, company_name
@@ -353,114 +431,112 @@ def collect_news_sentiment(limit: int = 3):
                 symbol
             LIMIT %s
         """, ('%.KS', '%.HK', '%.T', '%.%', '%.T', limit))
-        symbols = cur.fetchall()
+        symbols = [(r['symbol'], r['company_name']) for r in cur.fetchall()]
+        cur.close()
 
         if not symbols:
-            return {
-                "status": "error",
-                "message": "No suitable stocks found for news collection (US/Japanese stocks only)"
-            }
+            raise RuntimeError("No suitable stocks found for news collection (US/Japanese stocks only)")
 
+        job.progress(0, len(symbols), "started")
+        names = dict(symbols)
         results = []
-        for symbol_info in symbols:
-            symbol = symbol_info['symbol']
-
-            # Alpha Vantage APIからニュース取得
-            time_from = (datetime.now() - timedelta(days=7)).strftime("%Y%m%dT0000")
-            params = {
-                'function': 'NEWS_SENTIMENT',
-                'tickers': symbol,
-                'time_from': time_from,
-                'limit': 10,
-                'apikey': ALPHA_VANTAGE_API_KEY
-            }
 
-            try:
-                response = requests.get('https://www.alphavantage.co/query', params=params, timeout=30)
-                data = response.json()
-
-                news_saved = 0
-                news_errors = []
-                feed_count = len(data.get('feed', []))
-
-                if 'feed' in data:
-                    for article in data['feed']:
-                        # 銘柄固有のセンチメント抽出
-                        ticker_sentiment = None
-                        if 'ticker_sentiment' in article:
-                            for ts in article['ticker_sentiment']:
-                                if ts.get('ticker') == symbol:
-                                    ticker_sentiment = ts
-                                    break
-
-                        if not ticker_sentiment:
-                            continue
-
-                        # データ挿入
-                        try:
-                            cur.execute("""
-                                INSERT INTO stock_news (
-                                    symbol, title, url, source, published_at,
-                                    summary, sentiment_score, sentiment_label, relevance_score
-                                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                                ON CONFLICT (symbol, url) DO NOTHING
-                            """, (
-                                symbol,
-                                article.get('title', ''),
-                                article.get('url', ''),
-                                article.get('source', 'Unknown'),
-                                datetime.strptime(article['time_published'], '%Y%m%dT%H%M%S'),
-                                article.get('summary', ''),
-                                float(ticker_sentiment.get('ticker_sentiment_score', 0)),
-                                ticker_sentiment.get('ticker_sentiment_label', 'neutral').lower(),
-                                float(ticker_sentiment.get('relevance_score', 0))
-                            ))
-                            news_saved += 1
-                        except Exception as insert_error:
-                            news_errors.append(str(insert_error))
+        def report(done, total, entry):
+            entry = {
+                "symbol": entry['symbol'],
+                "company_name": names.get(entry['symbol']),
+                "news_collected": entry.get('articles', 0),
+                "requested": entry.get('request', False),
+                **({"error": entry['error']} if 'error' in entry else {}),
+            }
+            results.append(entry)
+            job.progress(done, total, entry['symbol'], result=entry)
 
-                    conn.commit()
+        summary = news_collector.collect_news_sync(conn, symbols, ["alphavantage"], progress=report)
+        sentiment_features = _refresh_sentiment_features(conn)
+    finally:
+        conn.close()
 
-                results.append({
-                    "symbol": symbol,
-                    "company_name": symbol_info['company_name'],
-                    "news_collected": news_saved,
-                    "feed_count": feed_count,
-                    "errors": news_errors[:3] if news_errors else []
-                })
+    return {
+        "message": f"News collection completed for {len(symbols)} symbols",
+        "stats": summary["providers"].get("alphavantage"),
+        "sentiment_features": sentiment_features,
+        "results": results
+    }
 
-                # API制限対応
-                time.sleep(12)
+@app.post("/admin/collect-news", status_code=202)
+def collect_news_sentiment(limit: int = 3):
+    """ニュース収集とセンチメント分析をジョブとして登録（管理者用、進捗は /admin/jobs/{id}）"""
+    if os.getenv('ALPHA_VANTAGE_API_KEY', 'demo') == 'demo':
+        raise HTTPException(status_code=400, detail="ALPHA_VANTAGE_API_KEY not configured")
+    return _enqueue_admin_job("collect-news", {"limit": limit})
 
-            except Exception as e:
-                results.append({
-                    "symbol": symbol,
-                    "company_name": symbol_info['company_name'],
-                    "error": str(e)
-                })
+@job_handler("collect-news-concurrent")
+def collect_news_concurrent_job(params, job):
+    """全プロバイダ並行のニュース収集（バックグラウンドジョブ）"""
+    import news_collector
 
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute("""
+            SELECT symbol, company_name
+            FROM stock_master
+            WHERE is_active = TRUE
+            ORDER BY symbol
+            LIMIT %s
+        """, (int(params.get('limit', 50)),))
+        symbols = [(r['symbol'], r['company_name']) for r in cur.fetchall()]
         cur.close()
+
+        def report(done, total, entry):
+            job.progress(done, total, f"{entry['provider']}:{entry['symbol']}", result=entry)
+
+        summary = news_collector.collect_news_sync(conn, symbols, params.get('providers'), progress=report)
+        summary["sentiment_features"] = _refresh_sentiment_features(conn)
+        return summary
+    finally:
         conn.close()
 
-        return {
-            "status": "success",
-            "message": f"News collection completed for {len(symbols)} symbols",
-            "results": results
-        }
+@app.post("/admin/collect-news-concurrent", status_code=202)
+def collect_news_concurrent(limit: int = 50, providers: Optional[str] = None):
+    """Alpha Vantage / Finnhub / NewsAPI / yfinance の並行ニュース収集をジョブとして登録（管理者用）
 
-    except Exception as e:
-        import traceback
-        return {
-            "status": "error",
-            "message": str(e),
-            "traceback": traceback.format_exc()
-        }
+    providers: カンマ区切り（省略時はAPIキーが設定されている全プロバイダ）
+    """
+    import news_collector
+
+    names = [p.strip() for p in providers.split(',') if p.strip()] if providers else None
+    unknown = set(names or []) - set(news_collector.PROVIDERS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown providers: {', '.join(sorted(unknown))}")
+    return _enqueue_admin_job("collect-news-concurrent", {"limit": limit, "providers": names})
+
+@job_handler("refresh-sentiment-features")
+def refresh_sentiment_features_job(params, job):
+    """日次センチメント特徴量ストアのダーティ範囲を再計算（バックグラウンドジョブ）"""
+    conn = get_db_connection()
+    try:
+        return _sentiment_feature_store().refresh_dirty(conn, params.get('symbols'))
+    finally:
+        conn.close()
+
+@app.post("/admin/refresh-sentiment-features", status_code=202)
+def refresh_sentiment_features(symbols: Optional[str] = None):
+    """sentiment_features_daily の再計算をジョブとして登録（管理者用）
+
+    symbols: カンマ区切り（省略時はダーティな全銘柄）
+    """
+    names = [s.strip() for s in symbols.split(',') if s.strip()] if symbols else None
+    return _enqueue_admin_job("refresh-sentiment-features", {"symbols": names})
 
 @app.post("/admin/collect-news-for-symbol")
 def collect_news_for_single_symbol(symbol: str):
     """特定銘柄のニュースを収集（管理者用）"""
     import requests
     from datetime import datetime, timedelta
+    from news_collector import fan_out_feed
+    from news_store import save_news_batch
 
     ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY', 'demo')
 
@@ -491,47 +567,12 @@ def collect_news_for_single_symbol(symbol: str):
         response = requests.get('https://www.alphavantage.co/query', params=params, timeout=30)
         data = response.json()
 
-        news_saved = 0
-        news_errors = []
         feed_count = len(data.get('feed', []))
 
-        if 'feed' in data:
-            for article in data['feed']:
-                # 銘柄固有のセンチメント抽出
-                ticker_sentiment = None
-                if 'ticker_sentiment' in article:
-                    for ts in article['ticker_sentiment']:
-                        if ts.get('ticker') == symbol:
-                            ticker_sentiment = ts
-                            break
-
-                if not ticker_sentiment:
-                    continue
-
-                # データ挿入
-                try:
-                    cur.execute("""
-                        INSERT INTO stock_news (
-                            symbol, title, url, source, published_at,
-                            summary, sentiment_score, sentiment_label, relevance_score
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (symbol, url) DO NOTHING
-                    """, (
-                        symbol,
-                        article.get('title', ''),
-                        article.get('url', ''),
-                        article.get('source', 'Unknown'),
-                        datetime.strptime(article['time_published'], '%Y%m%dT%H%M%S'),
-                        article.get('summary', ''),
-                        float(ticker_sentiment.get('ticker_sentiment_score', 0)),
-                        ticker_sentiment.get('ticker_sentiment_label', 'neutral').lower(),
-                        float(ticker_sentiment.get('relevance_score', 0))
-                    ))
-                    news_saved += 1
-                except Exception as insert_error:
-                    news_errors.append(str(insert_error))
-
-            conn.commit()
+        # 銘柄固有のセンチメントを持つ記事のみ、1回のマージで保存
+        rows = fan_out_feed(data.get('feed', []), [symbol]).get(symbol, [])
+        counts = save_news_batch(conn, rows, update=False)
+        _refresh_sentiment_features(conn, [symbol])
 
         cur.close()
         conn.close()
@@ -540,9 +581,9 @@ def collect_news_for_single_symbol(symbol: str):
             "status": "success",
             "symbol": symbol,
             "company_name": stock['company_name'],
-            "news_collected": news_saved,
-            "feed_count": feed_count,
-            "errors": news_errors[:3] if news_errors else []
+            "news_collected": counts['inserted'],
+            "duplicates": counts['duplicates'],
+            "feed_count": feed_count
         }
 
     except Exception as e:
@@ -627,185 +668,54 @@ def get_model_performance():
     }
 
 
-@app.get("/api/home/stats/summary")
-def get_home_stats():
-    """ホームページ用の統計サマリー（Phase 2最適化版 - マテリアライズドビュー使用）"""
+def _run_read(sql, params=(), one=False):
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
     try:
-        # マテリアライズドビューから直接取得（92.6%高速化）
-        cur.execute("SELECT * FROM mv_stats_summary")
-        stats = cur.fetchone()
-
-        return {
-            "totalSymbols": int(stats['total_symbols']),
-            "activeSymbols": int(stats['active_symbols']),
-            "activePredictions": int(stats['symbols_with_future_predictions']),
-            "totalPredictions": int(stats['symbols_with_predictions']),
-            "avgAccuracy": float(stats['avg_accuracy']),
-            "modelsRunning": int(stats['models_running'])
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        cur.execute(sql, params)
+        return cur.fetchone() if one else cur.fetchall()
     finally:
         cur.close()
         conn.close()
 
+def _cached_read(read, request, response):
+    """キャッシュ → single-flight → DB の順で取得（ETag付き）"""
+    found = read.found
+    if found is None:
+        try:
+            found = single_flight.do(
+                read.flight_key, lambda: read.store(_run_read(read.sql, read.params, read.one)), label=read.label
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    return read.respond(found, request, response)
+
+@app.get("/api/home/stats/summary")
+def get_home_stats(request: Request, response: Response):
+    """ホームページ用の統計サマリー（Phase 2最適化版 - マテリアライズドビュー使用）"""
+    return _cached_read(home_stats_read(), request, response)
+
 @app.get("/api/home/rankings/gainers")
-def get_top_gainers(limit: int = 50):
+def get_top_gainers(request: Request, response: Response, limit: int = 50):
     """値上がり率ランキング（最適化版 - マテリアライズドビュー使用）"""
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    try:
-        # Phase 4-3: マテリアライズドビューから直接取得 + sector追加
-        cur.execute("""
-            SELECT
-                gr.symbol,
-                gr.company_name,
-                gr.exchange,
-                sm.sector,
-                gr.current_price,
-                gr.change_percent
-            FROM mv_gainers_ranking gr
-            LEFT JOIN stock_master sm ON gr.symbol = sm.symbol
-            LIMIT %s
-        """, (limit,))
-
-        results = cur.fetchall()
-        return [
-            {
-                "symbol": row['symbol'],
-                "name": row['company_name'] or row['symbol'],
-                "exchange": row['exchange'] or '',
-                "sector": row.get('sector'),
-                "price": float(row['current_price']),
-                "change": float(row['change_percent'])
-            }
-            for row in results
-        ]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+    return _cached_read(ranking_read("gainers", limit), request, response)
 
 @app.get("/api/home/rankings/losers")
-def get_top_losers(limit: int = 50):
+def get_top_losers(request: Request, response: Response, limit: int = 50):
     """値下がり率ランキング（最適化版 - マテリアライズドビュー使用）"""
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    try:
-        # Phase 4-3: マテリアライズドビューから直接取得 + sector追加
-        cur.execute("""
-            SELECT
-                lr.symbol,
-                lr.company_name,
-                lr.exchange,
-                sm.sector,
-                lr.current_price,
-                lr.change_percent
-            FROM mv_losers_ranking lr
-            LEFT JOIN stock_master sm ON lr.symbol = sm.symbol
-            LIMIT %s
-        """, (limit,))
-
-        results = cur.fetchall()
-        return [
-            {
-                "symbol": row['symbol'],
-                "name": row['company_name'] or row['symbol'],
-                "exchange": row['exchange'] or '',
-                "sector": row.get('sector'),
-                "price": float(row['current_price']),
-                "change": float(row['change_percent'])
-            }
-            for row in results
-        ]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+    return _cached_read(ranking_read("losers", limit), request, response)
 
 @app.get("/api/home/rankings/volume")
-def get_top_volume(limit: int = 50):
+def get_top_volume(request: Request, response: Response, limit: int = 50):
     """出来高ランキング（Phase 2最適化版 - マテリアライズドビュー使用）"""
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    try:
-        # Phase 4-3: マテリアライズドビューから直接取得 + sector追加
-        cur.execute("""
-            SELECT
-                vr.symbol,
-                vr.company_name,
-                vr.exchange,
-                sm.sector,
-                vr.price,
-                vr.volume
-            FROM mv_volume_ranking vr
-            LEFT JOIN stock_master sm ON vr.symbol = sm.symbol
-            LIMIT %s
-        """, (limit,))
-
-        results = cur.fetchall()
-        return [
-            {
-                "symbol": row['symbol'],
-                "name": row['company_name'] or row['symbol'],
-                "exchange": row['exchange'] or '',
-                "sector": row.get('sector'),
-                "price": float(row['price']),
-                "volume": int(row['volume'])
-            }
-            for row in results
-        ]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+    return _cached_read(ranking_read("volume", limit), request, response)
 
 @app.get("/api/home/rankings/predictions")
-def get_top_predictions(limit: int = 50):
+def get_top_predictions(request: Request, response: Response, limit: int = 50):
     """予測精度ランキング（Phase 2最適化版 - マテリアライズドビュー使用）"""
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    try:
-        # Phase 4-3: マテリアライズドビューから直接取得 + sector追加
-        cur.execute("""
-            SELECT
-                pr.symbol,
-                pr.company_name,
-                pr.exchange,
-                sm.sector,
-                pr.current_price,
-                pr.ensemble_prediction,
-                pr.ensemble_confidence,
-                pr.predicted_change
-            FROM mv_predictions_ranking pr
-            LEFT JOIN stock_master sm ON pr.symbol = sm.symbol
-            LIMIT %s
-        """, (limit,))
-
-        results = cur.fetchall()
-        return [
-            {
-                "symbol": row['symbol'],
-                "name": row['company_name'] or row['symbol'],
-                "exchange": row['exchange'] or '',
-                "sector": row.get('sector'),
-                "currentPrice": float(row['current_price']),
-                "predictedPrice": float(row['ensemble_prediction']),
-                "confidence": float(row['ensemble_confidence']),
-                "predictedChange": float(row['predicted_change'])
-            }
-            for row in results
-        ]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+    return _cached_read(ranking_read("predictions", limit), request, response)
 
 
 @app.get("/api/stocks")
@@ -858,6 +768,20 @@ def get_stocks(limit: int = 100, exchange: str = None):
         conn.close()
 
 
+@app.get("/api/stocks/batch")
+def get_stocks_batch(symbols: str, request: Request, response: Response):
+    """複数銘柄の詳細を一括取得（ウォッチリスト・ポートフォリオ用）"""
+    read = StocksBatchRead(symbols)
+    loaded = None
+    if read.misses:
+        try:
+            loaded = single_flight.do(
+                read.flight_key, lambda: read.store(_run_read(read.sql, read.params)), label=read.label
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    return read.respond(loaded, request, response)
+
 @app.get("/api/stocks/{symbol}")
 def get_stock_info(symbol: str):
     """銘柄情報取得"""
@@ -888,17 +812,7 @@ def get_stock_info(symbol: str):
             "symbol": stock['symbol'],
             "company_name": stock['company_name'],
             "exchange": stock['exchange'],
-            "price_history": [
-                {
-                    "date": str(row['date']),
-                    "open_price": float(row['open_price']) if row['open_price'] else None,
-                    "high_price": float(row['high_price']) if row['high_price'] else None,
-                    "low_price": float(row['low_price']) if row['low_price'] else None,
-                    "close_price": float(row['close_price']) if row['close_price'] else None,
-                    "volume": int(row['volume']) if row['volume'] else None
-                }
-                for row in price_history
-            ]
+            "price_history": [format_price_row(row) for row in price_history]
         }
     except HTTPException:
         raise
@@ -909,142 +823,92 @@ def get_stock_info(symbol: str):
         conn.close()
 
 @app.get("/api/stocks/{symbol}/details")
-def get_stock_details(symbol: str):
+def get_stock_details(symbol: str, request: Request, response: Response):
     """銘柄詳細取得（Phase 3-D最適化版 - マテリアライズドビュー使用）"""
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    try:
-        # マテリアライズドビューから直接取得（50%高速化）
-        cur.execute("""
-            SELECT * FROM mv_stock_details
-            WHERE UPPER(symbol) = UPPER(%s)
-        """, (symbol,))
+    return _cached_read(stock_details_read(symbol), request, response)
 
-        result = cur.fetchone()
-        if not result:
-            raise HTTPException(status_code=404, detail="Symbol not found")
-
-        return {
-            "symbol": result['symbol'],
-            "companyName": result['company_name'] or result['symbol'],
-            "exchange": result['exchange'] or '',
-            "currentPrice": float(result['current_price']) if result['current_price'] else None,
-            "openPrice": float(result['open_price']) if result['open_price'] else None,
-            "highPrice": float(result['high_price']) if result['high_price'] else None,
-            "lowPrice": float(result['low_price']) if result['low_price'] else None,
-            "volume": int(result['current_volume']) if result['current_volume'] else 0,
-            "predictedPrice": float(result['ensemble_prediction']) if result['ensemble_prediction'] else None,
-            "confidence": float(result['ensemble_confidence']) if result['ensemble_confidence'] else None,
-            "predictedChange": float(result['predicted_change']) if result['predicted_change'] else None,
-            "lastUpdated": result['last_updated'].isoformat() if result['last_updated'] else None
-        }
+@app.get("/api/stocks/{symbol}/price")
+def get_price_history(symbol: str, days: int = 365):
+    """価格履歴取得"""
+    try:
+        prices = check_price_rows(_run_read(PRICE_HISTORY_SQL, (symbol, days)), symbol)
+        return price_history_response(prices)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
 
-@app.get("/api/stocks/{symbol}/price")
-def get_price_history(symbol: str, days: int = 365):
-    """価格履歴取得"""
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+@app.get("/api/stocks/{symbol}/price/columnar")
+def get_price_history_columnar(symbol: str, days: int = 365, format: str = "json"):
+    """価格履歴取得（列指向: チャート用の並列配列 / Arrow IPC）"""
+    check_columnar_format(format)
     try:
-        cur.execute("""
-            SELECT date, open_price, high_price, low_price, close_price, volume
-            FROM stock_prices
-            WHERE symbol = %s
-            ORDER BY date DESC
-            LIMIT %s
-        """, (symbol, days))
-        prices = cur.fetchall()
-
-        if not prices:
-            raise HTTPException(status_code=404, detail=f"No price data for {symbol}")
-
-        return [
-            {
-                "date": str(row['date']),
-                "open_price": float(row['open_price']) if row['open_price'] else None,
-                "high_price": float(row['high_price']) if row['high_price'] else None,
-                "low_price": float(row['low_price']) if row['low_price'] else None,
-                "close_price": float(row['close_price']) if row['close_price'] else None,
-                "volume": int(row['volume']) if row['volume'] else None
-            }
-            for row in prices
-        ]
+        prices = check_price_rows(_run_read(PRICE_HISTORY_SQL, (symbol, days)), symbol)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return price_columnar_response(symbol, prices, format)
+
+@app.get("/api/stocks/{symbol}/sentiment")
+def get_stock_sentiment(symbol: str, as_of_date: Optional[date] = None):
+    """センチメント特徴量（sentiment_features_daily の主キー検索、既定は最新 = 当日までのニュース）"""
+    store = _sentiment_feature_store()
+    as_of_date = as_of_date or store.latest_as_of()
+    conn = get_db_connection()
+    try:
+        # スキーマ未適用なら stock_news から同じウィンドウで計算される
+        features = store.get_features(conn, symbol, as_of_date)
+        conn.commit()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
     finally:
-        cur.close()
         conn.close()
+    return {
+        "symbol": symbol,
+        "as_of_date": as_of_date.isoformat(),
+        "features": features,
+        "summary": store.sentiment_summary(features),
+    }
 
 @app.get("/api/stocks/{symbol}/predictions")
-def get_stock_predictions(symbol: str, days: int = 365, page: int = 1, limit: int = 1000):
-    """予測データ取得"""
+def get_stock_predictions(symbol: str, request: Request, response: Response,
+                          days: int = 365, page: int = 1, limit: int = 1000,
+                          cursor: Optional[str] = None, count: Optional[str] = None):
+    """予測データ取得
+
+    - page: OFFSETページング（互換用）
+    - cursor: (prediction_date, prediction_days) のキーセットページング。深いページも先頭と同じ速度
+    - count: exact | estimate | none（既定: page指定時estimate、cursor指定時none）
+      estimate はカウンタテーブルの1行参照。ウィンドウ全体の COUNT(*) は exact 指定時のみ
+    """
+    paging = PredictionPage(symbol, days, page, limit, cursor, count)
+
     conn = get_db_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
     try:
-        offset = (page - 1) * limit
-        cur.execute("""
-            SELECT
-                symbol,
-                prediction_date,
-                prediction_days,
-                current_price,
-                lstm_prediction,
-                arima_prediction,
-                ma_prediction,
-                ensemble_prediction,
-                ensemble_confidence
-            FROM ensemble_predictions
-            WHERE symbol = %s
-              AND prediction_date >= CURRENT_DATE - INTERVAL '%s days'
-            ORDER BY prediction_date DESC
-            LIMIT %s OFFSET %s
-        """, (symbol, days, limit, offset))
+        # 変更マーカーだけを先に取得し、変更がなければ本体を読まずに304
+        try:
+            cur.execute(*paging.stats_query)
+            has_stats = paging.use_stats(cur.fetchone())
+        except psycopg2.errors.UndefinedTable:
+            # スキーマ未適用の環境ではウィンドウ集計にフォールバック
+            conn.rollback()
+            has_stats = False
+        if not has_stats:
+            cur.execute(*paging.window_query)
+            paging.use_window(cur.fetchone())
+        not_modified = paging.not_modified(request, response)
+        if not_modified:
+            return not_modified
+
+        cur.execute(*paging.rows_query)
         predictions = cur.fetchall()
-
-        if not predictions:
-            return {
-                "symbol": symbol,
-                "pagination": {"page": page, "limit": limit, "total": 0, "total_pages": 0},
-                "predictions": []
-            }
-
-        # Get total count
-        cur.execute("""
-            SELECT COUNT(*) as total
-            FROM ensemble_predictions
-            WHERE symbol = %s
-              AND prediction_date >= CURRENT_DATE - INTERVAL '%s days'
-        """, (symbol, days))
-        total = cur.fetchone()['total']
-
-        return {
-            "symbol": symbol,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": total,
-                "total_pages": (total + limit - 1) // limit
-            },
-            "predictions": [
-                {
-                    "prediction_date": str(row['prediction_date']),
-                    "predicted_price": float(row['ensemble_prediction']),
-                    "current_price": float(row['current_price']) if row['current_price'] else None,
-                    "prediction_days": int(row['prediction_days']) if row['prediction_days'] else None,
-                    "confidence_score": float(row['ensemble_confidence']) if row['ensemble_confidence'] else None,
-                    "model_type": "ensemble"
-                }
-                for row in predictions
-            ]
-        }
+        counted = None
+        if paging.needs_count(predictions):
+            cur.execute(*paging.count_query)
+            counted = cur.fetchone()['total']
+        return paging.respond(predictions, response, counted)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -1614,29 +1478,32 @@ def collect_jp_news_for_symbol_yfinance(symbol: str):
         }
 
 
-@app.post("/admin/generate-news-enhanced-predictions")
+@job_handler("generate-news-enhanced-predictions")
+def generate_news_enhanced_predictions_job(params, job):
+    """ニュースセンチメント統合予測の一括生成（バックグラウンドジョブ）"""
+    import generate_news_enhanced_predictions
+
+    def report(done, total, symbol, prediction):
+        job.progress(done, total, symbol, result={
+            "symbol": symbol,
+            "status": prediction.get('status'),
+            "message": prediction.get('message'),
+        })
+
+    result = generate_news_enhanced_predictions.generate_batch_predictions(
+        int(params.get('limit', 100)), progress=report
+    )
+    return {
+        "message": "News-enhanced predictions generated",
+        "total_symbols": result['total_symbols'],
+        "successful": result['successful'],
+        "failed": result['failed']
+    }
+
+@app.post("/admin/generate-news-enhanced-predictions", status_code=202)
 def generate_news_enhanced_predictions_endpoint(limit: int = 100):
-    """ニュースセンチメント統合予測を生成（管理者用）"""
-    try:
-        import generate_news_enhanced_predictions
-        
-        result = generate_news_enhanced_predictions.generate_batch_predictions(limit)
-        
-        return {
-            "status": "success",
-            "message": f"News-enhanced predictions generated",
-            "total_symbols": result['total_symbols'],
-            "successful": result['successful'],
-            "failed": result['failed']
-        }
-    
-    except Exception as e:
-        import traceback
-        return {
-            "status": "error",
-            "message": str(e),
-            "traceback": traceback.format_exc()
-        }
+    """ニュースセンチメント統合予測の生成をジョブとして登録（管理者用）"""
+    return _enqueue_admin_job("generate-news-enhanced-predictions", {"limit": limit})
 
 @app.post("/admin/generate-news-prediction-for-symbol")
 def generate_news_prediction_for_symbol(symbol: str):
@@ -1720,41 +1587,44 @@ def collect_news_newsapi_endpoint(symbol: str, company_name: str, days: int = 7)
             "traceback": traceback.format_exc()
         }
 
-@app.post("/admin/collect-news-newsapi-batch")
-def collect_news_newsapi_batch_endpoint(limit: int = 15):
-    """NewsAPI.orgを使用してバッチニュース収集（管理者用）
+@job_handler("collect-news-newsapi-batch")
+def collect_news_newsapi_batch_job(params, job):
+    """NewsAPI.orgを使用したバッチニュース収集（バックグラウンドジョブ）
 
     日本株15銘柄のニュースを一括収集
     NewsAPI.org無料プラン: 100リクエスト/日
     シンボルマッピング済み: 15社
     """
-    try:
-        import newsapi_collector
+    import time
+    import newsapi_collector
 
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+    limit = int(params.get('limit', 15))
 
-        # 日本株銘柄をシンボルマッピング済みのものから取得
-        # newsapi_collector.pyのsymbol_to_enに登録されている銘柄のみ
-        supported_symbols = [
-            '7203.T',  # Toyota
-            '6758.T',  # Sony
-            '9984.T',  # SoftBank
-            '7974.T',  # Nintendo
-            '7267.T',  # Honda
-            '7201.T',  # Nissan
-            '6752.T',  # Panasonic
-            '8306.T',  # MUFG
-            '8316.T',  # SMFG
-            '8411.T',  # Mizuho
-            '6861.T',  # Keyence
-            '9983.T',  # Fast Retailing
-            '8035.T',  # Tokyo Electron
-            '6367.T',  # Daikin
-            '4063.T'   # Shin-Etsu Chemical
-        ]
+    conn = get_db_connection()
+    cur = conn.cursor(cursor_factory=RealDictCursor)
 
-        # 銘柄情報を取得
+    # 日本株銘柄をシンボルマッピング済みのものから取得
+    # newsapi_collector.pyのsymbol_to_enに登録されている銘柄のみ
+    supported_symbols = [
+        '7203.T',  # Toyota
+        '6758.T',  # Sony
+        '9984.T',  # SoftBank
+        '7974.T',  # Nintendo
+        '7267.T',  # Honda
+        '7201.T',  # Nissan
+        '6752.T',  # Panasonic
+        '8306.T',  # MUFG
+        '8316.T',  # SMFG
+        '8411.T',  # Mizuho
+        '6861.T',  # Keyence
+        '9983.T',  # Fast Retailing
+        '8035.T',  # Tokyo Electron
+        '6367.T',  # Daikin
+        '4063.T'   # Shin-Etsu Chemical
+    ]
+
+    # 銘柄情報を取得
+    try:
         placeholders = ','.join(['%s'] * len(supported_symbols))
         cur.execute(f"""
             SELECT symbol, company_name
@@ -1767,63 +1637,56 @@ def collect_news_newsapi_batch_endpoint(limit: int = 15):
 
         symbols = cur.fetchall()
         cur.close()
+    finally:
+        conn.close()
 
-        if not symbols:
-            conn.close()
-            return {
-                "status": "error",
-                "message": "No supported Japanese stocks found"
-            }
-
-        # バッチニュース収集
-        collector = newsapi_collector.NewsAPICollector()
-        results = []
+    if not symbols:
+        raise RuntimeError("No supported Japanese stocks found")
 
-        for symbol_info in symbols:
-            symbol = symbol_info['symbol']
-            company_name = symbol_info['company_name']
+    # バッチニュース収集
+    collector = newsapi_collector.NewsAPICollector()
+    results = []
+    job.progress(0, len(symbols), "started")
 
-            try:
-                result = collector.collect_news_for_symbol(symbol, company_name, days=7)
-                results.append(result)
+    for i, symbol_info in enumerate(symbols, 1):
+        symbol = symbol_info['symbol']
+        company_name = symbol_info['company_name']
 
-                # NewsAPI.org rate limit: 5 requests/second
-                import time
-                time.sleep(0.3)  # 300ms間隔 = 3.3 req/sec
+        try:
+            result = collector.collect_news_for_symbol(symbol, company_name, days=7)
 
-            except Exception as e:
-                results.append({
-                    "symbol": symbol,
-                    "company_name": company_name,
-                    "status": "error",
-                    "message": str(e)
-                })
+            # NewsAPI.org rate limit: 5 requests/second
+            time.sleep(0.3)  # 300ms間隔 = 3.3 req/sec
 
-        conn.close()
+        except Exception as e:
+            result = {
+                "symbol": symbol,
+                "company_name": company_name,
+                "status": "error",
+                "message": str(e)
+            }
+        results.append(result)
+        job.progress(i, message=symbol, result=result)
 
-        # 成功・失敗をカウント
-        successful = [r for r in results if r.get('status') == 'success']
-        failed = [r for r in results if r.get('status') != 'success']
+    # 成功・失敗をカウント
+    successful = [r for r in results if r.get('status') == 'success']
+    failed = [r for r in results if r.get('status') != 'success']
 
-        total_articles = sum(r.get('articles_saved', 0) for r in successful)
+    total_articles = sum(r.get('articles_saved', 0) for r in successful)
 
-        return {
-            "status": "success",
-            "message": f"Batch news collection completed for {len(symbols)} Japanese stocks",
-            "total_symbols": len(symbols),
-            "successful": len(successful),
-            "failed": len(failed),
-            "total_articles_collected": total_articles,
-            "results": results
-        }
+    return {
+        "message": f"Batch news collection completed for {len(symbols)} Japanese stocks",
+        "total_symbols": len(symbols),
+        "successful": len(successful),
+        "failed": len(failed),
+        "total_articles_collected": total_articles,
+        "results": results
+    }
 
-    except Exception as e:
-        import traceback
-        return {
-            "status": "error",
-            "message": str(e),
-            "traceback": traceback.format_exc()
-        }
+@app.post("/admin/collect-news-newsapi-batch", status_code=202)
+def collect_news_newsapi_batch_endpoint(limit: int = 15):
+    """NewsAPI.orgバッチニュース収集をジョブとして登録（管理者用）"""
+    return _enqueue_admin_job("collect-news-newsapi-batch", {"limit": limit})
 
 @app.post("/admin/optimize-rankings-performance")
 def optimize_rankings_performance():
@@ -2093,6 +1956,9 @@ def optimize_rankings_performance():
         cur.close()
         conn.close()
 
+        # ビュー再作成後は既存キャッシュを破棄
+        ranking_cache.invalidate()
+
         return {
             "status": "success",
             "message": "Performance optimization completed",
@@ -2131,9 +1997,13 @@ def refresh_ranking_views():
         cur.close()
         conn.close()
 
+        # リフレッシュ前のスナップショットを破棄
+        generation = ranking_cache.invalidate()
+
         return {
             "status": "success",
-            "message": "Ranking views refreshed successfully"
+            "message": "Ranking views refreshed successfully",
+            "cache_generation": generation
         }
 
     except Exception as e:
@@ -2497,23 +2367,23 @@ def add_sector_industry_columns():
             "traceback": traceback.format_exc()
         }
 
-@app.post("/admin/fetch-sector-data")
-def fetch_sector_data(limit: int = 100):
-    """Phase 4-4: Fetch sector/industry data from yfinance for stocks without data"""
+@job_handler("fetch-sector-data")
+def fetch_sector_data_job(params, job):
+    """Phase 4-4: Fetch sector/industry data from yfinance for stocks without data (background job)"""
     import yfinance as yf
     import time
-    
+
+    limit = int(params.get('limit', 100))
+    conn = get_db_connection()
+    cur = conn.cursor(cursor_factory=RealDictCursor)
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
         # Get total statistics
         cur.execute("""
             SELECT COUNT(*) as total_stocks, COUNT(sector) as stocks_with_sector
             FROM stock_master WHERE is_active = TRUE
         """)
         initial_stats = cur.fetchone()
-        
+
         # Get stocks without sector/industry data
         cur.execute("""
             SELECT symbol, company_name FROM stock_master
@@ -2522,15 +2392,15 @@ def fetch_sector_data(limit: int = 100):
         """, (limit,))
         pending_stocks = cur.fetchall()
         pending_count = len(pending_stocks)
-        
+
         if pending_count == 0:
-            return {"status": "success", "message": "All stocks have sector data"}
-        
+            return {"message": "All stocks have sector data"}
+
         # Process stocks
         updated_count = 0
         failed_count = 0
-        processing_log = []
-        
+        job.progress(0, pending_count, "started")
+
         for i, stock in enumerate(pending_stocks, 1):
             symbol = stock['symbol']
             try:
@@ -2538,54 +2408,226 @@ def fetch_sector_data(limit: int = 100):
                 info = ticker.info
                 sector = info.get('sector', None)
                 industry = info.get('industry', None)
-                
+
                 if sector or industry:
                     update_cur = conn.cursor()
-                    update_cur.execute("UPDATE stock_master SET sector = %s, industry = %s WHERE symbol = %s", 
+                    update_cur.execute("UPDATE stock_master SET sector = %s, industry = %s WHERE symbol = %s",
                                      (sector, industry, symbol))
                     update_cur.close()
                     conn.commit()
                     updated_count += 1
-                    processing_log.append({"symbol": symbol, "status": "success", "sector": sector})
+                    entry = {"symbol": symbol, "status": "success", "sector": sector}
                 else:
                     failed_count += 1
-                    processing_log.append({"symbol": symbol, "status": "no_data"})
-                
+                    entry = {"symbol": symbol, "status": "no_data"}
+
                 if i % 10 == 0:
                     time.sleep(1)
                 else:
                     time.sleep(0.3)
             except Exception as e:
                 failed_count += 1
-                processing_log.append({"symbol": symbol, "status": "error", "message": str(e)})
+                entry = {"symbol": symbol, "status": "error", "message": str(e)}
                 conn.rollback()
-        
+            job.progress(i, message=symbol, result=entry)
+
         # Get final statistics
         cur.execute("""
             SELECT COUNT(*) as total_stocks, COUNT(sector) as stocks_with_sector
             FROM stock_master WHERE is_active = TRUE
         """)
         final_stats = cur.fetchone()
-        
+
         cur.execute("""
             SELECT COUNT(*) as remaining FROM stock_master
             WHERE is_active = TRUE AND sector IS NULL AND industry IS NULL
         """)
         remaining = cur.fetchone()['remaining']
-        
+    finally:
         cur.close()
         conn.close()
-        
+
+    return {
+        "message": f"Processed {pending_count} stocks: {updated_count} updated, {failed_count} failed",
+        "processing": {"processed": pending_count, "updated": updated_count, "failed": failed_count},
+        "statistics": {
+            "before": {"total": int(initial_stats['total_stocks']), "with_sector": int(initial_stats['stocks_with_sector'] or 0)},
+            "after": {"total": int(final_stats['total_stocks']), "with_sector": int(final_stats['stocks_with_sector'] or 0)},
+            "remaining": int(remaining)
+        }
+    }
+
+@app.post("/admin/fetch-sector-data", status_code=202)
+def fetch_sector_data(limit: int = 100):
+    """Phase 4-4: Enqueue the yfinance sector/industry fetch as a background job"""
+    return _enqueue_admin_job("fetch-sector-data", {"limit": limit})
+
+# ============================================
+# Prediction & Feature Store Schema Admin Endpoints
+# ============================================
+
+@app.post("/admin/apply-prediction-stats-schema")
+def apply_prediction_stats_schema():
+    """Apply the ensemble_prediction_stats counter table, triggers and backfill"""
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        schema_path = os.path.join(os.path.dirname(__file__), 'create_prediction_stats_schema.sql')
+
+        if not os.path.exists(schema_path):
+            return {"status": "error", "message": f"Schema file not found: {schema_path}"}
+
+        with open(schema_path, 'r', encoding='utf-8') as f:
+            schema_sql = f.read()
+
+        cur.execute(schema_sql)
+        conn.commit()
+
+        cur.execute("SELECT COUNT(*), COALESCE(SUM(total_rows), 0) FROM ensemble_prediction_stats")
+        symbols, total_rows = cur.fetchone()
+
+        cur.close()
+        conn.close()
+
         return {
             "status": "success",
-            "message": f"Processed {pending_count} stocks: {updated_count} updated, {failed_count} failed",
-            "processing": {"processed": pending_count, "updated": updated_count, "failed": failed_count},
-            "statistics": {
-                "before": {"total": int(initial_stats['total_stocks']), "with_sector": int(initial_stats['stocks_with_sector'] or 0)},
-                "after": {"total": int(final_stats['total_stocks']), "with_sector": int(final_stats['stocks_with_sector'] or 0)},
-                "remaining": int(remaining)
-            },
-            "processing_log": processing_log[:20]
+            "message": "Prediction stats schema applied successfully",
+            "symbols": symbols,
+            "total_rows": int(total_rows)
+        }
+    except Exception as e:
+        import traceback
+        return {"status": "error", "message": str(e), "traceback": traceback.format_exc()}
+
+
+@app.post("/admin/apply-price-change-schema")
+def apply_price_change_schema():
+    """Apply the stock_price_changes markers, triggers and backfill used by incremental prediction runs"""
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        schema_path = os.path.join(os.path.dirname(__file__), 'create_price_change_schema.sql')
+
+        if not os.path.exists(schema_path):
+            return {"status": "error", "message": f"Schema file not found: {schema_path}"}
+
+        with open(schema_path, 'r', encoding='utf-8') as f:
+            schema_sql = f.read()
+
+        cur.execute(schema_sql)
+        conn.commit()
+
+        cur.execute("SELECT COUNT(*) FROM stock_price_changes")
+        symbols = cur.fetchone()[0]
+
+        cur.close()
+        conn.close()
+
+        return {
+            "status": "success",
+            "message": "Price change schema applied successfully",
+            "symbols": symbols
+        }
+    except Exception as e:
+        import traceback
+        return {"status": "error", "message": str(e), "traceback": traceback.format_exc()}
+
+@app.post("/admin/apply-sentiment-feature-schema")
+def apply_sentiment_feature_schema():
+    """Apply the sentiment_features_daily store, its stock_news dirty-range triggers and backfill marks"""
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        schema_path = os.path.join(os.path.dirname(__file__), 'create_sentiment_feature_schema.sql')
+
+        if not os.path.exists(schema_path):
+            return {"status": "error", "message": f"Schema file not found: {schema_path}"}
+
+        with open(schema_path, 'r', encoding='utf-8') as f:
+            schema_sql = f.read()
+
+        cur.execute(schema_sql)
+        conn.commit()
+
+        cur.execute("SELECT COUNT(*) FROM sentiment_feature_dirty")
+        dirty_symbols = cur.fetchone()[0]
+
+        cur.close()
+        conn.close()
+
+        return {
+            "status": "success",
+            "message": "Sentiment feature schema applied; run /admin/refresh-sentiment-features to build rows",
+            "dirty_symbols": dirty_symbols
+        }
+    except Exception as e:
+        import traceback
+        return {"status": "error", "message": str(e), "traceback": traceback.format_exc()}
+
+@app.post("/admin/apply-prediction-run-ledger-schema")
+def apply_prediction_run_ledger_schema():
+    """Apply the prediction_runs / prediction_run_ledger checkpoints and prediction_price_dates used by --only-stale"""
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        schema_path = os.path.join(os.path.dirname(__file__), 'create_prediction_run_ledger_schema.sql')
+
+        if not os.path.exists(schema_path):
+            return {"status": "error", "message": f"Schema file not found: {schema_path}"}
+
+        with open(schema_path, 'r', encoding='utf-8') as f:
+            schema_sql = f.read()
+
+        cur.execute(schema_sql)
+        conn.commit()
+
+        cur.execute("SELECT COUNT(*) FROM prediction_runs")
+        runs = cur.fetchone()[0]
+
+        cur.close()
+        conn.close()
+
+        return {
+            "status": "success",
+            "message": "Prediction run ledger schema applied successfully",
+            "runs": runs
+        }
+    except Exception as e:
+        import traceback
+        return {"status": "error", "message": str(e), "traceback": traceback.format_exc()}
+
+@app.post("/admin/apply-arima-state-schema")
+def apply_arima_state_schema():
+    """Apply the arima_model_state table used to warm-start ARIMA fits in the ensemble job"""
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        schema_path = os.path.join(os.path.dirname(__file__), 'create_arima_state_schema.sql')
+
+        if not os.path.exists(schema_path):
+            return {"status": "error", "message": f"Schema file not found: {schema_path}"}
+
+        with open(schema_path, 'r', encoding='utf-8') as f:
+            schema_sql = f.read()
+
+        cur.execute(schema_sql)
+        conn.commit()
+
+        cur.execute("SELECT COUNT(*) FROM arima_model_state")
+        symbols = cur.fetchone()[0]
+
+        cur.close()
+        conn.close()
+
+        return {
+            "status": "success",
+            "message": "ARIMA state schema applied successfully",
+            "symbols": symbols
         }
     except Exception as e:
         import traceback
@@ -0,0 +1,411 @@
+"""
+Shared Read Queries for Miraikakaku
+Query text and response building for the hot read endpoints, used by both
+api_predictions (psycopg2) and async_endpoints (asyncpg, DB_MODE=async).
+SQL is written once with %s placeholders; asyncpg_sql() numbers them $1..$n.
+The endpoint modules only run the queries and hand the rows back here.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, Response
+
+from api_formatters import (
+    format_home_stats,
+    format_change_ranking,
+    format_volume_ranking,
+    format_prediction_ranking,
+    format_stock_details,
+    format_price_row,
+    format_price_columns,
+    format_prediction_row,
+)
+from ranking_cache import ranking_cache
+from stock_batch import details_key, parse_symbols
+from http_cache import conditional_response, make_etag
+from fast_json import json_response
+from arrow_ipc import ARROW_AVAILABLE, ARROW_MEDIA_TYPE, price_columns_to_ipc
+from prediction_pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    estimate_window_count,
+    next_cursor,
+    resolve_count_mode,
+)
+
+_PLACEHOLDER = re.compile(r"%s")
+
+
+@lru_cache(maxsize=None)
+def asyncpg_sql(sql: str) -> str:
+    """%s プレースホルダを asyncpg の $1..$n に変換"""
+    numbers = iter(range(1, sql.count("%s") + 1))
+    return _PLACEHOLDER.sub(lambda _: f"${next(numbers)}", sql)
+
+
+# マテリアライズドビューから直接取得（92.6%高速化）
+HOME_STATS_SQL = "SELECT * FROM mv_stats_summary"
+
+# Phase 4-3: マテリアライズドビューから直接取得 + sector追加
+GAINERS_RANKING_SQL = """
+    SELECT
+        gr.symbol,
+        gr.company_name,
+        gr.exchange,
+        sm.sector,
+        gr.current_price,
+        gr.change_percent
+    FROM mv_gainers_ranking gr
+    LEFT JOIN stock_master sm ON gr.symbol = sm.symbol
+    LIMIT %s
+"""
+
+LOSERS_RANKING_SQL = """
+    SELECT
+        lr.symbol,
+        lr.company_name,
+        lr.exchange,
+        sm.sector,
+        lr.current_price,
+        lr.change_percent
+    FROM mv_losers_ranking lr
+    LEFT JOIN stock_master sm ON lr.symbol = sm.symbol
+    LIMIT %s
+"""
+
+VOLUME_RANKING_SQL = """
+    SELECT
+        vr.symbol,
+        vr.company_name,
+        vr.exchange,
+        sm.sector,
+        vr.price,
+        vr.volume
+    FROM mv_volume_ranking vr
+    LEFT JOIN stock_master sm ON vr.symbol = sm.symbol
+    LIMIT %s
+"""
+
+PREDICTIONS_RANKING_SQL = """
+    SELECT
+        pr.symbol,
+        pr.company_name,
+        pr.exchange,
+        sm.sector,
+        pr.current_price,
+        pr.ensemble_prediction,
+        pr.ensemble_confidence,
+        pr.predicted_change
+    FROM mv_predictions_ranking pr
+    LEFT JOIN stock_master sm ON pr.symbol = sm.symbol
+    LIMIT %s
+"""
+
+RANKINGS = {
+    "gainers": (GAINERS_RANKING_SQL, format_change_ranking),
+    "losers": (LOSERS_RANKING_SQL, format_change_ranking),
+    "volume": (VOLUME_RANKING_SQL, format_volume_ranking),
+    "predictions": (PREDICTIONS_RANKING_SQL, format_prediction_ranking),
+}
+
+# マテリアライズドビューから直接取得（50%高速化）
+STOCK_DETAILS_SQL = """
+    SELECT * FROM mv_stock_details
+    WHERE UPPER(symbol) = UPPER(%s)
+"""
+
+# 1往復で複数銘柄を取得（symbolのユニークインデックスを使用）
+STOCK_DETAILS_MANY_SQL = """
+    SELECT * FROM mv_stock_details
+    WHERE symbol = ANY(%s::text[])
+"""
+
+PRICE_HISTORY_SQL = """
+    SELECT date, open_price, high_price, low_price, close_price, volume
+    FROM stock_prices
+    WHERE symbol = %s
+    ORDER BY date DESC
+    LIMIT %s
+"""
+
+# ensemble_prediction_stats（カウンタテーブル）があれば1行のポイント参照で済む
+PREDICTION_STATS_SQL = """
+    SELECT CURRENT_DATE AS today, s.total_rows, s.min_prediction_date,
+           s.max_prediction_date, s.last_modified
+    FROM (SELECT 1) AS one
+    LEFT JOIN ensemble_prediction_stats s ON s.symbol = %s
+"""
+
+PREDICTION_WINDOW_META_SQL = """
+    SELECT COUNT(*) as total, MAX(created_at) as last_created, CURRENT_DATE as today
+    FROM ensemble_predictions
+    WHERE symbol = %s
+      AND prediction_date >= CURRENT_DATE - %s::int * INTERVAL '1 day'
+"""
+
+PREDICTION_WINDOW_COUNT_SQL = """
+    SELECT COUNT(*) as total
+    FROM ensemble_predictions
+    WHERE symbol = %s
+      AND prediction_date >= CURRENT_DATE - %s::int * INTERVAL '1 day'
+"""
+
+_PREDICTION_COLUMNS = """
+    SELECT
+        symbol,
+        prediction_date,
+        prediction_days,
+        current_price,
+        lstm_prediction,
+        arima_prediction,
+        ma_prediction,
+        ensemble_prediction,
+        ensemble_confidence
+    FROM ensemble_predictions
+    WHERE symbol = %s
+      AND prediction_date >= CURRENT_DATE - %s::int * INTERVAL '1 day'
+"""
+
+PREDICTIONS_AFTER_SQL = _PREDICTION_COLUMNS + """
+      AND (prediction_date, prediction_days) < (%s::date, %s::int)
+    ORDER BY prediction_date DESC, prediction_days DESC
+    LIMIT %s
+"""
+
+PREDICTIONS_PAGE_SQL = _PREDICTION_COLUMNS + """
+    ORDER BY prediction_date DESC, prediction_days DESC
+    LIMIT %s OFFSET %s
+"""
+
+
+class CachedRead:
+    """
+    ranking_cache に載る読み取り1件分（キャッシュ → single-flight → DB、ETag付き）
+    エンドポイント側は found が None のときだけ sql/params を実行して store() に渡す
+    """
+
+    def __init__(self, key: str, group: str, label: str, sql: str, params: Sequence,
+                 build: Callable[[Any], Any], one: bool, limit: Optional[int] = None):
+        self.key = key
+        self.group = group
+        self.label = label
+        self.sql = sql
+        self.one = one
+        self.limit = limit
+        self._build = build
+        self.found = ranking_cache.lookup(key, limit)
+        self.generation = ranking_cache.generation
+        if limit is None:
+            self.fetch_limit = None
+            self.params = tuple(params)
+            self.flight_key = f"{key}:{self.generation}"
+        else:
+            self.fetch_limit = ranking_cache.fetch_limit(limit)
+            self.params = (self.fetch_limit,)
+            self.flight_key = f"{key}:{self.fetch_limit}:{self.generation}"
+
+    def store(self, rows) -> Tuple[Any, str]:
+        value = self._build(rows)
+        return value, ranking_cache.put(self.key, value, self.generation, self.fetch_limit)
+
+    def respond(self, found: Tuple[Any, str], request: Request, response: Response):
+        value, digest = found
+        if self.limit is None:
+            etag = make_etag(digest)
+        else:
+            value, etag = value[:self.limit], make_etag(digest, self.limit)
+        not_modified = conditional_response(request, response, etag, self.group)
+        return not_modified or value
+
+
+def _stock_details_or_404(row):
+    if not row:
+        raise HTTPException(status_code=404, detail="Symbol not found")
+    return format_stock_details(row)
+
+
+def home_stats_read() -> CachedRead:
+    return CachedRead("stats_summary", "stats", "stats_summary", HOME_STATS_SQL, (),
+                      format_home_stats, one=True)
+
+
+def ranking_read(name: str, limit: int) -> CachedRead:
+    sql, formatter = RANKINGS[name]
+    return CachedRead(name, "rankings", f"rankings:{name}", sql, (),
+                      lambda rows: [formatter(row) for row in rows], one=False, limit=limit)
+
+
+def stock_details_read(symbol: str) -> CachedRead:
+    # last_updated は価格日付のみ（同日中の価格・予測更新を拾えない）ため全項目のダイジェストからETagを作る
+    return CachedRead(details_key(symbol), "details", "details", STOCK_DETAILS_SQL, (symbol,),
+                      _stock_details_or_404, one=True)
+
+
+class StocksBatchRead:
+    """/api/stocks/batch: キャッシュ済みの銘柄を除いた分だけ1クエリで取得"""
+
+    label = "details:batch"
+    sql = STOCK_DETAILS_MANY_SQL
+
+    def __init__(self, symbols: str):
+        try:
+            self.wanted = parse_symbols(symbols)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        self.stocks, self.digests, self.misses = {}, {}, []
+        for symbol in self.wanted:
+            found = ranking_cache.lookup(details_key(symbol))
+            if found is None:
+                self.misses.append(symbol)
+            else:
+                self.stocks[symbol], self.digests[symbol] = found
+        self.generation = ranking_cache.generation
+        self.params = (self.misses,)
+        self.flight_key = f"details:batch:{self.generation}:{','.join(self.misses)}"
+
+    def store(self, rows) -> Dict[str, Tuple[Dict, str]]:
+        loaded = {}
+        for row in rows:
+            symbol, details = row['symbol'].upper(), format_stock_details(row)
+            loaded[symbol] = details, ranking_cache.put(details_key(symbol), details, self.generation)
+        return loaded
+
+    def respond(self, loaded: Optional[Dict[str, Tuple[Dict, str]]], request: Request, response: Response):
+        for symbol, (details, digest) in (loaded or {}).items():
+            self.stocks[symbol], self.digests[symbol] = details, digest
+
+        found_symbols = [s for s in self.wanted if s in self.stocks]
+        missing = [s for s in self.wanted if s not in self.stocks]
+        etag = make_etag(*(self.digests[s] for s in found_symbols), "missing", *missing)
+        not_modified = conditional_response(request, response, etag, "details")
+        if not_modified:
+            return not_modified
+        return json_response({
+            "count": len(found_symbols),
+            "stocks": {s: self.stocks[s] for s in found_symbols},
+            "missing": missing
+        }, response)
+
+
+def check_price_rows(rows, symbol: str):
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"No price data for {symbol}")
+    return rows
+
+
+def check_columnar_format(format: str) -> None:
+    if format not in ("json", "arrow"):
+        raise HTTPException(status_code=400, detail="format must be json or arrow")
+    if format == "arrow" and not ARROW_AVAILABLE:
+        raise HTTPException(status_code=406, detail="Arrow format is not available on this server")
+
+
+def price_history_response(rows):
+    return json_response([format_price_row(row) for row in rows])
+
+
+def price_columnar_response(symbol: str, rows, format: str):
+    columns = format_price_columns(rows)
+    if format == "arrow":
+        return Response(content=price_columns_to_ipc(columns), media_type=ARROW_MEDIA_TYPE)
+    return json_response({"symbol": symbol, "count": len(columns["date"]), "columns": columns})
+
+
+class PredictionPage:
+    """
+    /api/stocks/{symbol}/predictions の1リクエスト分
+    変更マーカー（stats 行 → なければウィンドウ集計）→ ETag/304 → 本体 → 件数 の順に
+    エンドポイント側がクエリを実行して結果を渡す
+    """
+
+    def __init__(self, symbol: str, days: int, page: int, limit: int,
+                 cursor: Optional[str], count: Optional[str]):
+        try:
+            self.count_mode = resolve_count_mode(count, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            self.after = decode_cursor(cursor) if cursor else None
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        self.symbol, self.days, self.page, self.limit, self.cursor = symbol, days, page, limit, cursor
+        self.meta = None
+
+        self.stats_query = (PREDICTION_STATS_SQL, (symbol,))
+        self.window_query = (PREDICTION_WINDOW_META_SQL, (symbol, days))
+        self.count_query = (PREDICTION_WINDOW_COUNT_SQL, (symbol, days))
+        if self.after:
+            self.rows_query = (PREDICTIONS_AFTER_SQL, (symbol, days, self.after[0], self.after[1], limit))
+        else:
+            self.rows_query = (PREDICTIONS_PAGE_SQL, (symbol, days, limit, (page - 1) * limit))
+
+    def use_stats(self, row: Mapping) -> bool:
+        """カウンタテーブルに行があれば採用（False ならウィンドウ集計が必要）"""
+        if row is None or row['last_modified'] is None:
+            return False
+        self.meta = {"today": row['today'], "stats": row, "total": None,
+                     "version": (row['total_rows'], row['last_modified'])}
+        return True
+
+    def use_window(self, row: Mapping) -> None:
+        self.meta = {"today": row['today'], "stats": None, "total": row['total'],
+                     "version": (row['total'], row['last_created'])}
+
+    def not_modified(self, request: Request, response: Response) -> Optional[Response]:
+        """変更マーカーだけで判定し、変更がなければ本体を読まずに304"""
+        etag = make_etag("predictions", self.symbol, self.days, self.page, self.cursor, self.limit,
+                         self.count_mode, self.meta['version'], self.meta['today'])
+        return conditional_response(request, response, etag, "predictions")
+
+    def needs_count(self, rows) -> bool:
+        """ウィンドウ全体の COUNT(*) は count=exact かつ件数が未確定のときだけ"""
+        if not self.after and not rows:
+            return False
+        return self.count_mode == "exact" and self.meta["total"] is None
+
+    def _total(self, counted: Optional[int]) -> Optional[int]:
+        if self.count_mode == "none":
+            return None
+        if self.meta["total"] is not None:
+            return self.meta["total"]
+        if self.count_mode == "estimate":
+            return estimate_window_count(self.meta["stats"], self.meta["today"], self.days)
+        return counted
+
+    def respond(self, rows, response: Response, counted: Optional[int] = None):
+        if self.after:
+            return json_response({
+                "symbol": self.symbol,
+                "pagination": {
+                    "limit": self.limit,
+                    "cursor": self.cursor,
+                    "next_cursor": next_cursor(rows, self.limit),
+                    "total": self._total(counted),
+                    "count_mode": self.count_mode
+                },
+                "predictions": [format_prediction_row(row) for row in rows]
+            }, response)
+
+        if not rows:
+            return json_response({
+                "symbol": self.symbol,
+                "pagination": {"page": self.page, "limit": self.limit, "total": 0, "total_pages": 0,
+                               "next_cursor": None},
+                "predictions": []
+            }, response)
+
+        total = self._total(counted)
+        return json_response({
+            "symbol": self.symbol,
+            "pagination": {
+                "page": self.page,
+                "limit": self.limit,
+                "total": total,
+                "total_pages": (total + self.limit - 1) // self.limit if total is not None else None,
+                "next_cursor": next_cursor(rows, self.limit)
+            },
+            "predictions": [format_prediction_row(row) for row in rows]
+        }, response)
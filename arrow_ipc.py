@@ -0,0 +1,34 @@
+"""
+Apache Arrow IPC Encoding for Miraikakaku
+Optional binary format for the columnar price-history endpoint.
+pyarrow is not a hard dependency: without it, format=arrow answers 406.
+"""
+
+from datetime import date
+from typing import Dict, List
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+ARROW_AVAILABLE = pa is not None
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def price_columns_to_ipc(columns: Dict[str, List]) -> bytes:
+    """Encode format_price_columns() output as an Arrow IPC stream (one record batch)"""
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    batch = pa.record_batch([
+        pa.array([date.fromisoformat(d) for d in columns["date"]], type=pa.date32()),
+        pa.array(columns["open_price"], type=pa.float64()),
+        pa.array(columns["high_price"], type=pa.float64()),
+        pa.array(columns["low_price"], type=pa.float64()),
+        pa.array(columns["close_price"], type=pa.float64()),
+        pa.array(columns["volume"], type=pa.int64()),
+    ], names=list(columns))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,167 @@
+"""
+Async Read Endpoints for Miraikakaku
+asyncpg-backed versions of the hot read APIs, enabled with DB_MODE=async.
+Included before the sync handlers in api_predictions so these routes take precedence.
+Query text and response building are shared with the sync handlers via api_queries.
+"""
+
+from typing import Optional
+
+import asyncpg
+from fastapi import APIRouter, HTTPException, Request, Response
+
+import db_async
+from api_queries import (
+    PRICE_HISTORY_SQL,
+    PredictionPage,
+    StocksBatchRead,
+    asyncpg_sql,
+    check_columnar_format,
+    check_price_rows,
+    home_stats_read,
+    price_columnar_response,
+    price_history_response,
+    ranking_read,
+    stock_details_read,
+)
+from single_flight import single_flight
+
+router = APIRouter(tags=["async-read"])
+
+
+@router.on_event("startup")
+async def open_async_pool():
+    try:
+        await db_async.open_pool()
+    except Exception as e:
+        print(f"⚠️  Async DB pool warm-up failed: {e}")
+
+
+@router.on_event("shutdown")
+async def close_async_pool():
+    await db_async.close_pool()
+
+
+async def _run_read(sql, params=(), one=False):
+    fetch = db_async.fetchrow if one else db_async.fetch
+    return await fetch(asyncpg_sql(sql), *params)
+
+
+async def _cached_read(read, request, response):
+    """キャッシュ → single-flight → DB の順で取得（ETag付き）"""
+    found = read.found
+    if found is None:
+        async def load():
+            return read.store(await _run_read(read.sql, read.params, read.one))
+
+        try:
+            found = await single_flight.do_async(read.flight_key, load, label=read.label)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    return read.respond(found, request, response)
+
+
+@router.get("/api/home/stats/summary")
+async def get_home_stats(request: Request, response: Response):
+    """ホームページ用の統計サマリー（async版）"""
+    return await _cached_read(home_stats_read(), request, response)
+
+
+@router.get("/api/home/rankings/gainers")
+async def get_top_gainers(request: Request, response: Response, limit: int = 50):
+    """値上がり率ランキング（async版）"""
+    return await _cached_read(ranking_read("gainers", limit), request, response)
+
+
+@router.get("/api/home/rankings/losers")
+async def get_top_losers(request: Request, response: Response, limit: int = 50):
+    """値下がり率ランキング（async版）"""
+    return await _cached_read(ranking_read("losers", limit), request, response)
+
+
+@router.get("/api/home/rankings/volume")
+async def get_top_volume(request: Request, response: Response, limit: int = 50):
+    """出来高ランキング（async版）"""
+    return await _cached_read(ranking_read("volume", limit), request, response)
+
+
+@router.get("/api/home/rankings/predictions")
+async def get_top_predictions(request: Request, response: Response, limit: int = 50):
+    """予測精度ランキング（async版）"""
+    return await _cached_read(ranking_read("predictions", limit), request, response)
+
+
+@router.get("/api/stocks/{symbol}/details")
+async def get_stock_details(symbol: str, request: Request, response: Response):
+    """銘柄詳細取得（async版）"""
+    return await _cached_read(stock_details_read(symbol), request, response)
+
+
+@router.get("/api/stocks/batch")
+async def get_stocks_batch(symbols: str, request: Request, response: Response):
+    """複数銘柄の詳細を一括取得（async版）"""
+    read = StocksBatchRead(symbols)
+    loaded = None
+    if read.misses:
+        async def load():
+            return read.store(await _run_read(read.sql, read.params))
+
+        try:
+            loaded = await single_flight.do_async(read.flight_key, load, label=read.label)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    return read.respond(loaded, request, response)
+
+
+@router.get("/api/stocks/{symbol}/price")
+async def get_price_history(symbol: str, days: int = 365):
+    """価格履歴取得（async版）"""
+    try:
+        prices = check_price_rows(await _run_read(PRICE_HISTORY_SQL, (symbol, days)), symbol)
+        return price_history_response(prices)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/api/stocks/{symbol}/price/columnar")
+async def get_price_history_columnar(symbol: str, days: int = 365, format: str = "json"):
+    """価格履歴取得（列指向, async版）"""
+    check_columnar_format(format)
+    try:
+        prices = check_price_rows(await _run_read(PRICE_HISTORY_SQL, (symbol, days)), symbol)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return price_columnar_response(symbol, prices, format)
+
+
+@router.get("/api/stocks/{symbol}/predictions")
+async def get_stock_predictions(symbol: str, request: Request, response: Response,
+                                days: int = 365, page: int = 1, limit: int = 1000,
+                                cursor: Optional[str] = None, count: Optional[str] = None):
+    """予測データ取得（async版）"""
+    paging = PredictionPage(symbol, days, page, limit, cursor, count)
+
+    try:
+        try:
+            has_stats = paging.use_stats(await _run_read(*paging.stats_query, one=True))
+        except asyncpg.exceptions.UndefinedTableError:
+            has_stats = False
+        if not has_stats:
+            paging.use_window(await _run_read(*paging.window_query, one=True))
+        not_modified = paging.not_modified(request, response)
+        if not_modified:
+            return not_modified
+
+        predictions = await _run_read(*paging.rows_query)
+        counted = None
+        if paging.needs_count(predictions):
+            counted = (await _run_read(*paging.count_query, one=True))['total']
+        return paging.respond(predictions, response, counted)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -6,8 +6,8 @@ Provides user registration, login, logout, and token refresh functionality
 from fastapi import APIRouter, HTTPException, status, Depends
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
-import psycopg2
 from psycopg2.extras import RealDictCursor
+from db_pool import get_db_connection
 from datetime import datetime, timedelta
 import os
 
@@ -58,26 +58,6 @@ class UserResponse(BaseModel):
     created_at: datetime
 
 
-# Database connection helper
-def get_db_config():
-    host = os.getenv('POSTGRES_HOST', 'localhost')
-    config = {
-        'database': os.getenv('POSTGRES_DB', 'miraikakaku'),
-        'user': os.getenv('POSTGRES_USER', 'postgres'),
-        'password': os.getenv('POSTGRES_PASSWORD', 'Miraikakaku2024!')
-    }
-    if host.startswith('/cloudsql/'):
-        config['host'] = host
-    else:
-        config['host'] = host
-        config['port'] = int(os.getenv('POSTGRES_PORT', 5433))
-    return config
-
-
-def get_db_connection():
-    return psycopg2.connect(**get_db_config())
-
-
 # Endpoints
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register_user(user: UserRegister):
@@ -0,0 +1,76 @@
+"""
+Async PostgreSQL Access Layer for Miraikakaku
+asyncpg pool used by the async read endpoints (DB_MODE=async)
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Optional
+
+import asyncpg
+
+from db_pool import DB_POOL_ACQUIRE_TIMEOUT, DB_POOL_MAX_IDLE, get_db_config
+
+# Configuration
+ASYNC_DB_POOL_MIN_SIZE = int(os.getenv("ASYNC_DB_POOL_MIN_SIZE", 2))
+ASYNC_DB_POOL_MAX_SIZE = int(os.getenv("ASYNC_DB_POOL_MAX_SIZE", 20))
+ASYNC_DB_COMMAND_TIMEOUT = float(os.getenv("ASYNC_DB_COMMAND_TIMEOUT", 30))
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+
+async def open_pool() -> asyncpg.Pool:
+    """Create the asyncpg pool (called from the app startup event)"""
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await asyncpg.create_pool(
+                min_size=ASYNC_DB_POOL_MIN_SIZE,
+                max_size=ASYNC_DB_POOL_MAX_SIZE,
+                max_inactive_connection_lifetime=DB_POOL_MAX_IDLE,
+                # asyncpg has no max-lifetime option; recycle by query count instead
+                max_queries=int(os.getenv("ASYNC_DB_MAX_QUERIES", 50000)),
+                command_timeout=ASYNC_DB_COMMAND_TIMEOUT,
+                **get_db_config(),
+            )
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def get_pool() -> asyncpg.Pool:
+    return _pool if _pool is not None else await open_pool()
+
+
+async def fetch(query: str, *args) -> List[asyncpg.Record]:
+    pool = await get_pool()
+    async with pool.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT) as conn:
+        return await conn.fetch(query, *args)
+
+
+async def fetchrow(query: str, *args) -> Optional[asyncpg.Record]:
+    pool = await get_pool()
+    async with pool.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT) as conn:
+        return await conn.fetchrow(query, *args)
+
+
+def pool_stats() -> Dict:
+    """asyncpg pool metrics snapshot"""
+    if _pool is None:
+        return {"open": False}
+    size = _pool.get_size()
+    idle = _pool.get_idle_size()
+    return {
+        "open": True,
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+    }
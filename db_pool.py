@@ -0,0 +1,367 @@
+"""
+Shared PostgreSQL Connection Pool for Miraikakaku
+Process-wide pooled connections for api_predictions and all routers
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import psycopg2
+import psycopg2.pool
+from psycopg2 import extensions
+
+
+# Configuration
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", 1800))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", 300))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", 10))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", 30))
+
+
+def get_db_config():
+    host = os.getenv('POSTGRES_HOST', 'localhost')
+    config = {
+        'database': os.getenv('POSTGRES_DB', 'miraikakaku'),
+        'user': os.getenv('POSTGRES_USER', 'postgres'),
+        'password': os.getenv('POSTGRES_PASSWORD', 'Miraikakaku2024!')
+    }
+    if host.startswith('/cloudsql/'):
+        config['host'] = host
+    else:
+        config['host'] = host
+        config['port'] = int(os.getenv('POSTGRES_PORT', 5433))
+    return config
+
+
+class PoolTimeoutError(psycopg2.pool.PoolError):
+    """Raised when no connection becomes available within acquire_timeout"""
+
+
+class PooledConnection:
+    """
+    psycopg2 connection proxy
+
+    Behaves like the underlying connection, except that close() hands the
+    connection back to the pool instead of closing the socket.
+    """
+
+    def __init__(self, pool: "ConnectionPool", conn, created_at: float):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_created_at", created_at)
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get("_conn")
+        if conn is None:
+            raise psycopg2.InterfaceError("connection already closed")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        # conn.autocommit = True などは実コネクションへ委譲
+        if self._conn is None:
+            raise psycopg2.InterfaceError("connection already closed")
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+
+    @property
+    def closed(self) -> int:
+        if self._conn is None:
+            return 1
+        return self._conn.closed
+
+    def close(self):
+        """Return the connection to the pool (idempotent)"""
+        conn = self._conn
+        if conn is None:
+            return
+        object.__setattr__(self, "_conn", None)
+        self._pool._release(conn, self._created_at)
+
+    def __del__(self):
+        # close() を呼ばずに例外で抜けたハンドラでもスロットを回収する
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe PostgreSQL connection pool
+
+    - min_size: connections kept open even when idle
+    - max_size: hard cap on open connections; callers wait beyond it
+    - max_lifetime: connections older than this (seconds) are recycled
+    - max_idle: idle connections above min_size are closed after this
+    - acquire_timeout: maximum wait for a free connection
+    - health_check_interval: idle time after which a connection is pinged
+    """
+
+    def __init__(
+        self,
+        min_size: int = DB_POOL_MIN_SIZE,
+        max_size: int = DB_POOL_MAX_SIZE,
+        max_lifetime: float = DB_POOL_MAX_LIFETIME,
+        max_idle: float = DB_POOL_MAX_IDLE,
+        acquire_timeout: float = DB_POOL_ACQUIRE_TIMEOUT,
+        health_check_interval: float = DB_POOL_HEALTH_CHECK_INTERVAL,
+        connect: Optional[Callable] = None,
+    ):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._connect = connect or (lambda: psycopg2.connect(**get_db_config()))
+
+        self._cond = threading.Condition()
+        # (connection, created_at, last_used) - LIFO で直近に使った接続を優先
+        self._idle: List[Tuple[object, float, float]] = []
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._stats = {
+            "acquired": 0,
+            "released": 0,
+            "created": 0,
+            "recycled": 0,
+            "idle_closed": 0,
+            "broken": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    # ---------------------------------------------------------------- acquire
+
+    def getconn(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Acquire a connection, waiting up to timeout seconds"""
+        start = time.monotonic()
+        deadline = start + (self.acquire_timeout if timeout is None else timeout)
+
+        while True:
+            conn, created_at, last_used = self._checkout(deadline)
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                created_at = time.monotonic()
+                with self._cond:
+                    self._stats["created"] += 1
+            elif not self._check_health(conn, last_used):
+                self._discard(conn, "broken")
+                continue
+
+            waited = time.monotonic() - start
+            with self._cond:
+                self._stats["acquired"] += 1
+                self._stats["wait_time_total"] += waited
+                self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+            return PooledConnection(self, conn, created_at)
+
+    def _checkout(self, deadline: float):
+        """Pop a usable idle connection, or reserve a slot for a new one"""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.pool.PoolError("connection pool is closed")
+
+                now = time.monotonic()
+                self._sweep_idle(now)
+
+                if self._idle:
+                    return self._idle.pop()
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None, None
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.acquire_timeout}s waiting for a "
+                        f"database connection (max_size={self.max_size})"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _sweep_idle(self, now: float):
+        """Close expired idle connections (lock must be held)"""
+        in_use = self._in_use()
+        kept = []
+        for conn, created_at, last_used in self._idle:
+            if conn.closed:
+                reason = "broken"
+            elif now - created_at > self.max_lifetime:
+                reason = "recycled"
+            elif now - last_used > self.max_idle and in_use + len(kept) >= self.min_size:
+                reason = "idle_closed"
+            else:
+                kept.append((conn, created_at, last_used))
+                continue
+            self._close_quietly(conn)
+            self._size -= 1
+            self._stats[reason] += 1
+        self._idle = kept
+
+    def _check_health(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            if not conn.autocommit:
+                conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    # ---------------------------------------------------------------- release
+
+    def _release(self, conn, created_at: float):
+        broken = bool(conn.closed)
+        if not broken:
+            try:
+                status = conn.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    broken = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    # コミットされなかったトランザクションは破棄
+                    conn.rollback()
+                if not broken and conn.autocommit:
+                    conn.autocommit = False
+            except Exception:
+                broken = True
+
+        now = time.monotonic()
+        with self._cond:
+            self._stats["released"] += 1
+            if broken or self._closed or now - created_at > self.max_lifetime:
+                self._close_quietly(conn)
+                self._size -= 1
+                if broken:
+                    self._stats["broken"] += 1
+                elif not self._closed:
+                    self._stats["recycled"] += 1
+            else:
+                self._idle.append((conn, created_at, now))
+            self._cond.notify()
+
+    def _discard(self, conn, reason: str):
+        self._close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            self._stats[reason] += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _in_use(self) -> int:
+        return self._size - len(self._idle)
+
+    # ---------------------------------------------------------------- lifecycle
+
+    def fill(self):
+        """Open connections up to min_size (called at startup)"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            now = time.monotonic()
+            with self._cond:
+                self._stats["created"] += 1
+                self._idle.append((conn, now, now))
+                self._cond.notify()
+
+    def closeall(self):
+        """Close idle connections; in-use ones are closed when released"""
+        with self._cond:
+            self._closed = True
+            for conn, _, _ in self._idle:
+                self._close_quietly(conn)
+            self._size -= len(self._idle)
+            self._idle = []
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        """Pool metrics snapshot"""
+        with self._cond:
+            acquired = self._stats["acquired"]
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use(),
+                "waiting": self._waiting,
+                "acquired": acquired,
+                "released": self._stats["released"],
+                "created": self._stats["created"],
+                "recycled": self._stats["recycled"],
+                "idle_closed": self._stats["idle_closed"],
+                "broken": self._stats["broken"],
+                "acquire_timeouts": self._stats["timeouts"],
+                "avg_wait_ms": round(self._stats["wait_time_total"] / acquired * 1000, 3) if acquired else 0.0,
+                "max_wait_ms": round(self._stats["wait_time_max"] * 1000, 3),
+            }
+
+
+# Global pool instance (re-created after fork)
+_pool: Optional[ConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ConnectionPool()
+                _pool_pid = pid
+    return _pool
+
+
+def get_db_connection() -> PooledConnection:
+    """Acquire a pooled connection; conn.close() returns it to the pool"""
+    return get_pool().getconn()
@@ -0,0 +1,47 @@
+"""
+Fast JSON Responses for Miraikakaku
+orjson-backed responses for the bulk array endpoints (price history, predictions)
+
+Returning a Response instance from a handler bypasses FastAPI's
+jsonable_encoder pass, which otherwise walks every row dict a second time
+before json.dumps. Rows are already plain dicts built by api_formatters, so
+they go straight to orjson.
+"""
+
+from decimal import Decimal
+from typing import Any, Optional
+
+import orjson
+from fastapi import Response
+
+# Headers set on the injected Response (ETag, Cache-Control) that must survive
+# when the handler returns its own Response object
+_FORWARDED_HEADERS = ("etag", "cache-control")
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """
+    Serialize content with orjson, carrying over cache headers that were set on
+    the handler's injected response (FastAPI drops them for returned Responses)
+    """
+    headers = None
+    if response is not None:
+        headers = {k: v for k, v in response.headers.items() if k in _FORWARDED_HEADERS}
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,66 @@
+"""
+HTTP Caching Helpers for Miraikakaku
+ETag / If-None-Match handling and per-endpoint Cache-Control for the read APIs
+"""
+
+import hashlib
+import os
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Cache-Control max-age (seconds) per endpoint group
+CACHE_MAX_AGE = {
+    # マテリアライズドビューは1日1回更新
+    "rankings": int(os.getenv("CACHE_MAX_AGE_RANKINGS", 60)),
+    "stats": int(os.getenv("CACHE_MAX_AGE_STATS", 60)),
+    "details": int(os.getenv("CACHE_MAX_AGE_DETAILS", 30)),
+    # 予測は夜間バッチでのみ更新
+    "predictions": int(os.getenv("CACHE_MAX_AGE_PREDICTIONS", 300)),
+}
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag from the values that determine a response"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match comparison (weak, per RFC 7232)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def cache_control(group: str) -> str:
+    max_age = CACHE_MAX_AGE[group]
+    return f"public, max-age={max_age}, stale-while-revalidate={max_age}"
+
+
+def set_cache_headers(response: Response, etag: str, group: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control(group)
+
+
+def conditional_response(request: Request, response: Response, etag: Optional[str], group: str) -> Optional[Response]:
+    """
+    Apply ETag/Cache-Control headers; return a 304 response when the client
+    already has this version, otherwise None (caller returns the body)
+    """
+    if etag is None:
+        return None
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control(group)})
+    set_cache_headers(response, etag, group)
+    return None
@@ -0,0 +1,589 @@
+"""
+Async Concurrent News Collector for Miraikakaku
+Alpha Vantage, Finnhub, NewsAPI and yfinance are fetched concurrently, each
+behind its own token bucket sized from the provider's quota, instead of the
+serial loops with fixed time.sleep(12) / sleep(1.2) between symbols.
+
+- TokenBucket: `calls` per `period` seconds, up to `burst` back-to-back
+  (override per provider with NEWS_RATE_<PROVIDER>="calls/period[:burst]")
+- Throttle responses (Alpha Vantage "Note"/"Information", HTTP 429) pause the
+  provider's bucket with exponential backoff and the request is retried
+- Blocking HTTP / yfinance calls run in worker threads (asyncio.to_thread)
+- Alpha Vantage: every article's ticker_sentiment is fanned out to all tracked
+  tickers it mentions. One market-wide feed request (no tickers filter) covers
+  most symbols; per-ticker requests are only made for symbols it missed.
+  (A comma-separated `tickers` list means "mentions ALL of them", so it cannot
+  be used to batch unrelated symbols.)
+
+Usage:
+    summary = collect_news_sync(conn, [("AAPL", "Apple"), ("7203.T", "トヨタ自動車")])
+    python news_collector.py --limit 50 --providers alphavantage,finnhub
+"""
+
+import abc
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import requests
+
+from news_store import save_news_batch
+
+logger = logging.getLogger(__name__)
+
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+FINNHUB_URL = "https://finnhub.io/api/v1"
+NEWSAPI_URL = "https://newsapi.org/v2/everything"
+
+# Default quotas (free tiers): calls / period seconds : burst
+DEFAULT_RATES = {
+    "alphavantage": "5/60:1",
+    "finnhub": "60/60:10",
+    "newsapi": "5/1:5",
+    "yfinance": "1/1:3",
+}
+NEWS_LOOKBACK_DAYS = int(os.getenv("NEWS_LOOKBACK_DAYS", 7))
+# 市場全体フィードの取得件数（Alpha Vantage の上限は1000）
+ALPHA_VANTAGE_SWEEP_LIMIT = int(os.getenv("ALPHA_VANTAGE_SWEEP_LIMIT", 1000))
+# フィードでこの件数以上の記事が得られた銘柄は個別リクエストを省略
+ALPHA_VANTAGE_MIN_ARTICLES = int(os.getenv("ALPHA_VANTAGE_MIN_ARTICLES", 1))
+NEWS_FETCH_RETRIES = int(os.getenv("NEWS_FETCH_RETRIES", 3))
+NEWS_BACKOFF_MAX = float(os.getenv("NEWS_BACKOFF_MAX", 300))
+# 1プロバイダあたりの同時実行数（スレッド数の上限）
+NEWS_PROVIDER_CONCURRENCY = int(os.getenv("NEWS_PROVIDER_CONCURRENCY", 4))
+
+
+def parse_rate(spec: str) -> Tuple[int, float, int]:
+    """"calls/period[:burst]" -> (calls, period, burst); burst defaults to calls"""
+    try:
+        rate, _, burst = spec.partition(":")
+        calls, period = rate.split("/")
+        calls, period = int(calls), float(period)
+        burst = int(burst) if burst else calls
+    except ValueError:
+        raise ValueError(f"Invalid rate spec (expected calls/period[:burst]): {spec!r}")
+    if calls < 1 or period <= 0 or burst < 1:
+        raise ValueError(f"Invalid rate spec (expected calls/period[:burst]): {spec!r}")
+    return calls, period, burst
+
+
+class Throttled(Exception):
+    """The provider rejected the request because of its rate limit"""
+
+
+class TokenBucket:
+    """
+    Token bucket: refills calls/period tokens per second up to burst
+
+    penalize() empties the bucket and blocks it for a while (throttle backoff).
+    """
+
+    def __init__(self, calls: int, period: float, burst: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = calls / period
+        self.capacity = float(burst or calls)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available; otherwise return the seconds to wait"""
+        now = self._clock()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._refill(now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0):
+        # ロックで待ち行列を作り、到着順にトークンを払い出す
+        async with self._lock:
+            while True:
+                wait = self.try_acquire(tokens)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+    def penalize(self, seconds: float):
+        now = self._clock()
+        self._refill(now)
+        self.tokens = 0.0
+        self._blocked_until = max(self._blocked_until, now + seconds)
+
+
+class Backoff:
+    """Exponential backoff: base, 2*base, 4*base ... capped; reset on success"""
+
+    def __init__(self, base: float, cap: float = NEWS_BACKOFF_MAX):
+        self.base = base
+        self.cap = cap
+        self.failures = 0
+
+    def next(self) -> float:
+        delay = min(self.cap, self.base * (2 ** self.failures))
+        self.failures += 1
+        return delay
+
+    def reset(self):
+        self.failures = 0
+
+
+def _polarity(text: str) -> float:
+    try:
+        from textblob import TextBlob
+        return float(TextBlob(text).sentiment.polarity)
+    except Exception:
+        return 0.0
+
+
+def _label(score: float, positive: str = "bullish", negative: str = "bearish") -> str:
+    if score > 0.1:
+        return positive
+    if score < -0.1:
+        return negative
+    return "neutral"
+
+
+def is_alpha_vantage_throttled(data: Any) -> bool:
+    """Alpha Vantage returns HTTP 200 with a "Note" (per-minute) or "Information" (daily) message"""
+    return isinstance(data, dict) and "feed" not in data and ("Note" in data or "Information" in data)
+
+
+def fan_out_feed(feed: Iterable[Dict[str, Any]], tracked: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Alpha Vantage NEWS_SENTIMENT feed -> {symbol: stock_news rows}
+    Each article yields one row per tracked ticker in its ticker_sentiment (deduplicated by url)
+    """
+    tracked = set(tracked)
+    rows: Dict[str, List[Dict[str, Any]]] = {}
+    seen = set()
+    for article in feed:
+        url = article.get("url")
+        mentions = [ts for ts in article.get("ticker_sentiment", []) if ts.get("ticker") in tracked]
+        if not url or not mentions:
+            continue
+        published_at = datetime.strptime(article["time_published"], "%Y%m%dT%H%M%S")
+        for ts in mentions:
+            key = (ts["ticker"], url)
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.setdefault(ts["ticker"], []).append(_news_row(
+                ts["ticker"],
+                article.get("title"),
+                url,
+                article.get("source"),
+                published_at,
+                article.get("summary"),
+                float(ts.get("ticker_sentiment_score", 0)),
+                ts.get("ticker_sentiment_label", "neutral").lower(),
+                float(ts.get("relevance_score", 0)),
+                [t["topic"] for t in article.get("topics", [])] or None,
+            ))
+    return rows
+
+
+def _news_row(symbol, title, url, source, published_at, summary, score, label, relevance, topics=None):
+    return {
+        "symbol": symbol,
+        "title": (title or "")[:500],
+        "url": url or "",
+        "source": source or "Unknown",
+        "published_at": published_at,
+        "summary": (summary or "")[:1000],
+        "sentiment_score": score,
+        "sentiment_label": label,
+        "relevance_score": relevance,
+        "topics": topics,
+    }
+
+
+class Provider(abc.ABC):
+    """News source: supports() filters symbols, fetch() returns stock_news rows (runs in a thread)"""
+
+    name = ""
+    calls_per_fetch = 1
+
+    def __init__(self, rate_spec: Optional[str] = None, session: Optional[requests.Session] = None):
+        spec = rate_spec or os.getenv(f"NEWS_RATE_{self.name.upper()}", DEFAULT_RATES[self.name])
+        calls, period, burst = parse_rate(spec)
+        self.bucket = TokenBucket(calls, period, burst)
+        self.backoff = Backoff(base=period / calls)
+        self.session = session or requests.Session()
+
+    def enabled(self) -> bool:
+        return True
+
+    def supports(self, symbol: str) -> bool:
+        return True
+
+    @abc.abstractmethod
+    def fetch(self, symbol: str, company_name: str) -> List[Dict[str, Any]]:
+        ...
+
+    def _get_json(self, url: str, **kwargs):
+        response = self.session.get(url, timeout=30, **kwargs)
+        if response.status_code == 429:
+            raise Throttled(f"{self.name}: HTTP 429")
+        response.raise_for_status()
+        return response.json()
+
+
+class AlphaVantageProvider(Provider):
+    name = "alphavantage"
+
+    def __init__(self, api_key: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key or os.getenv("ALPHA_VANTAGE_API_KEY", "demo")
+
+    def enabled(self):
+        return self.api_key != "demo"
+
+    def supports(self, symbol):
+        # 米国株・日本株のみ（collect_news_sentiment と同じ対象）
+        if symbol.endswith((".KS", ".HK")):
+            return False
+        return symbol.endswith(".T") or ("." not in symbol and len(symbol) <= 5)
+
+    def fetch_feed(self, tickers: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """NEWS_SENTIMENT feed; tickers=None returns the latest market-wide articles"""
+        params = {
+            "function": "NEWS_SENTIMENT",
+            "time_from": (datetime.now() - timedelta(days=NEWS_LOOKBACK_DAYS)).strftime("%Y%m%dT0000"),
+            "sort": "LATEST",
+            "limit": limit,
+            "apikey": self.api_key,
+        }
+        if tickers:
+            params["tickers"] = tickers
+        data = self._get_json(ALPHA_VANTAGE_URL, params=params)
+        if is_alpha_vantage_throttled(data):
+            raise Throttled(f"alphavantage: {data.get('Note') or data.get('Information')}")
+        return data.get("feed", [])
+
+    def fetch(self, symbol, company_name):
+        return fan_out_feed(self.fetch_feed(symbol), [symbol]).get(symbol, [])
+
+
+class FinnhubProvider(Provider):
+    name = "finnhub"
+    calls_per_fetch = 2  # company-news + news-sentiment
+
+    def __init__(self, api_key: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key or os.getenv("FINNHUB_API_KEY")
+
+    def enabled(self):
+        return bool(self.api_key)
+
+    def supports(self, symbol):
+        return symbol.endswith(".T")
+
+    def fetch(self, symbol, company_name):
+        news = self._get_json(f"{FINNHUB_URL}/company-news", params={
+            "symbol": symbol,
+            "from": (datetime.now() - timedelta(days=NEWS_LOOKBACK_DAYS)).strftime("%Y-%m-%d"),
+            "to": datetime.now().strftime("%Y-%m-%d"),
+            "token": self.api_key,
+        })
+        sentiment = self._get_json(f"{FINNHUB_URL}/news-sentiment",
+                                   params={"symbol": symbol, "token": self.api_key})
+
+        # 個別記事のセンチメントはないため銘柄全体（bullish% - bearish%）を使う
+        score = 0.0
+        if isinstance(sentiment, dict) and "sentiment" in sentiment:
+            score = (float(sentiment["sentiment"].get("bullishPercent", 0))
+                     - float(sentiment["sentiment"].get("bearishPercent", 0)))
+        if not isinstance(news, list):
+            return []
+        return [
+            _news_row(symbol, a.get("headline"), a.get("url"), a.get("source"),
+                      datetime.fromtimestamp(a.get("datetime", 0)), a.get("summary"),
+                      score, _label(score), 0.8)
+            for a in news
+        ]
+
+
+class NewsAPIProvider(Provider):
+    name = "newsapi"
+
+    def __init__(self, api_key: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key or os.getenv("NEWSAPI_KEY")
+        self._names: Optional[Dict[str, str]] = None
+
+    def enabled(self):
+        return bool(self.api_key)
+
+    @property
+    def names(self) -> Dict[str, str]:
+        if self._names is None:
+            # 英語名マッピングは NewsAPICollector と共有
+            try:
+                from newsapi_collector import NewsAPICollector
+                self._names = NewsAPICollector(api_key=self.api_key).symbol_to_en
+            except ImportError as e:
+                logger.warning("newsapi_collector unavailable, NewsAPI disabled: %s", e)
+                self._names = {}
+        return self._names
+
+    def supports(self, symbol):
+        return symbol in self.names
+
+    def fetch(self, symbol, company_name):
+        to_date = datetime.now()
+        data = self._get_json(NEWSAPI_URL, headers={"Authorization": f"Bearer {self.api_key}"}, params={
+            "q": self.names[symbol],
+            "language": "en",
+            "sortBy": "publishedAt",
+            "from": (to_date - timedelta(days=min(NEWS_LOOKBACK_DAYS, 30))).strftime("%Y-%m-%d"),
+            "to": to_date.strftime("%Y-%m-%d"),
+            "pageSize": 100,
+        })
+        rows = []
+        for article in data.get("articles", []):
+            title = article.get("title") or ""
+            description = article.get("description") or ""
+            score = _polarity(f"{title}. {description}")
+            rows.append(_news_row(
+                symbol, title, article.get("url"), (article.get("source") or {}).get("name", "NewsAPI"),
+                article.get("publishedAt"), description, score,
+                _label(score, "positive", "negative"), None,
+            ))
+        return rows
+
+
+class YFinanceProvider(Provider):
+    name = "yfinance"
+
+    def supports(self, symbol):
+        return symbol.endswith(".T")
+
+    def fetch(self, symbol, company_name):
+        import yfinance as yf
+
+        rows = []
+        for article in yf.Ticker(symbol).news or []:
+            # 新しい構造は content にネスト、古い構造はフラット
+            if "content" in article:
+                content = article["content"]
+                title = content.get("title", "")
+                source = content.get("provider", {}).get("displayName", "Unknown")
+                url = (content.get("canonicalUrl") or {}).get("url", "")
+                pub_date = content.get("pubDate", "")
+                published_at = (datetime.fromisoformat(pub_date.replace("Z", "+00:00"))
+                                if pub_date else datetime.now())
+            else:
+                title = article.get("title", "")
+                source = article.get("publisher", "Unknown")
+                url = article.get("link", "")
+                publish_time = article.get("providerPublishTime", 0)
+                published_at = datetime.fromtimestamp(publish_time) if publish_time else datetime.now()
+            score = _polarity(title) if title else 0.0
+            rows.append(_news_row(symbol, title, url, source, published_at, "", score, _label(score), 0.9))
+        return rows
+
+
+PROVIDERS = {
+    cls.name: cls for cls in (AlphaVantageProvider, FinnhubProvider, NewsAPIProvider, YFinanceProvider)
+}
+
+
+def save_articles(conn, rows: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+    """Merge stock_news rows in one batch (existing (symbol, url) kept); returns news_store counts"""
+    return save_news_batch(conn, rows, update=False)
+
+
+class NewsCollector:
+    """Runs every enabled provider concurrently over the symbols it supports"""
+
+    def __init__(self, conn, providers: Optional[Iterable[Provider]] = None,
+                 progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None,
+                 save: Callable[[Any, Sequence[Dict[str, Any]]], Dict[str, int]] = save_articles):
+        self.conn = conn
+        self.providers = [p for p in (providers or [cls() for cls in PROVIDERS.values()]) if p.enabled()]
+        self.progress = progress
+        self.save = save
+        self._db_lock = asyncio.Lock()
+        self._done = 0
+        self.stats = {
+            p.name: {"symbols": 0, "requests": 0, "articles": 0, "saved": 0, "duplicates": 0,
+                     "skipped_requests": 0, "throttled": 0, "errors": 0, "seconds": 0.0}
+            for p in self.providers
+        }
+
+    async def _fetch(self, provider: Provider, fn: Callable, *args):
+        """Call fn(*args) in a thread behind the provider's bucket, retrying throttled calls"""
+        stats = self.stats[provider.name]
+        for attempt in range(NEWS_FETCH_RETRIES + 1):
+            await provider.bucket.acquire(provider.calls_per_fetch)
+            stats["requests"] += provider.calls_per_fetch
+            try:
+                rows = await asyncio.to_thread(fn, *args)
+            except Throttled as e:
+                # スロットリング: バケットを止めて指数バックオフ後に再試行
+                delay = provider.backoff.next()
+                provider.bucket.penalize(delay)
+                stats["throttled"] += 1
+                logger.warning("%s throttled (%s), backing off %.0fs", provider.name, e, delay)
+                continue
+            provider.backoff.reset()
+            return rows
+        raise Throttled(f"{provider.name}: still throttled after {NEWS_FETCH_RETRIES} retries")
+
+    async def _collect(self, provider: Provider, symbol: str, company_name: str,
+                       semaphore: asyncio.Semaphore, total: int):
+        stats = self.stats[provider.name]
+        entry = {"provider": provider.name, "symbol": symbol}
+        started = time.perf_counter()
+        async with semaphore:
+            try:
+                rows = await self._fetch(provider, provider.fetch, symbol, company_name)
+                saved = await self._save(provider, rows)
+                entry.update(articles=len(rows), saved=saved)
+            except Exception as e:
+                stats["errors"] += 1
+                entry["error"] = str(e)
+                logger.error("%s %s failed: %s", provider.name, symbol, e)
+        stats["seconds"] += time.perf_counter() - started
+        return self._report(provider, entry, total)
+
+    async def _save(self, provider: Provider, rows: Sequence[Dict[str, Any]]) -> int:
+        async with self._db_lock:
+            counts = await asyncio.to_thread(self.save, self.conn, rows)
+        stats = self.stats[provider.name]
+        stats["articles"] += len(rows)
+        stats["saved"] += counts["inserted"]
+        stats["duplicates"] += counts["duplicates"]
+        return counts["inserted"]
+
+    def _report(self, provider: Provider, entry: Dict[str, Any], total: int):
+        self.stats[provider.name]["symbols"] += 1
+        self._done += 1
+        if self.progress:
+            self.progress(self._done, total, entry)
+        return entry
+
+    async def _collect_fanned_out(self, provider: AlphaVantageProvider,
+                                  symbols: Sequence[Tuple[str, str]], total: int):
+        """
+        Alpha Vantage: 市場全体フィード1回 + カバーされなかった銘柄のみ個別取得
+        どの応答の記事も、言及しているすべての追跡銘柄の行として保存する
+        """
+        stats = self.stats[provider.name]
+        tracked = [s for s, _ in symbols]
+        covered: Dict[str, int] = {}
+        started = time.perf_counter()
+
+        async def fetch_and_fan_out(tickers, limit):
+            feed = await self._fetch(provider, provider.fetch_feed, tickers, limit)
+            by_symbol = fan_out_feed(feed, tracked)
+            await self._save(provider, [row for rows in by_symbol.values() for row in rows])
+            for symbol, rows in by_symbol.items():
+                covered[symbol] = covered.get(symbol, 0) + len(rows)
+
+        entries = []
+        try:
+            await fetch_and_fan_out(None, ALPHA_VANTAGE_SWEEP_LIMIT)
+        except Exception as e:
+            stats["errors"] += 1
+            logger.error("%s market feed failed: %s", provider.name, e)
+
+        for symbol, _ in symbols:
+            entry = {"provider": provider.name, "symbol": symbol}
+            if covered.get(symbol, 0) >= ALPHA_VANTAGE_MIN_ARTICLES:
+                stats["skipped_requests"] += 1
+                entry["request"] = False
+            else:
+                entry["request"] = True
+                try:
+                    await fetch_and_fan_out(symbol, 50)
+                except Exception as e:
+                    stats["errors"] += 1
+                    entry["error"] = str(e)
+                    logger.error("%s %s failed: %s", provider.name, symbol, e)
+            entry["articles"] = covered.get(symbol, 0)
+            entries.append(self._report(provider, entry, total))
+        stats["seconds"] += time.perf_counter() - started
+        return entries
+
+    async def run(self, symbols: Sequence[Tuple[str, str]]) -> Dict[str, Any]:
+        """symbols: [(symbol, company_name)]"""
+        started = time.perf_counter()
+        work = [(p, s, n) for p in self.providers for s, n in symbols if p.supports(s)]
+        semaphores = {p.name: asyncio.Semaphore(NEWS_PROVIDER_CONCURRENCY) for p in self.providers}
+        tasks = [
+            self._collect(p, s, n, semaphores[p.name], len(work))
+            for p, s, n in work if not isinstance(p, AlphaVantageProvider)
+        ]
+        for p in self.providers:
+            if isinstance(p, AlphaVantageProvider):
+                tasks.append(self._collect_fanned_out(
+                    p, [(s, n) for q, s, n in work if q is p], len(work)
+                ))
+        results = []
+        for result in await asyncio.gather(*tasks):
+            results.extend(result if isinstance(result, list) else [result])
+        return {
+            "providers": self.stats,
+            "tasks": len(work),
+            "elapsed_seconds": round(time.perf_counter() - started, 2),
+            "errors": [r for r in results if "error" in r][:20],
+        }
+
+
+def collect_news_sync(conn, symbols: Sequence[Tuple[str, str]], providers: Optional[Sequence[str]] = None,
+                      progress=None) -> Dict[str, Any]:
+    """Blocking entry point (admin jobs / CLI); providers: names from PROVIDERS (default all enabled)"""
+    unknown = set(providers or []) - set(PROVIDERS)
+    if unknown:
+        raise ValueError(f"Unknown news providers: {sorted(unknown)}")
+
+    async def main():
+        selected = [PROVIDERS[name]() for name in (providers or PROVIDERS)]
+        return await NewsCollector(conn, selected, progress).run(symbols)
+
+    return asyncio.run(main())
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from dotenv import load_dotenv
+    from psycopg2.extras import RealDictCursor
+
+    from db_pool import get_db_connection
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Collect news from all providers concurrently")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--providers", default=None, help="comma-separated: " + ",".join(PROVIDERS))
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute("""
+        SELECT symbol, company_name FROM stock_master
+        WHERE is_active = TRUE ORDER BY symbol LIMIT %s
+    """, (args.limit,))
+    targets = [(r["symbol"], r["company_name"]) for r in cur.fetchall()]
+    cur.close()
+
+    summary = collect_news_sync(conn, targets, args.providers.split(",") if args.providers else None)
+    conn.close()
+    print(json.dumps(summary, ensure_ascii=False, indent=2, default=str))
@@ -0,0 +1,153 @@
+"""
+Bulk stock_news Ingestion for Miraikakaku
+All news collectors save a batch of articles with one staged, set-based merge
+instead of one INSERT per article (where an IntegrityError + rollback also
+threw away the rows inserted before it).
+
+- Rows are validated and de-duplicated by (symbol, url) in Python
+- execute_values loads them into a session temp table (_stock_news_stage)
+- One INSERT ... SELECT ... ON CONFLICT (symbol, url) merge moves them into
+  stock_news; rows for symbols missing from stock_master are reported, not
+  failed on
+- The whole batch commits or rolls back together
+
+Usage:
+    counts = save_news_batch(conn, rows, update=True)
+    # {"received", "inserted", "updated", "duplicates", "invalid", "unknown_symbol"}
+"""
+
+import logging
+from typing import Any, Dict, List, Sequence, Tuple
+
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+NEWS_COLUMNS = (
+    "symbol", "title", "url", "source", "published_at", "summary",
+    "sentiment_score", "sentiment_label", "relevance_score", "topics",
+)
+
+# stock_news の VARCHAR 上限（1行の超過でバッチ全体が失敗しないよう切り詰め）
+_LIMITS = {"symbol": 20, "source": 100, "sentiment_label": 20}
+
+
+def prepare_news_rows(rows: Sequence[Dict[str, Any]]) -> Tuple[List[tuple], int, int]:
+    """
+    Rows -> (stage tuples, invalid, duplicates)
+    Rows without symbol/url/published_at are invalid; for repeated (symbol, url)
+    the last occurrence wins (ON CONFLICT DO UPDATE cannot touch a row twice)
+    """
+    staged: Dict[Tuple[str, str], tuple] = {}
+    invalid = duplicates = 0
+    for row in rows:
+        if not row.get("symbol") or not row.get("url") or not row.get("published_at"):
+            invalid += 1
+            continue
+        values = []
+        for column in NEWS_COLUMNS:
+            value = row.get(column)
+            if column == "title":
+                value = value or ""
+            if column in _LIMITS and isinstance(value, str):
+                value = value[:_LIMITS[column]]
+            values.append(value)
+        key = (values[0], values[2])
+        if key in staged:
+            duplicates += 1
+            del staged[key]
+        staged[key] = tuple(values)
+    return list(staged.values()), invalid, duplicates
+
+
+def _ensure_stage(cur):
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS _stock_news_stage (
+            symbol VARCHAR(20),
+            title TEXT,
+            url TEXT,
+            source VARCHAR(100),
+            published_at TIMESTAMP,
+            summary TEXT,
+            sentiment_score DOUBLE PRECISION,
+            sentiment_label VARCHAR(20),
+            relevance_score DOUBLE PRECISION,
+            topics TEXT[]
+        ) ON COMMIT DELETE ROWS
+    """)
+    cur.execute("TRUNCATE _stock_news_stage")
+
+
+def save_news_batch(conn, rows: Sequence[Dict[str, Any]], update: bool = True,
+                    commit: bool = True) -> Dict[str, int]:
+    """
+    Merge stock_news rows in one statement
+
+    update=True refreshes sentiment/relevance/topics of existing (symbol, url)
+    rows when they differ (NULLs keep the stored value); update=False keeps
+    existing rows untouched. Returns counts:
+      inserted / updated: rows written
+      duplicates: repeated within the batch or already stored unchanged
+      invalid: missing symbol, url or published_at
+      unknown_symbol: symbol not in stock_master
+    """
+    counts = {"received": len(rows), "inserted": 0, "updated": 0, "duplicates": 0,
+              "invalid": 0, "unknown_symbol": 0}
+    staged, counts["invalid"], in_batch_duplicates = prepare_news_rows(rows)
+    if not staged:
+        counts["duplicates"] = in_batch_duplicates
+        return counts
+
+    if update:
+        conflict = """
+            DO UPDATE SET
+                sentiment_score = COALESCE(EXCLUDED.sentiment_score, n.sentiment_score),
+                sentiment_label = COALESCE(EXCLUDED.sentiment_label, n.sentiment_label),
+                relevance_score = COALESCE(EXCLUDED.relevance_score, n.relevance_score),
+                topics = COALESCE(EXCLUDED.topics, n.topics),
+                updated_at = NOW()
+            WHERE (n.sentiment_score, n.sentiment_label, n.relevance_score, n.topics)
+                  IS DISTINCT FROM (
+                      COALESCE(EXCLUDED.sentiment_score, n.sentiment_score),
+                      COALESCE(EXCLUDED.sentiment_label, n.sentiment_label),
+                      COALESCE(EXCLUDED.relevance_score, n.relevance_score),
+                      COALESCE(EXCLUDED.topics, n.topics))
+        """
+    else:
+        conflict = "DO NOTHING"
+
+    columns = ", ".join(NEWS_COLUMNS)
+    try:
+        with conn.cursor() as cur:
+            _ensure_stage(cur)
+            execute_values(cur, f"INSERT INTO _stock_news_stage ({columns}) VALUES %s",
+                           staged, page_size=1000)
+            cur.execute(f"""
+                WITH merged AS (
+                    INSERT INTO stock_news AS n ({columns})
+                    SELECT {columns}
+                    FROM _stock_news_stage s
+                    WHERE EXISTS (SELECT 1 FROM stock_master m WHERE m.symbol = s.symbol)
+                    ON CONFLICT (symbol, url) {conflict}
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT
+                    (SELECT COUNT(*) FROM merged WHERE inserted) AS inserted,
+                    (SELECT COUNT(*) FROM merged WHERE NOT inserted) AS updated,
+                    (SELECT COUNT(*) FROM _stock_news_stage s
+                     WHERE NOT EXISTS (SELECT 1 FROM stock_master m WHERE m.symbol = s.symbol)
+                    ) AS unknown_symbol
+            """)
+            inserted, updated, unknown = cur.fetchone()
+            cur.execute("TRUNCATE _stock_news_stage")
+        if commit:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    counts.update(inserted=inserted, updated=updated, unknown_symbol=unknown)
+    counts["duplicates"] = in_batch_duplicates + len(staged) - inserted - updated - unknown
+    if unknown:
+        logger.warning("stock_news: %d rows skipped (symbol not in stock_master)", unknown)
+    return counts
@@ -0,0 +1,70 @@
+"""
+Keyset Pagination Helpers for /api/stocks/{symbol}/predictions
+Opaque cursors over (prediction_date, prediction_days) and cheap count estimates
+"""
+
+import base64
+import json
+from datetime import date, timedelta
+from typing import Mapping, Optional, Tuple
+
+COUNT_MODES = ("exact", "estimate", "none")
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def resolve_count_mode(count: Optional[str], cursor: Optional[str]) -> str:
+    """
+    Requested count mode, defaulting to estimate for page requests and none for
+    cursor requests. estimate reads the ensemble_prediction_stats counter row;
+    the windowed COUNT(*) only runs when a client asks for count=exact.
+    """
+    count_mode = count or ("none" if cursor else "estimate")
+    if count_mode not in COUNT_MODES:
+        raise ValueError(f"count must be one of {', '.join(COUNT_MODES)}")
+    return count_mode
+
+
+def encode_cursor(prediction_date, prediction_days) -> str:
+    """Cursor pointing just after the given row (ORDER BY date DESC, days DESC)"""
+    payload = json.dumps({"d": str(prediction_date), "n": int(prediction_days)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return date.fromisoformat(payload["d"]), int(payload["n"])
+    except Exception:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+
+
+def next_cursor(rows, limit: int) -> Optional[str]:
+    """Cursor for the following page, or None on the last page"""
+    if len(rows) < limit or not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(last['prediction_date'], last['prediction_days'] or 0)
+
+
+def estimate_window_count(stats: Optional[Mapping], today: date, days: int) -> int:
+    """
+    Rows with prediction_date >= today - days, from the ensemble_prediction_stats
+    counter row. Exact when the window covers the symbol's whole date range,
+    otherwise pro-rated by date span.
+    """
+    if not stats or not stats['total_rows']:
+        return 0
+    total = int(stats['total_rows'])
+    min_date, max_date = stats['min_prediction_date'], stats['max_prediction_date']
+    window_start = today - timedelta(days=days)
+    if min_date is None or max_date is None or min_date >= window_start:
+        return total
+    if max_date < window_start:
+        return 0
+    span = (max_date - min_date).days + 1
+    covered = (max_date - window_start).days + 1
+    return round(total * covered / span)
@@ -0,0 +1,101 @@
+"""
+In-process Ranking Cache for Miraikakaku
+Caches home-page ranking/stats responses and per-symbol stock details built
+from the mv_* materialized views.
+
+Entries are tagged with a generation counter that /admin/refresh-ranking-views
+bumps after refresh_ranking_views(), so a refreshed instance never serves the
+previous snapshot. The TTL bounds staleness on instances that did not receive
+the refresh call.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Configuration
+RANKING_CACHE_TTL = float(os.getenv("RANKING_CACHE_TTL", 300))
+RANKING_CACHE_FETCH_LIMIT = int(os.getenv("RANKING_CACHE_FETCH_LIMIT", 200))
+
+
+class RankingCache:
+    """
+    Generation-tagged TTL cache
+
+    Ranking lists are fetched once with fetch_limit(limit) rows and sliced for
+    any smaller limit. A list shorter than its fetch limit is the whole view,
+    so it can answer every limit.
+    """
+
+    def __init__(self, ttl: float = RANKING_CACHE_TTL, min_fetch: int = RANKING_CACHE_FETCH_LIMIT):
+        self.ttl = ttl
+        self.min_fetch = min_fetch
+        self.generation = 0
+        self._lock = threading.Lock()
+        # key -> (value, fetch_limit, generation, stored_at, digest)
+        self._entries: Dict[str, tuple] = {}
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "stale_stores": 0, "invalidations": 0}
+
+    def fetch_limit(self, limit: int) -> int:
+        """Number of rows to query so the entry covers typical limits"""
+        return max(limit, self.min_fetch)
+
+    def lookup(self, key: str, limit: Optional[int] = None) -> Optional[Tuple[Any, str]]:
+        """Return (value, content digest) or None; the digest backs the HTTP ETag"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fetch_limit, generation, stored_at, digest = entry
+                fresh = generation == self.generation and time.monotonic() - stored_at < self.ttl
+                covers = limit is None or fetch_limit is None or limit <= fetch_limit or len(value) < fetch_limit
+                if fresh and covers:
+                    self._stats["hits"] += 1
+                    return (value if limit is None else value[:max(limit, 0)]), digest
+                if not fresh:
+                    del self._entries[key]
+            self._stats["misses"] += 1
+            return None
+
+    def get(self, key: str, limit: Optional[int] = None) -> Optional[Any]:
+        found = self.lookup(key, limit)
+        return found[0] if found is not None else None
+
+    def put(self, key: str, value: Any, generation: int, fetch_limit: Optional[int] = None) -> str:
+        """
+        Store value read under generation (dropped if a refresh happened meanwhile).
+        Returns the content digest, computed once per stored snapshot.
+        """
+        digest = hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        with self._lock:
+            if generation != self.generation:
+                self._stats["stale_stores"] += 1
+                return digest
+            self._entries[key] = (value, fetch_limit, generation, time.monotonic(), digest)
+            self._stats["stores"] += 1
+        return digest
+
+    def invalidate(self) -> int:
+        """Bump the generation after the materialized views are refreshed"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+            return self.generation
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "generation": self.generation,
+                "ttl_seconds": self.ttl,
+                "entries": len(self._entries),
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Global cache instance shared by the sync and async endpoints
+ranking_cache = RankingCache()
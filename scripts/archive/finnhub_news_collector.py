@@ -9,6 +9,8 @@ from datetime import datetime, timedelta
 from psycopg2.extras import RealDictCursor
 import os
 
+from news_store import save_news_batch
+
 
 def collect_jp_news_finnhub(conn, symbol, api_key):
     """
@@ -75,52 +77,43 @@ def collect_jp_news_finnhub(conn, symbol, api_key):
             # -1.0 to +1.0に正規化
             sentiment_score = (bullish_pct - bearish_pct)
 
-        # ニュース記事を保存
-        news_saved = 0
+        # ニュース記事を保存（バッチ全体を1回のマージで保存）
+        rows = []
         news_errors = []
 
         if isinstance(news_data, list):
+            # sentiment_labelを決定（個別記事も全体のセンチメントを使用）
+            if sentiment_score > 0.1:
+                sentiment_label = 'bullish'
+            elif sentiment_score < -0.1:
+                sentiment_label = 'bearish'
+            else:
+                sentiment_label = 'neutral'
+
             for article in news_data:
                 try:
-                    # 個別記事のセンチメントスコア (全体のセンチメントを使用)
-                    article_sentiment_score = sentiment_score
-
-                    # sentiment_labelを決定
-                    if sentiment_score > 0.1:
-                        sentiment_label = 'bullish'
-                    elif sentiment_score < -0.1:
-                        sentiment_label = 'bearish'
-                    else:
-                        sentiment_label = 'neutral'
-
-                    cur.execute("""
-                        INSERT INTO stock_news (
-                            symbol, title, url, source, published_at,
-                            summary, sentiment_score, sentiment_label, relevance_score
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (symbol, url) DO NOTHING
-                    """, (
-                        symbol,
-                        article.get('headline', '')[:500],  # タイトル上限500文字
-                        article.get('url', ''),
-                        article.get('source', 'Unknown'),
-                        datetime.fromtimestamp(article.get('datetime', 0)),
-                        article.get('summary', '')[:1000],  # サマリー上限1000文字
-                        article_sentiment_score,
-                        sentiment_label,
-                        0.8  # デフォルトの関連性スコア
-                    ))
-                    news_saved += 1
+                    rows.append({
+                        'symbol': symbol,
+                        'title': article.get('headline', '')[:500],  # タイトル上限500文字
+                        'url': article.get('url', ''),
+                        'source': article.get('source', 'Unknown'),
+                        'published_at': datetime.fromtimestamp(article.get('datetime', 0)),
+                        'summary': article.get('summary', '')[:1000],  # サマリー上限1000文字
+                        'sentiment_score': sentiment_score,
+                        'sentiment_label': sentiment_label,
+                        'relevance_score': 0.8  # デフォルトの関連性スコア
+                    })
                 except Exception as e:
                     news_errors.append(str(e)[:100])
 
-            conn.commit()
+        counts = save_news_batch(conn, rows, update=False)
 
         return {
             "status": "success",
             "symbol": symbol,
             "company_name": stock['company_name'],
-            "news_collected": news_saved,
+            "news_collected": counts['inserted'],
+            "duplicates": counts['duplicates'],
             "feed_count": len(news_data) if isinstance(news_data, list) else 0,
             "sentiment_score": round(sentiment_score, 4),
             "bullish_percent": round(bullish_pct, 2),
@@ -184,12 +184,13 @@ def generate_news_enhanced_prediction(symbol: str) -> dict:
         conn.close()
 
 
-def generate_batch_predictions(limit: int = 100) -> dict:
+def generate_batch_predictions(limit: int = 100, progress=None) -> dict:
     """
     複数銘柄の予測を一括生成
 
     Args:
         limit: 処理する銘柄数
+        progress: 進捗コールバック progress(done, total, symbol, result)（ジョブ実行時）
 
     Returns:
         dict: 実行結果
@@ -239,6 +240,9 @@ def generate_batch_predictions(limit: int = 100) -> dict:
         else:
             results['failed'] += 1
 
+        if progress:
+            progress(i, len(symbols), symbol, result)
+
     return results
 
 
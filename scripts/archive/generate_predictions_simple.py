@@ -10,6 +10,10 @@ import numpy as np
 from statsmodels.tsa.arima.model import ARIMA
 import warnings
 import os
+import sys
+
+sys.path.insert(0, 'src/ml-models')
+from sentiment_feature_store import get_features_many, sentiment_summary
 
 warnings.filterwarnings('ignore')
 
@@ -33,17 +37,16 @@ def generate_for_symbols(symbols, conn):
     results = []
     tomorrow = datetime.now().date() + timedelta(days=1)
 
+    # センチメント特徴量を全銘柄まとめて主キー検索
+    sentiment_features = get_features_many(conn, [s['symbol'] for s in symbols])
+
     for symbol_info in symbols:
         symbol = symbol_info['symbol']
 
         try:
-            # センチメントデータ取得
-            cur.execute("""
-                SELECT avg_sentiment, sentiment_strength, news_count
-                FROM stock_sentiment_summary
-                WHERE symbol = %s AND date = CURRENT_DATE
-            """, (symbol,))
-            sentiment_data = cur.fetchone()
+            # センチメントデータ（ニュースがなければ None）
+            features = sentiment_features[symbol]
+            sentiment_data = sentiment_summary(features) if features['news_count'] else None
 
             # 最新株価取得
             cur.execute("""
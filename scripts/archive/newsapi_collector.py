@@ -11,6 +11,8 @@ import psycopg2
 from textblob import TextBlob
 import logging
 
+from news_store import save_news_batch
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -245,42 +247,26 @@ class NewsAPICollector:
 
             conn = psycopg2.connect(**config)
 
-            cur = conn.cursor()
-            saved_count = 0
-
-            for article in articles:
-                try:
-                    cur.execute("""
-                        INSERT INTO stock_news (
-                            symbol, title, summary, url, source,
-                            published_at, sentiment_label, sentiment_score
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (symbol, url) DO UPDATE SET
-                            sentiment_label = EXCLUDED.sentiment_label,
-                            sentiment_score = EXCLUDED.sentiment_score,
-                            updated_at = CURRENT_TIMESTAMP
-                    """, (
-                        article['symbol'],
-                        article['title'],
-                        article['description'],  # description → summary
-                        article['url'],
-                        article['source'],
-                        article['published_at'],
-                        article['sentiment'],  # sentiment → sentiment_label
-                        article['sentiment_score']
-                    ))
-                    saved_count += 1
-
-                except Exception as e:
-                    logger.error(f"Error saving article: {e}")
-                    continue
-
-            conn.commit()
-            cur.close()
-            conn.close()
-
-            logger.info(f"Saved {saved_count} articles to database")
-            return saved_count
+            try:
+                # 全記事を1回のマージで保存（既存記事はセンチメントのみ更新）
+                counts = save_news_batch(conn, [{
+                    'symbol': article['symbol'],
+                    'title': article['title'],
+                    'summary': article['description'],  # description → summary
+                    'url': article['url'],
+                    'source': article['source'],
+                    'published_at': article['published_at'],
+                    'sentiment_label': article['sentiment'],  # sentiment → sentiment_label
+                    'sentiment_score': article['sentiment_score']
+                } for article in articles])
+            finally:
+                conn.close()
+
+            logger.info(
+                f"Saved articles to database: {counts['inserted']} inserted, "
+                f"{counts['updated']} updated, {counts['duplicates']} duplicates"
+            )
+            return counts['inserted'] + counts['updated']
 
         except Exception as e:
             logger.error(f"Database error: {e}")
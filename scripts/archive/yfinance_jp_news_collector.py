@@ -9,6 +9,8 @@ from datetime import datetime
 from psycopg2.extras import RealDictCursor
 from textblob import TextBlob
 
+from news_store import save_news_batch
+
 
 def collect_jp_news_yfinance(conn, symbol):
     """
@@ -53,8 +55,8 @@ def collect_jp_news_yfinance(conn, symbol):
                 "message": "No news available"
             }
 
-        # ニュース記事を保存
-        news_saved = 0
+        # ニュース記事を保存（バッチ全体を1回のマージで保存）
+        rows = []
         news_errors = []
 
         for article in news_items:
@@ -104,36 +106,29 @@ def collect_jp_news_yfinance(conn, symbol):
                     except:
                         pass
 
-                # データベースに保存
-                cur.execute("""
-                    INSERT INTO stock_news (
-                        symbol, title, url, source, published_at,
-                        summary, sentiment_score, sentiment_label, relevance_score
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (symbol, url) DO NOTHING
-                """, (
-                    symbol,
-                    title[:500],  # 最大500文字
-                    link,
-                    publisher,
-                    published_at,
-                    '',  # yfinanceにsummaryがない場合は空
-                    sentiment_score,
-                    sentiment_label,
-                    0.9  # デフォルトの関連性スコア
-                ))
-                news_saved += 1
+                rows.append({
+                    'symbol': symbol,
+                    'title': title[:500],  # 最大500文字
+                    'url': link,
+                    'source': publisher,
+                    'published_at': published_at,
+                    'summary': '',  # yfinanceにsummaryがない場合は空
+                    'sentiment_score': sentiment_score,
+                    'sentiment_label': sentiment_label,
+                    'relevance_score': 0.9  # デフォルトの関連性スコア
+                })
 
             except Exception as e:
                 news_errors.append(str(e)[:100])
 
-        conn.commit()
+        counts = save_news_batch(conn, rows, update=False)
 
         return {
             "status": "success",
             "symbol": symbol,
             "company_name": stock['company_name'],
-            "news_collected": news_saved,
+            "news_collected": counts['inserted'],
+            "duplicates": counts['duplicates'],
             "total_available": len(news_items),
             "errors": news_errors[:3] if news_errors else []
         }
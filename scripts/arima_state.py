@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARIMA パラメータの永続化とウォームスタート
+銘柄ごとの推定パラメータを arima_model_state に保存し、翌日以降の実行で再利用する
+
+フィットモード:
+    extend: 保存済みパラメータで新しい観測を含む窓をフィルタするだけ（最適化なし）
+            results.apply(refit=False) / append と同じ計算で、窓は HISTORY_DAYS のまま
+    warm:   保存済みパラメータを start_params にして再推定（ARIMA_REFIT_DAYS 経過後）
+    cold:   初回・パラメータ不正時のデフォルト初期値からの推定
+
+スキーマ: scripts/database/create_arima_state_schema.sql（/admin/apply-arima-state-schema）
+"""
+import math
+import os
+import time
+
+from psycopg2.extras import execute_values
+from statsmodels.tsa.arima.model import ARIMA
+
+ARIMA_ORDER = (1, 1, 1)
+# 保存済みパラメータをフィルタのみで使い回す日数（経過後はウォームスタートで再推定）
+ARIMA_REFIT_DAYS = int(os.getenv("ARIMA_REFIT_DAYS", 7))
+
+MODEL_ORDER = ",".join(str(o) for o in ARIMA_ORDER)
+
+
+def load_states(cur, symbols):
+    """戻り値: {symbol: {'params': [...], 'fitted_on': date}}（同じ次数のもののみ）"""
+    cur.execute("""
+        SELECT symbol, params, fitted_on
+        FROM arima_model_state
+        WHERE symbol = ANY(%s)
+          AND model_order = %s
+    """, (list(symbols), MODEL_ORDER))
+    return {row['symbol']: {'params': list(row['params']), 'fitted_on': row['fitted_on']}
+            for row in cur.fetchall()}
+
+
+def save_states(cur, fit_stats):
+    """fit_stats: {symbol: fit_arima() の stats}。パラメータのない銘柄は保存しない"""
+    rows = [
+        (symbol, MODEL_ORDER, s['params'], s['fitted_on'], s['mode'],
+         s['fit_seconds'], s['iterations'], s['converged'])
+        for symbol, s in fit_stats.items() if s.get('params')
+    ]
+    if not rows:
+        return 0
+    execute_values(cur, """
+        INSERT INTO arima_model_state (
+            symbol, model_order, params, fitted_on, fit_mode,
+            fit_seconds, iterations, converged
+        ) VALUES %s
+        ON CONFLICT (symbol) DO UPDATE SET
+            model_order = EXCLUDED.model_order,
+            params = EXCLUDED.params,
+            fitted_on = EXCLUDED.fitted_on,
+            fit_mode = EXCLUDED.fit_mode,
+            fit_seconds = EXCLUDED.fit_seconds,
+            iterations = EXCLUDED.iterations,
+            converged = EXCLUDED.converged,
+            updated_at = CURRENT_TIMESTAMP
+    """, rows)
+    return len(rows)
+
+
+def _usable(results):
+    return results is not None and math.isfinite(results.llf)
+
+
+def fit_arima(prices, state=None, today=None):
+    """
+    保存済み状態を使って ARIMA を当てはめる
+
+    Returns:
+        tuple: (results or None, stats)
+            stats: mode / fit_seconds / iterations / converged / params / fitted_on
+    """
+    started = time.perf_counter()
+    model = ARIMA(prices, order=ARIMA_ORDER)
+    results, mode, fitted_on = None, None, today
+
+    if state and len(state['params']) == len(model.param_names):
+        age = (today - state['fitted_on']).days if today else ARIMA_REFIT_DAYS
+        if age < ARIMA_REFIT_DAYS:
+            try:
+                results, mode, fitted_on = model.filter(state['params']), 'extend', state['fitted_on']
+            except Exception:
+                results = None
+        if not _usable(results):
+            try:
+                results, mode, fitted_on = model.fit(start_params=state['params']), 'warm', today
+            except Exception:
+                results = None
+
+    if not _usable(results):
+        try:
+            results, mode, fitted_on = model.fit(), 'cold', today
+        except Exception:
+            results, mode = None, 'failed'
+
+    retvals = getattr(results, 'mle_retvals', None) or {}
+    stats = {
+        'mode': mode,
+        'fit_seconds': time.perf_counter() - started,
+        'iterations': int(retvals.get('iterations', 0)),
+        'converged': bool(retvals.get('converged', mode == 'extend')),
+        'params': [float(p) for p in results.params] if _usable(results) else None,
+        'fitted_on': fitted_on,
+    }
+    return (results if _usable(results) else None), stats
+
+
+def summarize_fits(fit_stats, slowest=5):
+    """実行全体のフィット統計を表示用の行リストに整形"""
+    if not fit_stats:
+        return ["ARIMAフィットなし"]
+    by_mode = {}
+    for s in fit_stats.values():
+        by_mode[s['mode']] = by_mode.get(s['mode'], 0) + 1
+    seconds = sorted(s['fit_seconds'] for s in fit_stats.values())
+    fitted = [s['iterations'] for s in fit_stats.values() if s['mode'] in ('warm', 'cold')]
+    p95 = seconds[max(int(len(seconds) * 0.95) - 1, 0)]
+
+    lines = [
+        "モード別: " + ", ".join(f"{m}={n}" for m, n in sorted(by_mode.items())),
+        f"フィット時間: 合計{sum(seconds):.1f}秒 / 平均{sum(seconds) / len(seconds) * 1000:.1f}ms "
+        f"/ p95 {p95 * 1000:.1f}ms",
+    ]
+    if fitted:
+        lines.append(f"反復回数（warm/cold）: 平均{sum(fitted) / len(fitted):.1f} / 最大{max(fitted)}")
+    worst = sorted(fit_stats.items(), key=lambda kv: kv[1]['fit_seconds'], reverse=True)[:slowest]
+    lines.append("遅い銘柄: " + ", ".join(
+        f"{symbol}({s['mode']}, {s['fit_seconds'] * 1000:.0f}ms, {s['iterations']}it)" for symbol, s in worst
+    ))
+    return lines
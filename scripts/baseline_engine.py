@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+移動平均・トレンド・アンサンブル加重のベクトル化エンジン
+symbols × days の終値行列（price_loader.PriceMatrix と同じ右寄せ・NaN埋め）に対して、
+銘柄ごとの generate_ma_prediction / calculate_ensemble_prediction と同じ値を配列演算で計算する
+
+欠損は NaN で表す（per-symbol 版の None に対応）
+"""
+import numpy as np
+
+# アンサンブルの重み（LSTM, ARIMA, 移動平均）
+ENSEMBLE_WEIGHTS = (0.5, 0.3, 0.2)
+
+
+def generate_ma_prediction(prices, window=5):
+    """移動平均予測を生成"""
+    try:
+        if len(prices) < window:
+            return None
+
+        # 単純移動平均
+        ma = np.mean(prices[-window:])
+
+        # トレンド計算（直近5日の傾向）
+        if len(prices) >= window + 5:
+            trend = (prices[-1] - prices[-window]) / window
+            return float(ma + trend)
+        else:
+            return float(ma)
+    except Exception:
+        return None
+
+
+def calculate_ensemble_prediction(lstm_pred, arima_pred, ma_pred, current_price):
+    """信頼度加重平均でアンサンブル予測を計算"""
+    predictions = []
+    weights = []
+
+    # LSTM予測（重み: 0.5）
+    if lstm_pred and lstm_pred > 0:
+        predictions.append(float(lstm_pred))
+        weights.append(0.5)
+
+    # ARIMA予測（重み: 0.3）
+    if arima_pred and arima_pred > 0:
+        predictions.append(float(arima_pred))
+        weights.append(0.3)
+
+    # 移動平均予測（重み: 0.2）
+    if ma_pred and ma_pred > 0:
+        predictions.append(float(ma_pred))
+        weights.append(0.2)
+
+    if not predictions:
+        return None, 0.0
+
+    # 重みを正規化
+    total_weight = sum(weights)
+    normalized_weights = [w / total_weight for w in weights]
+
+    # 加重平均
+    ensemble = sum(p * w for p, w in zip(predictions, normalized_weights))
+
+    # 信頼度計算（予測数が多いほど高い、予測のばらつきが小さいほど高い）
+    confidence = len(predictions) / 3.0  # 最大3つの予測
+
+    # ばらつき係数（標準偏差/平均）
+    if len(predictions) > 1:
+        std = float(np.std(predictions))
+        mean = float(np.mean(predictions))
+        cv = std / mean if mean > 0 else 1.0
+        confidence *= (1.0 - min(cv, 0.5))  # ばらつきが大きいと信頼度低下
+
+    # 現在価格との乖離チェック（大きすぎる予測は信頼度を下げる）
+    if current_price > 0:
+        change_pct = abs(ensemble - current_price) / current_price
+        if change_pct > 0.2:  # 20%以上の変動
+            confidence *= 0.5
+
+    return float(ensemble), float(min(confidence, 1.0))
+
+
+def ma_matrix(values, lengths, window=5):
+    """
+    全銘柄の移動平均予測 (symbols,)
+    values: 右寄せの終値行列、lengths: 各行の有効日数。window 日未満は NaN
+    """
+    values = np.asarray(values, dtype=np.float64)
+    lengths = np.asarray(lengths)
+    if values.shape[1] < window:
+        return np.full(values.shape[0], np.nan)
+
+    ma = np.mean(values[:, -window:], axis=1)
+    # トレンド（直近 window 日の傾き）は window + 5 日以上ある銘柄のみ
+    trend = (values[:, -1] - values[:, -window]) / window
+    result = np.where(lengths >= window + 5, ma + trend, ma)
+    return np.where(lengths >= window, result, np.nan)
+
+
+def ensemble_matrix(lstm, arima, ma, current):
+    """
+    信頼度加重アンサンブル（calculate_ensemble_prediction の配列版）
+    引数はブロードキャスト可能な float 配列（例: lstm/arima が (symbols, horizons)、ma/current が (symbols, 1)）
+
+    Returns:
+        tuple: (ensemble, confidence)  予測がひとつもない要素は ensemble=NaN, confidence=0.0
+    """
+    preds = np.broadcast_arrays(*(np.asarray(p, dtype=np.float64) for p in (lstm, arima, ma)))
+    current = np.asarray(current, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # NaN > 0 は False なので欠損は自然に除外される（0 以下も per-symbol 版と同じく除外）
+        masks = [p > 0 for p in preds]
+        count = sum(m.astype(np.int64) for m in masks)
+
+        # 重みの正規化・加重平均は per-symbol 版と同じ加算順（欠損は 0.0 を足すだけ）
+        total_weight = 0.0
+        for m, w in zip(masks, ENSEMBLE_WEIGHTS):
+            total_weight = total_weight + np.where(m, w, 0.0)
+        ensemble = 0.0
+        for p, m, w in zip(preds, masks, ENSEMBLE_WEIGHTS):
+            ensemble = ensemble + np.where(m, p * (w / total_weight), 0.0)
+
+        confidence = count / 3.0
+
+        # ばらつき係数（母標準偏差 / 平均）
+        total = 0.0
+        for p, m in zip(preds, masks):
+            total = total + np.where(m, p, 0.0)
+        mean = total / count
+        squares = 0.0
+        for p, m in zip(preds, masks):
+            squares = squares + np.where(m, (p - mean) * (p - mean), 0.0)
+        std = np.sqrt(squares / count)
+        cv = np.where(mean > 0, std / mean, 1.0)
+        confidence = np.where(count > 1, confidence * (1.0 - np.minimum(cv, 0.5)), confidence)
+
+        # 現在価格との乖離チェック（20%以上の変動は信頼度半減）
+        change_pct = np.abs(ensemble - current) / current
+        confidence = np.where((current > 0) & (change_pct > 0.2), confidence * 0.5, confidence)
+
+        has_prediction = count > 0
+        ensemble = np.where(has_prediction, ensemble, np.nan)
+        confidence = np.where(has_prediction, np.minimum(confidence, 1.0), 0.0)
+    return ensemble, confidence
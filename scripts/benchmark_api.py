@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+APIスループット計測スクリプト
+同じエンドポイント群に同時リクエストを投げ、DB_MODE=sync / async のデプロイを比較する
+
+使い方:
+    # 1. 同期モードで起動して計測
+    DB_MODE=sync uvicorn api_predictions:app --port 8080
+    python scripts/benchmark_api.py --url http://localhost:8080 --label sync
+
+    # 2. 非同期モードで起動して計測
+    DB_MODE=async uvicorn api_predictions:app --port 8080
+    python scripts/benchmark_api.py --url http://localhost:8080 --label async
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_PATHS = [
+    "/api/home/stats/summary",
+    "/api/home/rankings/gainers?limit=50",
+    "/api/home/rankings/losers?limit=50",
+    "/api/home/rankings/volume?limit=50",
+    "/api/home/rankings/predictions?limit=50",
+    "/api/stocks/AAPL/details",
+    "/api/stocks/AAPL/price?days=365",
+    "/api/stocks/AAPL/predictions?days=365&limit=100",
+]
+
+
+def run_benchmark(base_url, paths, total_requests, concurrency, timeout=30):
+    """concurrency並列で total_requests 件を投げ、レイテンシとスループットを返す"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def hit(i):
+        path = paths[i % len(paths)]
+        start = time.perf_counter()
+        try:
+            response = session.get(base_url + path, timeout=timeout)
+            ok = response.status_code < 500
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(hit, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(r[0] * 1000 for r in results)
+    errors = sum(1 for r in results if not r[1])
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(total_requests / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 1),
+        "max_ms": round(latencies[-1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Miraikakaku API benchmark")
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--label", default="", help="結果の見出し (例: sync / async)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--path", action="append", help="計測対象パス（複数指定可）")
+    args = parser.parse_args()
+
+    paths = args.path or DEFAULT_PATHS
+    base_url = args.url.rstrip("/")
+
+    print("=" * 80)
+    print(f"📊 API Benchmark {args.label} ({base_url})")
+    print("=" * 80)
+
+    # ウォームアップ（プール・キャッシュの初期化）
+    run_benchmark(base_url, paths, len(paths), 1)
+
+    print(f"{'conc':>6} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'errors':>7}")
+    for concurrency in args.concurrency:
+        r = run_benchmark(base_url, paths, args.requests, concurrency)
+        print(f"{r['concurrency']:>6} {r['rps']:>9} {r['p50_ms']:>8}ms {r['p95_ms']:>8}ms "
+              f"{r['p99_ms']:>8}ms {r['max_ms']:>8}ms {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
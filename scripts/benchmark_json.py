@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+JSONシリアライズ計測スクリプト
+1000行の予測/価格ペイロードで、従来経路（jsonable_encoder + JSONResponse）と
+orjson経路（fast_json.json_response）のレンダリング時間を比較する
+--columnar で価格履歴の行形式と列形式（/price/columnar）のサイズ・パース時間も比較する
+
+使い方:
+    python scripts/benchmark_json.py --rows 1000 --iterations 200
+    python scripts/benchmark_json.py --rows 1825 --columnar
+"""
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from api_formatters import format_prediction_row, format_price_columns, format_price_row  # noqa: E402
+from arrow_ipc import ARROW_AVAILABLE, price_columns_to_ipc  # noqa: E402
+from fast_json import json_response  # noqa: E402
+
+
+def make_price_rows(n):
+    start = date(2025, 1, 1)
+    return [{
+        "date": start - timedelta(days=i),
+        "open_price": Decimal("123.4500") + i,
+        "high_price": Decimal("125.1000") + i,
+        "low_price": Decimal("121.9900") + i,
+        "close_price": Decimal("124.0100") + i,
+        "volume": 1_000_000 + i,
+    } for i in range(n)]
+
+
+def make_prediction_rows(n):
+    start = date(2025, 1, 1)
+    return [{
+        "symbol": "AAPL",
+        "prediction_date": start - timedelta(days=i // 4),
+        "prediction_days": (1, 3, 7, 14)[i % 4],
+        "current_price": Decimal("124.0100"),
+        "lstm_prediction": Decimal("125.5000"),
+        "arima_prediction": Decimal("124.9000"),
+        "ma_prediction": Decimal("124.2000"),
+        "ensemble_prediction": Decimal("125.0333"),
+        "ensemble_confidence": Decimal("0.8125"),
+        "created_at": datetime(2025, 1, 1, 2, 0),
+    } for i in range(n)]
+
+
+def legacy_path(payload):
+    """ハンドラがdictを返した場合にFastAPIが行う処理"""
+    return JSONResponse(content=jsonable_encoder(payload)).body
+
+
+def fast_path(payload):
+    return json_response(payload).body
+
+
+def measure(fn, build, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(build())
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"  {name:<8} mean={statistics.mean(timings):7.3f}ms  p50={statistics.median(timings):7.3f}ms  p95={p95:7.3f}ms")
+    return statistics.mean(timings)
+
+
+def compare_columnar(price_rows, iterations):
+    """行形式と列形式のペイロードサイズ・クライアント側パース時間"""
+    columns = format_price_columns(price_rows)
+    payloads = {
+        "rows": fast_path([format_price_row(r) for r in price_rows]),
+        "columns": fast_path({"symbol": "AAPL", "count": len(price_rows), "columns": columns}),
+    }
+    if ARROW_AVAILABLE:
+        payloads["arrow"] = price_columns_to_ipc(columns)
+
+    print(f"price history layouts ({len(price_rows)} rows)")
+    for name, body in payloads.items():
+        line = f"  {name:<8} bytes={len(body):>8}  gzip={len(gzip.compress(body)):>7}"
+        if name != "arrow":
+            parse = [0.0] * iterations
+            for i in range(iterations):
+                start = time.perf_counter()
+                json.loads(body)
+                parse[i] = (time.perf_counter() - start) * 1000
+            line += f"  json.loads={statistics.mean(parse):6.3f}ms"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON serialization paths for bulk endpoints")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--columnar", action="store_true", help="also compare row vs columnar price payloads")
+    args = parser.parse_args()
+
+    price_rows = make_price_rows(args.rows)
+    prediction_rows = make_prediction_rows(args.rows)
+    cases = {
+        "price": lambda: [format_price_row(r) for r in price_rows],
+        "predictions": lambda: {
+            "symbol": "AAPL",
+            "pagination": {"page": 1, "limit": args.rows, "total": args.rows, "total_pages": 1, "next_cursor": None},
+            "predictions": [format_prediction_row(r) for r in prediction_rows],
+        },
+    }
+
+    for name, build in cases.items():
+        payload = build()
+        if json.loads(legacy_path(payload)) != json.loads(fast_path(payload)):
+            raise SystemExit(f"{name}: fast path output differs from legacy path")
+
+        print(f"{name} ({args.rows} rows, {args.iterations} iterations, row formatting included)")
+        legacy = report("legacy", measure(legacy_path, build, args.iterations))
+        fast = report("orjson", measure(fast_path, build, args.iterations))
+        print(f"  speedup  x{legacy / fast:.2f}")
+
+    if args.columnar:
+        compare_columnar(price_rows, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+NewsEnhancedLSTM 推論スループット計測スクリプト
+銘柄ごとに model.predict を呼ぶ従来経路（predict）と、全銘柄を1つのテンソルに
+まとめて1回だけ順伝播する経路（predict_many）の symbols/sec を比較する
+
+既定は未学習モデル + 合成入力で順伝播のみを計測（DB不要）
+--model を指定すると学習済みモデルで DB からの読み込みを含むエンドツーエンドを計測する
+
+使い方:
+    python scripts/benchmark_lstm_inference.py --symbols 500
+    python scripts/benchmark_lstm_inference.py --model models/news_lstm.keras --symbols AAPL,MSFT,GOOGL
+    python scripts/benchmark_lstm_inference.py --model models/news_lstm.tflite --symbols AAPL,MSFT,GOOGL
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "ml-models"))
+
+from news_enhanced_lstm import NewsEnhancedLSTM  # noqa: E402
+
+
+def db_config():
+    return {
+        "host": os.getenv("POSTGRES_HOST", "localhost"),
+        "port": int(os.getenv("POSTGRES_PORT", 5433)),
+        "database": os.getenv("POSTGRES_DB", "miraikakaku"),
+        "user": os.getenv("POSTGRES_USER", "postgres"),
+        "password": os.getenv("POSTGRES_PASSWORD", "Miraikakaku2024!"),
+    }
+
+
+def report(name, count, seconds):
+    print(f"  {name:<10} {seconds:8.3f}s  {count / seconds:10.1f} symbols/sec")
+    return seconds
+
+
+def forward_only(model, n, batch_size):
+    """合成入力で batch=1 のループと1回のバッチ順伝播を比較"""
+    rng = np.random.default_rng(0)
+    X_price = rng.standard_normal((n, model.price_sequence_length, 1))
+    X_news = rng.standard_normal((n, model.news_feature_dim))
+    model.build_model()
+    # 初回呼び出しのグラフ構築を計測から除く
+    model.model.predict({"price_sequence": X_price[:1], "news_features": X_news[:1]}, verbose=0)
+
+    print(f"forward pass only ({n} symbols, untrained model)")
+    start = time.perf_counter()
+    single = [
+        model.model.predict({"price_sequence": X_price[i:i + 1], "news_features": X_news[i:i + 1]}, verbose=0)[0][0]
+        for i in range(n)
+    ]
+    per_symbol = report("per-symbol", n, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batched = model.model.predict(
+        {"price_sequence": X_price, "news_features": X_news}, batch_size=batch_size, verbose=0
+    )[:, 0]
+    many = report("batched", n, time.perf_counter() - start)
+
+    print(f"  speedup    x{per_symbol / many:.1f}  max |diff|={np.max(np.abs(np.array(single) - batched)):.2e}")
+
+
+def end_to_end(model, symbols, batch_size):
+    """DB 読み込みを含む predict と predict_many の比較"""
+    print(f"end to end ({len(symbols)} symbols)")
+    start = time.perf_counter()
+    single = {}
+    for symbol in symbols:
+        try:
+            single[symbol] = model.predict(symbol)
+        except ValueError as e:
+            single[symbol] = {"error": str(e)}
+    per_symbol = report("predict", len(symbols), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batched = model.predict_many(symbols, batch_size=batch_size)
+    many = report("predict_many", len(symbols), time.perf_counter() - start)
+
+    diffs = [
+        abs(single[s]["predicted_price"] - batched[s]["predicted_price"])
+        for s in symbols if "predicted_price" in single[s] and "predicted_price" in batched[s]
+    ]
+    print(f"  speedup    x{per_symbol / many:.1f}  max |diff|={max(diffs, default=0.0):.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-symbol and batched NewsEnhancedLSTM inference")
+    parser.add_argument("--symbols", default="500", help="銘柄数（合成入力）またはカンマ区切りの銘柄コード")
+    parser.add_argument("--model", help="学習済みモデル（.keras/.h5 または .tflite。指定時はDBを使うエンドツーエンド計測）")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    model = NewsEnhancedLSTM(db_config())
+    if args.model:
+        model.load_model(args.model)
+        symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+        end_to_end(model, symbols, args.batch_size)
+    else:
+        forward_only(model, int(args.symbols), args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
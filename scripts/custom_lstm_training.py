@@ -1,24 +1,26 @@
 """
 Custom LSTM Model Training System
 Phase 12: Machine Learning Integration
+
+TensorFlow is imported only for training and Keras model loading;
+load_model('models/{symbol}_lstm_model.tflite') predicts with
+lite_inference.LiteModel instead.
 """
 
 import numpy as np
 import pandas as pd
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout, BatchNormalization
-from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.model_selection import TimeSeriesSplit
 import psycopg2
-from psycopg2.extras import RealDictCursor
 import os
 from datetime import datetime, timedelta
 import json
 import pickle
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'ml-models'))
+from lite_inference import LiteModel, export_tflite, model_version
+from price_loader import PRICE_COLUMNS, load_price_frame
 
 # Database configuration
 DB_CONFIG = {
@@ -29,6 +31,15 @@ DB_CONFIG = {
     'password': os.getenv('POSTGRES_PASSWORD', 'Miraikakaku2024!')
 }
 
+# モデル入力の特徴量（列順はスケーラーと一致させる）
+FEATURE_COLUMNS = [
+    'open_price', 'high_price', 'low_price', 'close_price', 'volume',
+    'SMA_5', 'SMA_10', 'SMA_20', 'SMA_50',
+    'EMA_12', 'EMA_26', 'MACD', 'MACD_signal', 'MACD_hist',
+    'RSI', 'BB_middle', 'BB_upper', 'BB_lower',
+    'volatility', 'volume_ratio', 'returns', 'returns_5'
+]
+
 
 class CustomLSTMTrainer:
     """
@@ -45,14 +56,19 @@ class CustomLSTMTrainer:
         self,
         symbol: str,
         lookback_days: int = 60,
-        prediction_days: int = 7
+        prediction_days: int = 7,
+        price_frame: pd.DataFrame = None
     ):
         self.symbol = symbol
+        # load_price_frame の結果（複数銘柄分）。指定時は fetch_training_data でDBに行かない
+        self.price_frame = price_frame
         self.lookback_days = lookback_days
         self.prediction_days = prediction_days
         self.scaler = MinMaxScaler(feature_range=(0, 1))
         self.model = None
         self.history = None
+        # 保存・読み込みしたモデルのバージョン（.tflite のサイドカーと照合する）
+        self.version = None
 
     def fetch_training_data(self, start_date: str = None, end_date: str = None):
         """
@@ -65,34 +81,28 @@ class CustomLSTMTrainer:
         Returns:
             DataFrame with price history and technical indicators
         """
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
         if not start_date:
             start_date = (datetime.now() - timedelta(days=3*365)).strftime('%Y-%m-%d')
         if not end_date:
             end_date = datetime.now().strftime('%Y-%m-%d')
 
-        query = """
-            SELECT
-                date,
-                open_price,
-                high_price,
-                low_price,
-                close_price,
-                volume
-            FROM stock_prices
-            WHERE symbol = %s
-              AND date BETWEEN %s AND %s
-            ORDER BY date ASC
-        """
-
-        cur.execute(query, (self.symbol, start_date, end_date))
-        data = cur.fetchall()
-        cur.close()
-        conn.close()
-
-        df = pd.DataFrame(data)
+        if self.price_frame is not None and self.symbol in self.price_frame.index.get_level_values('symbol'):
+            # train_multiple_symbols で一括取得済みの全銘柄フレームから切り出す
+            frame = self.price_frame.loc[self.symbol]
+            frame = frame.loc[start_date:end_date]
+        else:
+            conn = psycopg2.connect(**DB_CONFIG)
+            try:
+                frame = load_price_frame(
+                    conn, [self.symbol], columns=PRICE_COLUMNS,
+                    start_date=start_date, end_date=end_date
+                ).loc[self.symbol]
+            except KeyError:
+                frame = pd.DataFrame(columns=list(PRICE_COLUMNS))
+            finally:
+                conn.close()
+
+        df = frame.reset_index()
 
         if len(df) < self.lookback_days:
             raise ValueError(f"Insufficient data: {len(df)} days (need at least {self.lookback_days})")
@@ -163,16 +173,7 @@ class CustomLSTMTrainer:
             X: (samples, timesteps, features)
             y: (samples, prediction_days)
         """
-        # 特徴量を選択
-        feature_columns = [
-            'open_price', 'high_price', 'low_price', 'close_price', 'volume',
-            'SMA_5', 'SMA_10', 'SMA_20', 'SMA_50',
-            'EMA_12', 'EMA_26', 'MACD', 'MACD_signal', 'MACD_hist',
-            'RSI', 'BB_middle', 'BB_upper', 'BB_lower',
-            'volatility', 'volume_ratio', 'returns', 'returns_5'
-        ]
-
-        data = df[feature_columns].values
+        data = df[FEATURE_COLUMNS].values
 
         # 正規化
         data_scaled = self.scaler.fit_transform(data)
@@ -197,6 +198,10 @@ class CustomLSTMTrainer:
         - Batch normalization
         - Dense output layer
         """
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import LSTM, Dense, Dropout, BatchNormalization
+        from tensorflow.keras.optimizers import Adam
+
         model = Sequential([
             LSTM(128, return_sequences=True, input_shape=input_shape),
             Dropout(0.2),
@@ -241,6 +246,8 @@ class CustomLSTMTrainer:
         Returns:
             Training history
         """
+        from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
+
         print(f"🚀 Training LSTM model for {self.symbol}...")
 
         # データ取得
@@ -340,16 +347,7 @@ class CustomLSTMTrainer:
         # 技術指標計算
         df = self.calculate_technical_indicators(recent_data)
 
-        # 特徴量を選択
-        feature_columns = [
-            'open_price', 'high_price', 'low_price', 'close_price', 'volume',
-            'SMA_5', 'SMA_10', 'SMA_20', 'SMA_50',
-            'EMA_12', 'EMA_26', 'MACD', 'MACD_signal', 'MACD_hist',
-            'RSI', 'BB_middle', 'BB_upper', 'BB_lower',
-            'volatility', 'volume_ratio', 'returns', 'returns_5'
-        ]
-
-        data = df[feature_columns].values[-self.lookback_days:]
+        data = df[FEATURE_COLUMNS].values[-self.lookback_days:]
         data_scaled = self.scaler.transform(data)
 
         # 予測
@@ -358,19 +356,34 @@ class CustomLSTMTrainer:
 
         return predictions[0]
 
-    def save_model(self, filepath: str = None):
+    def save_model(self, filepath: str = None, version: str = None):
         """
         モデルを保存
+
+        Args:
+            filepath: 保存先（デフォルト: models/{symbol}_lstm_model.h5、
+                      version 指定時は models/{symbol}/{version}/ 以下で旧バージョンを残す）
+            version: ModelRegistry のバージョン（デフォルト: 保存時刻）
         """
+        trained_at = datetime.now()
         if filepath is None:
-            filepath = f'models/{self.symbol}_lstm_model.h5'
+            if version is None:
+                filepath = f'models/{self.symbol}_lstm_model.h5'
+            else:
+                filepath = f'models/{self.symbol}/{version}/{self.symbol}_lstm_model.h5'
 
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
         self.model.save(filepath)
 
+        # 同じパスに前回書き出した .tflite は古いモデルなので削除（新しいスケーラーと組み合わせない）
+        for suffix in ('.tflite', '_lite.json'):
+            stale_path = _artifact_path(filepath, suffix)
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+
         # スケーラーも保存
-        scaler_path = filepath.replace('.h5', '_scaler.pkl')
+        scaler_path = _artifact_path(filepath, '_scaler.pkl')
         with open(scaler_path, 'wb') as f:
             pickle.dump(self.scaler, f)
 
@@ -379,30 +392,88 @@ class CustomLSTMTrainer:
             'symbol': self.symbol,
             'lookback_days': self.lookback_days,
             'prediction_days': self.prediction_days,
-            'trained_at': datetime.now().isoformat()
+            'version': version or trained_at.strftime('%Y%m%d%H%M%S'),
+            'trained_at': trained_at.isoformat()
         }
 
-        metadata_path = filepath.replace('.h5', '_metadata.json')
+        metadata_path = _artifact_path(filepath, '_metadata.json')
         with open(metadata_path, 'w') as f:
             json.dump(metadata, f, indent=2)
+        self.version = metadata['version']
 
         print(f"✅ Model saved to {filepath}")
 
-    def load_model(self, filepath: str):
+    def sample_inputs(self, samples: int = 256) -> np.ndarray:
         """
-        モデルを読み込み
+        直近データから保存済みスケーラーで正規化した入力系列を作る
+        （export_lite のキャリブレーション・精度差分用。スケーラーは再学習しない）
         """
-        self.model = keras.models.load_model(filepath)
+        df = self.calculate_technical_indicators(self.fetch_training_data())
+        data_scaled = self.scaler.transform(df[FEATURE_COLUMNS].values)
+        starts = range(max(0, len(data_scaled) - self.lookback_days - samples + 1),
+                       len(data_scaled) - self.lookback_days + 1)
+        return np.array([data_scaled[i:i + self.lookback_days] for i in starts], dtype=np.float32)
 
-        # スケーラーを読み込み
-        scaler_path = filepath.replace('.h5', '_scaler.pkl')
-        with open(scaler_path, 'rb') as f:
-            self.scaler = pickle.load(f)
+    def export_lite(self, filepath: str = None, quantization: str = None, samples: int = 256):
+        """
+        推論用 .tflite を書き出し（スケーラー・メタデータは .h5 と共有）
+
+        Args:
+            filepath: 書き出し先（デフォルト: models/{symbol}_lstm_model.tflite）
+            quantization: None / 'float16' / 'int8'
+            samples: キャリブレーション・精度差分に使う直近系列数（0 なら計測しない）
 
+        Returns:
+            dict: 量子化方式・サイズ・Keras との精度差分
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet")
+        if filepath is None:
+            filepath = f'models/{self.symbol}_lstm_model.tflite'
+        version = self.version
+        if version is None:
+            # 共有するメタデータのバージョン（ModelRegistry はこれとサイドカーを照合する）
+            metadata_path = _artifact_path(filepath, '_metadata.json')
+            if not os.path.exists(metadata_path):
+                raise ValueError(f"No metadata at {metadata_path}; save_model() before export_lite()")
+            with open(metadata_path, 'r') as f:
+                version = model_version(json.load(f))
+
+        sample = self.sample_inputs(samples) if samples else None
+        report = export_tflite(self.model, filepath, quantization, sample, version=version)
+
+        print(f"✅ Lite model exported to {filepath} ({report['bytes'] / 1024:.0f} KiB)")
+        if report['accuracy']:
+            print(f"   max |diff| vs Keras: {report['accuracy']['max_abs_diff']:.6f}")
+        return report
+
+    def load_model(self, filepath: str):
+        """
+        モデルを読み込み（.tflite は TensorFlow を import せずに LiteModel で推論）
+        """
         # メタデータを読み込み
-        metadata_path = filepath.replace('.h5', '_metadata.json')
+        metadata_path = _artifact_path(filepath, '_metadata.json')
         with open(metadata_path, 'r') as f:
             metadata = json.load(f)
+        version = model_version(metadata)
+
+        if filepath.endswith('.tflite'):
+            model = LiteModel(filepath)
+            if model.metadata.get('version') is None or model.metadata.get('version') != version:
+                raise ValueError(
+                    f"{filepath} was exported from version {model.metadata.get('version')}, "
+                    f"but the scaler/metadata are version {version}; re-export it"
+                )
+            self.model = model
+        else:
+            from tensorflow import keras
+            self.model = keras.models.load_model(filepath)
+
+        # スケーラーを読み込み
+        scaler_path = _artifact_path(filepath, '_scaler.pkl')
+        with open(scaler_path, 'rb') as f:
+            self.scaler = pickle.load(f)
+        self.version = version
 
         print(f"✅ Model loaded from {filepath}")
         print(f"   Trained at: {metadata['trained_at']}")
@@ -410,19 +481,33 @@ class CustomLSTMTrainer:
         return metadata
 
 
+def _artifact_path(model_path: str, suffix: str) -> str:
+    """models/{symbol}_lstm_model.{h5,tflite} -> models/{symbol}_lstm_model{suffix}"""
+    return os.path.splitext(model_path)[0] + suffix
+
+
 def train_multiple_symbols(symbols: list, epochs: int = 50):
     """
     複数銘柄のモデルを一括トレーニング
     """
     results = {}
 
+    # 全銘柄の3年分のOHLCVを1回のCOPYで取得
+    start_date = (datetime.now() - timedelta(days=3*365)).strftime('%Y-%m-%d')
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        price_frame = load_price_frame(conn, symbols, columns=PRICE_COLUMNS, start_date=start_date)
+    finally:
+        conn.close()
+
     for symbol in symbols:
         print(f"\n{'='*60}")
         print(f"Training model for {symbol}")
         print(f"{'='*60}\n")
 
         try:
-            trainer = CustomLSTMTrainer(symbol=symbol, lookback_days=60, prediction_days=7)
+            trainer = CustomLSTMTrainer(symbol=symbol, lookback_days=60, prediction_days=7,
+                                        price_frame=price_frame)
             history = trainer.train(epochs=epochs, batch_size=32, validation_split=0.2)
             trainer.save_model()
 
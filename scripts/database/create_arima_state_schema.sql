@@ -0,0 +1,17 @@
+-- ============================================================
+-- Per-symbol ARIMA parameters for warm starts
+-- generate_ensemble_predictions reuses the stored parameters to
+-- filter new observations (extend) or seed a refit (warm)
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS arima_model_state (
+    symbol VARCHAR(20) PRIMARY KEY,
+    model_order VARCHAR(20) NOT NULL,
+    params DOUBLE PRECISION[] NOT NULL,
+    fitted_on DATE NOT NULL,
+    fit_mode VARCHAR(10) NOT NULL,
+    fit_seconds DOUBLE PRECISION,
+    iterations INTEGER,
+    converged BOOLEAN,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
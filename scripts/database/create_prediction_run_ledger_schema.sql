@@ -0,0 +1,39 @@
+-- ============================================================
+-- Prediction batch run ledger (checkpoints)
+-- Lets generate_ensemble_predictions resume a stopped run and
+-- regenerate only symbols with newer prices (--only-stale)
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS prediction_runs (
+    run_id BIGSERIAL PRIMARY KEY,
+    script VARCHAR(50) NOT NULL,
+    run_date DATE NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'running',
+    total_symbols INTEGER,
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Latest unfinished run for a script and day (resume lookup)
+CREATE INDEX IF NOT EXISTS idx_prediction_runs_script_date
+ON prediction_runs (script, run_date, run_id DESC);
+
+-- One row per symbol x horizon; failed rows are retried by the next run
+CREATE TABLE IF NOT EXISTS prediction_run_ledger (
+    run_id BIGINT NOT NULL REFERENCES prediction_runs(run_id) ON DELETE CASCADE,
+    symbol VARCHAR(20) NOT NULL,
+    prediction_days INTEGER NOT NULL,
+    status VARCHAR(10) NOT NULL,
+    completed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (run_id, symbol, prediction_days)
+);
+
+-- Latest stock_prices.date each job's predictions were based on
+CREATE TABLE IF NOT EXISTS prediction_price_dates (
+    script VARCHAR(50) NOT NULL,
+    symbol VARCHAR(20) NOT NULL,
+    price_date DATE NOT NULL,
+    run_id BIGINT,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (script, symbol)
+);
@@ -0,0 +1,87 @@
+-- ============================================================
+-- Per-symbol ensemble_predictions counters
+-- Cheap counts / change markers for /api/stocks/{symbol}/predictions
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS ensemble_prediction_stats (
+    symbol VARCHAR(20) PRIMARY KEY,
+    total_rows BIGINT NOT NULL DEFAULT 0,
+    min_prediction_date DATE,
+    max_prediction_date DATE,
+    last_modified TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Statement-level triggers with transition tables: one upsert per symbol per
+-- statement instead of one per row, so the nightly bulk writes stay cheap.
+CREATE OR REPLACE FUNCTION ensemble_prediction_stats_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO ensemble_prediction_stats AS s
+        (symbol, total_rows, min_prediction_date, max_prediction_date, last_modified)
+    SELECT symbol, COUNT(*), MIN(prediction_date), MAX(prediction_date), CURRENT_TIMESTAMP
+    FROM new_rows
+    GROUP BY symbol
+    ON CONFLICT (symbol) DO UPDATE SET
+        total_rows = s.total_rows + EXCLUDED.total_rows,
+        min_prediction_date = LEAST(s.min_prediction_date, EXCLUDED.min_prediction_date),
+        max_prediction_date = GREATEST(s.max_prediction_date, EXCLUDED.max_prediction_date),
+        last_modified = EXCLUDED.last_modified;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ensemble_prediction_stats_on_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE ensemble_prediction_stats s
+    SET last_modified = CURRENT_TIMESTAMP
+    WHERE s.symbol IN (SELECT DISTINCT symbol FROM new_rows);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ensemble_prediction_stats_on_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- min/max dates are left as-is; they only bound the count estimate
+    UPDATE ensemble_prediction_stats s
+    SET total_rows = GREATEST(s.total_rows - d.deleted, 0),
+        last_modified = CURRENT_TIMESTAMP
+    FROM (SELECT symbol, COUNT(*) AS deleted FROM old_rows GROUP BY symbol) d
+    WHERE s.symbol = d.symbol;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_ensemble_prediction_stats_insert ON ensemble_predictions;
+CREATE TRIGGER trg_ensemble_prediction_stats_insert
+    AFTER INSERT ON ensemble_predictions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION ensemble_prediction_stats_on_insert();
+
+DROP TRIGGER IF EXISTS trg_ensemble_prediction_stats_update ON ensemble_predictions;
+CREATE TRIGGER trg_ensemble_prediction_stats_update
+    AFTER UPDATE ON ensemble_predictions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION ensemble_prediction_stats_on_update();
+
+DROP TRIGGER IF EXISTS trg_ensemble_prediction_stats_delete ON ensemble_predictions;
+CREATE TRIGGER trg_ensemble_prediction_stats_delete
+    AFTER DELETE ON ensemble_predictions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION ensemble_prediction_stats_on_delete();
+
+-- Backfill (idempotent: recomputes every symbol from the base table)
+INSERT INTO ensemble_prediction_stats
+    (symbol, total_rows, min_prediction_date, max_prediction_date, last_modified)
+SELECT symbol, COUNT(*), MIN(prediction_date), MAX(prediction_date), COALESCE(MAX(created_at), CURRENT_TIMESTAMP)
+FROM ensemble_predictions
+GROUP BY symbol
+ON CONFLICT (symbol) DO UPDATE SET
+    total_rows = EXCLUDED.total_rows,
+    min_prediction_date = EXCLUDED.min_prediction_date,
+    max_prediction_date = EXCLUDED.max_prediction_date,
+    last_modified = EXCLUDED.last_modified;
@@ -0,0 +1,64 @@
+-- ============================================================
+-- Per-symbol stock_prices change markers
+-- Lets the nightly prediction jobs regenerate only symbols that
+-- received new or corrected price rows since their last run
+-- ============================================================
+
+CREATE SEQUENCE IF NOT EXISTS stock_price_change_seq;
+
+CREATE TABLE IF NOT EXISTS stock_price_changes (
+    symbol VARCHAR(20) PRIMARY KEY,
+    latest_date DATE,
+    change_seq BIGINT NOT NULL,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-job, per-symbol watermark: the change_seq each job last processed.
+-- Compared per symbol, so a price load that commits late is never skipped
+-- the way a single global high-water mark could be.
+CREATE TABLE IF NOT EXISTS prediction_watermarks (
+    script VARCHAR(50) NOT NULL,
+    symbol VARCHAR(20) NOT NULL,
+    change_seq BIGINT NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (script, symbol)
+);
+
+-- Statement-level: one change_seq bump per symbol per statement, so bulk
+-- price loads (and INSERT ... ON CONFLICT DO UPDATE) stay cheap.
+CREATE OR REPLACE FUNCTION stock_price_changes_on_write()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO stock_price_changes AS c (symbol, latest_date, change_seq, changed_at)
+    SELECT symbol, MAX(date), nextval('stock_price_change_seq'), CURRENT_TIMESTAMP
+    FROM new_rows
+    GROUP BY symbol
+    ON CONFLICT (symbol) DO UPDATE SET
+        latest_date = GREATEST(c.latest_date, EXCLUDED.latest_date),
+        change_seq = EXCLUDED.change_seq,
+        changed_at = EXCLUDED.changed_at;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_stock_price_changes_insert ON stock_prices;
+CREATE TRIGGER trg_stock_price_changes_insert
+    AFTER INSERT ON stock_prices
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION stock_price_changes_on_write();
+
+DROP TRIGGER IF EXISTS trg_stock_price_changes_update ON stock_prices;
+CREATE TRIGGER trg_stock_price_changes_update
+    AFTER UPDATE ON stock_prices
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION stock_price_changes_on_write();
+
+-- Backfill (idempotent: existing markers are kept, so applying the schema
+-- again does not force every symbol to be regenerated)
+INSERT INTO stock_price_changes (symbol, latest_date, change_seq, changed_at)
+SELECT symbol, MAX(date), nextval('stock_price_change_seq'), CURRENT_TIMESTAMP
+FROM stock_prices
+GROUP BY symbol
+ON CONFLICT (symbol) DO NOTHING;
@@ -0,0 +1,77 @@
+-- ============================================================
+-- Daily sentiment feature store
+-- One row per (symbol, as_of_date) with the nine NewsFeatureExtractor
+-- features over stock_news published in [as_of_date - 7 days, as_of_date]
+-- (midnight to midnight). Training, batch prediction and the API read it
+-- with a point lookup instead of aggregating stock_news on demand.
+-- Rows are only stored for windows that contain news; a missing row means
+-- the zero feature vector.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS sentiment_features_daily (
+    symbol VARCHAR(20) NOT NULL,
+    as_of_date DATE NOT NULL,
+    avg_sentiment DOUBLE PRECISION NOT NULL,
+    sentiment_std DOUBLE PRECISION NOT NULL,
+    bullish_ratio DOUBLE PRECISION NOT NULL,
+    bearish_ratio DOUBLE PRECISION NOT NULL,
+    neutral_ratio DOUBLE PRECISION NOT NULL,
+    news_count INTEGER NOT NULL,
+    sentiment_trend DOUBLE PRECISION NOT NULL,
+    max_sentiment DOUBLE PRECISION NOT NULL,
+    min_sentiment DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (symbol, as_of_date)
+);
+
+-- Per-symbol as_of_date range whose rows must be recomputed
+-- (filled by the stock_news triggers, drained by sentiment_feature_store.refresh_dirty)
+CREATE TABLE IF NOT EXISTS sentiment_feature_dirty (
+    symbol VARCHAR(20) PRIMARY KEY,
+    from_date DATE NOT NULL,
+    to_date DATE NOT NULL,
+    marked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Statement-level: an article published at p affects the rows dated
+-- p::date .. p::date + 7, so one bulk merge marks one range per symbol.
+-- Deletes (stock_master cascades) are not tracked; rebuild those symbols
+-- with sentiment_feature_store.refresh_symbols.
+CREATE OR REPLACE FUNCTION sentiment_feature_dirty_on_write()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO sentiment_feature_dirty AS d (symbol, from_date, to_date, marked_at)
+    SELECT symbol, MIN(published_at)::date, MAX(published_at)::date + 7, CURRENT_TIMESTAMP
+    FROM new_rows
+    WHERE published_at IS NOT NULL
+    GROUP BY symbol
+    ON CONFLICT (symbol) DO UPDATE SET
+        from_date = LEAST(d.from_date, EXCLUDED.from_date),
+        to_date = GREATEST(d.to_date, EXCLUDED.to_date),
+        marked_at = EXCLUDED.marked_at;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_sentiment_feature_dirty_insert ON stock_news;
+CREATE TRIGGER trg_sentiment_feature_dirty_insert
+    AFTER INSERT ON stock_news
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION sentiment_feature_dirty_on_write();
+
+DROP TRIGGER IF EXISTS trg_sentiment_feature_dirty_update ON stock_news;
+CREATE TRIGGER trg_sentiment_feature_dirty_update
+    AFTER UPDATE ON stock_news
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION sentiment_feature_dirty_on_write();
+
+-- Backfill: mark every symbol's full news history (idempotent; the next
+-- refresh builds the rows)
+INSERT INTO sentiment_feature_dirty (symbol, from_date, to_date)
+SELECT symbol, MIN(published_at)::date, MAX(published_at)::date + 7
+FROM stock_news
+WHERE published_at IS NOT NULL
+GROUP BY symbol
+ON CONFLICT (symbol) DO NOTHING;
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ensemble_predictions 一括書き込み
+行を COPY で一時テーブルにストリームし、チェックポイントごとに1文の集合演算 upsert で反映する
+
+使い方:
+    writer = EnsembleWriter(conn)
+    writer.stage(rows)          # 何度でも（同じキーは後からステージした行を採用）
+    report = writer.merge()     # 1文の INSERT ... ON CONFLICT DO UPDATE + COMMIT（累計レポート）
+    writer.rollback()           # エラー時: 未マージの行を破棄
+"""
+import csv
+import io
+import time
+
+STAGING_TABLE = "ensemble_predictions_staging"
+
+COLUMNS = (
+    "symbol", "prediction_date", "prediction_days", "current_price",
+    "lstm_prediction", "arima_prediction", "ma_prediction",
+    "ensemble_prediction", "ensemble_confidence",
+)
+
+
+class EnsembleWriter:
+    """
+    COPY + 集合演算 upsert による ensemble_predictions ライター
+    stage() した行は merge() で同じトランザクションの他の書き込みと一緒にコミットされる
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows_staged = 0
+        self.inserted = 0
+        self.updated = 0
+        self.copy_seconds = 0.0
+        self.merge_seconds = 0.0
+        self._pending = 0
+        self._started = time.perf_counter()
+        with conn.cursor() as cur:
+            # 本テーブルと同じ列型で作成（行の型変換はCOPY時にサーバー側で行う）
+            cur.execute(f"""
+                CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} AS
+                SELECT {', '.join(COLUMNS)}
+                FROM ensemble_predictions
+                WITH NO DATA
+            """)
+            # COPY した順の連番（同じキーが複数回ステージされたら最後の行を採用する）
+            cur.execute(f"ALTER TABLE {STAGING_TABLE} ADD COLUMN IF NOT EXISTS staged_seq BIGSERIAL")
+            cur.execute(f"TRUNCATE {STAGING_TABLE}")
+        # 一時テーブルはセッション中残す（以降のロールバックで消えないよう作成時点でコミット）
+        conn.commit()
+
+    def stage(self, rows):
+        """行タプル（COLUMNS順）を COPY で一時テーブルへ送る"""
+        if not rows:
+            return 0
+        started = time.perf_counter()
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in rows:
+            writer.writerow(["" if v is None else v for v in row])
+        buf.seek(0)
+        with self.conn.cursor() as cur:
+            cur.copy_expert(
+                f"COPY {STAGING_TABLE} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf
+            )
+        self._pending += len(rows)
+        self.copy_seconds += time.perf_counter() - started
+        return len(rows)
+
+    def merge(self):
+        """一時テーブルを1文で upsert してコミットし、実行開始からの累計レポートを返す"""
+        started = time.perf_counter()
+        updates = ",\n                ".join(
+            f"{c} = EXCLUDED.{c}" for c in COLUMNS[3:]
+        )
+        with self.conn.cursor() as cur:
+            cur.execute(f"""
+                WITH merged AS (
+                    INSERT INTO ensemble_predictions ({', '.join(COLUMNS)}, created_at)
+                    SELECT DISTINCT ON (symbol, prediction_date, prediction_days)
+                        {', '.join(COLUMNS)}, NOW()
+                    FROM {STAGING_TABLE}
+                    ORDER BY symbol, prediction_date, prediction_days, staged_seq DESC
+                    ON CONFLICT (symbol, prediction_date, prediction_days)
+                    DO UPDATE SET
+                        {updates},
+                        created_at = NOW()
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT COUNT(*) FILTER (WHERE inserted) AS inserted,
+                       COUNT(*) FILTER (WHERE NOT inserted) AS updated
+                FROM merged
+            """)
+            inserted, updated = cur.fetchone()
+            cur.execute(f"TRUNCATE {STAGING_TABLE}")
+        self.conn.commit()
+
+        self.rows_staged += self._pending
+        self._pending = 0
+        self.inserted += int(inserted)
+        self.updated += int(updated)
+        self.merge_seconds += time.perf_counter() - started
+        return self.report()
+
+    def rollback(self):
+        """トランザクションをロールバックし、未マージの行を破棄"""
+        self.conn.rollback()
+        self._pending = 0
+
+    def report(self):
+        elapsed = time.perf_counter() - self._started
+        return {
+            "rows_staged": self.rows_staged,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "copy_seconds": round(self.copy_seconds, 3),
+            "merge_seconds": round(self.merge_seconds, 3),
+            "write_seconds": round(self.copy_seconds + self.merge_seconds, 3),
+            "elapsed_seconds": round(elapsed, 3),
+        }
+
+
+def format_write_report(report):
+    """書き込みレポートを表示用の行リストに整形"""
+    write_seconds = report["write_seconds"]
+    rate = report["rows_staged"] / write_seconds if write_seconds > 0 else 0.0
+    return [
+        f"ステージング行数: {report['rows_staged']:,}",
+        f"新規挿入: {report['inserted']:,}",
+        f"更新: {report['updated']:,}",
+        f"COPY: {report['copy_seconds']:.2f}秒 / マージ: {report['merge_seconds']:.2f}秒 "
+        f"({rate:,.0f} 行/秒)",
+    ]
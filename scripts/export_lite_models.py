@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+学習済みLSTMモデルの .tflite 書き出しスクリプト
+models/{symbol}_lstm_model.h5（CustomLSTMTrainer）を同じディレクトリの
+{symbol}_lstm_model.tflite に変換し、直近データでの Keras との精度差分を表示する
+（差分は {symbol}_lstm_model_lite.json にも保存され、LiteModel.metadata で読める）
+
+使い方:
+    python scripts/export_lite_models.py --symbols AAPL,MSFT --quantize float16
+    python scripts/export_lite_models.py --all --quantize int8
+    python scripts/export_lite_models.py --news-model models/news_lstm.keras --news-symbol AAPL
+"""
+
+import argparse
+import glob
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "ml-models"))
+
+from custom_lstm_training import DB_CONFIG, CustomLSTMTrainer  # noqa: E402
+
+
+def model_symbols(model_dir):
+    suffix = "_lstm_model.h5"
+    return sorted(os.path.basename(p)[:-len(suffix)] for p in glob.glob(os.path.join(model_dir, f"*{suffix}")))
+
+
+def print_report(name, report):
+    accuracy = report["accuracy"]
+    line = f"  {name:<12} {report['bytes'] / 1024:8.0f} KiB"
+    if accuracy:
+        line += (f"  max|diff|={accuracy['max_abs_diff']:.6f}  mean|diff|={accuracy['mean_abs_diff']:.6f}"
+                 f"  max rel={accuracy['max_rel_diff']:.2%}  (n={accuracy['samples']})")
+    print(line)
+
+
+def export_custom(symbols, model_dir, quantization, samples):
+    print(f"CustomLSTMTrainer models (quantization={quantization or 'none'})")
+    failures = 0
+    for symbol in symbols:
+        h5_path = os.path.join(model_dir, f"{symbol}_lstm_model.h5")
+        try:
+            trainer = CustomLSTMTrainer(symbol=symbol)
+            metadata = trainer.load_model(h5_path)
+            trainer.lookback_days = metadata["lookback_days"]
+            trainer.prediction_days = metadata["prediction_days"]
+            report = trainer.export_lite(h5_path[:-len(".h5")] + ".tflite", quantization, samples)
+            print_report(symbol, report)
+        except Exception as e:
+            failures += 1
+            print(f"  {symbol:<12} failed: {e}")
+    return failures
+
+
+def export_news(model_path, symbol, quantization):
+    from news_enhanced_lstm import NewsEnhancedLSTM
+
+    model = NewsEnhancedLSTM(DB_CONFIG)
+    model.load_model(model_path)
+    sample = None
+    if symbol:
+        end = datetime.now()
+        sample, _ = model.prepare_training_data(symbol, end - timedelta(days=180), end)
+    report = model.export_lite(os.path.splitext(model_path)[0] + ".tflite", quantization, sample)
+    print(f"NewsEnhancedLSTM {model_path} (quantization={quantization or 'none'})")
+    print_report(symbol or "-", report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export trained LSTM models to TFLite with an accuracy report")
+    parser.add_argument("--symbols", help="カンマ区切りの銘柄コード")
+    parser.add_argument("--all", action="store_true", help="model-dir の全 *_lstm_model.h5")
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--quantize", choices=["none", "float16", "int8"], default="none")
+    parser.add_argument("--samples", type=int, default=256, help="精度差分・キャリブレーションに使う直近系列数")
+    parser.add_argument("--news-model", help="NewsEnhancedLSTM の Keras モデル")
+    parser.add_argument("--news-symbol", help="NewsEnhancedLSTM の評価データに使う銘柄")
+    args = parser.parse_args()
+
+    quantization = None if args.quantize == "none" else args.quantize
+    failures = 0
+    if args.all or args.symbols:
+        symbols = model_symbols(args.model_dir) if args.all else [s.strip() for s in args.symbols.split(",")]
+        failures = export_custom(symbols, args.model_dir, quantization, args.samples)
+    if args.news_model:
+        export_news(args.news_model, args.news_symbol, quantization)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
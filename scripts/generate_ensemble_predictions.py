@@ -5,26 +5,53 @@
 LSTM、ARIMA、移動平均の予測を統合して ensemble_predictions テーブルに保存
 
 処理フロー:
-1. 最新の株価データを取得
-2. LSTM予測を取得（stock_predictionsから）
-3. ARIMA予測を生成
-4. 移動平均予測を生成
-5. 信頼度加重平均でアンサンブル予測を作成
-6. ensemble_predictionsテーブルに保存
+1. アクティブ銘柄を取得
+2. バッチ単位で株価履歴・LSTM予測（stock_predictionsから）を一括取得
+3. プロセスプールで銘柄ごとに ARIMA を1回だけ当てはめ全ホライズンを予測
+   （前回のパラメータを arima_model_state から読み、フィルタのみ / ウォームスタート）
+4. 移動平均予測・信頼度加重アンサンブルをバッチ全銘柄まとめて行列演算で計算
+   （baseline_engine、銘柄ごとの関数と同一の結果）
+5. バッチの行を一時テーブルへCOPYし、1回の upsert で ensemble_predictionsテーブルに保存
+6. バッチごとに実行台帳（prediction_run_ledger）へ完了を記録してコミット
+   途中で停止した場合、同じ日の次の実行は完了済み銘柄をスキップして続きから再開する
+
+使い方:
+    python scripts/generate_ensemble_predictions.py --workers 8 --batch-size 500
+    python scripts/generate_ensemble_predictions.py --only-stale   # 新しい株価が入った銘柄のみ
+    python scripts/generate_ensemble_predictions.py --incremental  # 前回処理以降に株価が変わった銘柄のみ
+    python scripts/generate_ensemble_predictions.py --fresh        # 未完了の実行を再開せず新規実行
 """
+import os
+
+# 各ワーカープロセスは1コアで動かす（BLASスレッドとプロセスプールの取り合いを防ぐ）
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+import argparse
+import csv
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import sys
 import io
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 import numpy as np
-from statsmodels.tsa.arima.model import ARIMA
 import warnings
-import os
 from dotenv import load_dotenv
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import logging
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'ml-models'))
+
+from arima_state import fit_arima, load_states, save_states, summarize_fits
+from baseline_engine import ensemble_matrix, ma_matrix
+from ensemble_writer import EnsembleWriter, format_write_report
+from price_loader import load_close_matrix
+from price_watermark import advance_watermarks, select_changed_symbols
+from run_ledger import (completed_symbols, finish_run, load_stale_symbols, record_price_dates,
+                        record_results, start_run)
+
 warnings.filterwarnings('ignore')
 
 # Configure logging
@@ -50,6 +77,11 @@ DB_CONFIG = {
     'password': os.getenv('POSTGRES_PASSWORD', 'Miraikakaku2024!')
 }
 
+LEDGER_SCRIPT = "ensemble"
+PREDICTION_HORIZONS = [1, 3, 7, 14]
+HISTORY_DAYS = 60
+MIN_HISTORY = 30
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=2, max=10),
@@ -69,125 +101,28 @@ def get_active_symbols(cur):
     logger.info(f"Retrieved {len(results)} active symbols")
     return results
 
-def get_latest_price(cur, symbol):
-    """最新株価を取得"""
-    cur.execute("""
-        SELECT close_price, date
-        FROM stock_prices
-        WHERE symbol = %s
-        ORDER BY date DESC
-        LIMIT 1
-    """, (symbol,))
-    return cur.fetchone()
-
-def get_historical_prices(cur, symbol, days=60):
-    """過去N日分の株価データを取得"""
-    cur.execute("""
-        SELECT date, close_price
-        FROM stock_prices
-        WHERE symbol = %s
-        ORDER BY date DESC
-        LIMIT %s
-    """, (symbol, days))
-    results = cur.fetchall()
-    if not results:
-        return []
-    return sorted(results, key=lambda x: x['date'])
-
-def get_lstm_prediction(cur, symbol, prediction_date, prediction_days):
-    """LSTM予測を取得（stock_predictionsから）"""
-    cur.execute("""
-        SELECT predicted_price
-        FROM stock_predictions
-        WHERE symbol = %s
-          AND prediction_date = %s
-          AND prediction_days = %s
-          AND model_type IN ('LSTM_Daily', 'LSTM_Improved')
-        ORDER BY created_at DESC
-        LIMIT 1
-    """, (symbol, prediction_date, prediction_days))
-    result = cur.fetchone()
-    return float(result['predicted_price']) if result else None
-
-def generate_arima_prediction(prices, forecast_days=1):
-    """ARIMA予測を生成"""
-    try:
-        if len(prices) < 30:
-            return None
-
-        # ARIMA(1,1,1)モデル
-        model = ARIMA(prices, order=(1, 1, 1))
-        fitted = model.fit()
-        forecast = fitted.forecast(steps=forecast_days)
-        return float(forecast[-1])
-    except Exception:
-        return None
-
-def generate_ma_prediction(prices, window=5):
-    """移動平均予測を生成"""
-    try:
-        if len(prices) < window:
-            return None
-
-        # 単純移動平均
-        ma = np.mean(prices[-window:])
-
-        # トレンド計算（直近5日の傾向）
-        if len(prices) >= window + 5:
-            trend = (prices[-1] - prices[-window]) / window
-            return float(ma + trend)
-        else:
-            return float(ma)
-    except Exception:
-        return None
-
-def calculate_ensemble_prediction(lstm_pred, arima_pred, ma_pred, current_price):
-    """信頼度加重平均でアンサンブル予測を計算"""
-    predictions = []
-    weights = []
-
-    # LSTM予測（重み: 0.5）
-    if lstm_pred and lstm_pred > 0:
-        predictions.append(float(lstm_pred))
-        weights.append(0.5)
-
-    # ARIMA予測（重み: 0.3）
-    if arima_pred and arima_pred > 0:
-        predictions.append(float(arima_pred))
-        weights.append(0.3)
-
-    # 移動平均予測（重み: 0.2）
-    if ma_pred and ma_pred > 0:
-        predictions.append(float(ma_pred))
-        weights.append(0.2)
-
-    if not predictions:
-        return None, 0.0
-
-    # 重みを正規化
-    total_weight = sum(weights)
-    normalized_weights = [w / total_weight for w in weights]
-
-    # 加重平均
-    ensemble = sum(p * w for p, w in zip(predictions, normalized_weights))
-
-    # 信頼度計算（予測数が多いほど高い、予測のばらつきが小さいほど高い）
-    confidence = len(predictions) / 3.0  # 最大3つの予測
-
-    # ばらつき係数（標準偏差/平均）
-    if len(predictions) > 1:
-        std = float(np.std(predictions))
-        mean = float(np.mean(predictions))
-        cv = std / mean if mean > 0 else 1.0
-        confidence *= (1.0 - min(cv, 0.5))  # ばらつきが大きいと信頼度低下
-
-    # 現在価格との乖離チェック（大きすぎる予測は信頼度を下げる）
-    if current_price > 0:
-        change_pct = abs(ensemble - current_price) / current_price
-        if change_pct > 0.2:  # 20%以上の変動
-            confidence *= 0.5
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=2, max=10),
+    retry=retry_if_exception_type((psycopg2.OperationalError, psycopg2.DatabaseError)),
+    reraise=True
+)
+def get_stale_symbols(cur, script=LEDGER_SCRIPT):
+    """新しい株価が入った（前回の予測の基になった株価日付より新しい）アクティブ銘柄"""
+    logger.debug("Fetching stale symbols from database")
+    results = load_stale_symbols(cur, script)
+    logger.info(f"Retrieved {len(results)} stale symbols")
+    return results
 
-    return float(ensemble), float(min(confidence, 1.0))
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=2, max=10),
+    retry=retry_if_exception_type((psycopg2.OperationalError, psycopg2.DatabaseError)),
+    reraise=True
+)
+def load_price_histories(conn, symbols, days=HISTORY_DAYS):
+    """複数銘柄の直近N日分の終値を1回のCOPYで取得（symbols × days の PriceMatrix）"""
+    return load_close_matrix(conn, symbols, last_n=days)
 
 @retry(
     stop=stop_after_attempt(3),
@@ -195,85 +130,132 @@ def calculate_ensemble_prediction(lstm_pred, arima_pred, ma_pred, current_price)
     retry=retry_if_exception_type((psycopg2.OperationalError, psycopg2.DatabaseError)),
     reraise=True
 )
-def save_ensemble_prediction(cur, symbol, prediction_date, prediction_days,
-                            current_price, lstm_pred, arima_pred, ma_pred,
-                            ensemble_pred, confidence):
-    """アンサンブル予測を ensemble_predictions テーブルに保存"""
+def load_lstm_predictions(cur, symbols, prediction_configs):
+    """
+    複数銘柄・全ホライズンのLSTM予測を1クエリで取得（stock_predictionsから）
+    戻り値: {symbol: {(prediction_date, prediction_days): predicted_price}}
+    """
+    wanted = set(prediction_configs)
+    cur.execute("""
+        SELECT DISTINCT ON (symbol, prediction_date, prediction_days)
+            symbol, prediction_date, prediction_days, predicted_price
+        FROM stock_predictions
+        WHERE symbol = ANY(%s)
+          AND prediction_date = ANY(%s)
+          AND prediction_days = ANY(%s)
+          AND model_type IN ('LSTM_Daily', 'LSTM_Improved')
+        ORDER BY symbol, prediction_date, prediction_days, created_at DESC
+    """, (list(symbols), sorted({d for d, _ in wanted}), sorted({n for _, n in wanted})))
+    predictions = {}
+    for row in cur.fetchall():
+        key = (row['prediction_date'], row['prediction_days'])
+        if key in wanted:
+            predictions.setdefault(row['symbol'], {})[key] = float(row['predicted_price'])
+    return predictions
+
+def generate_arima_forecasts(prices, horizons, state=None, today=None):
+    """
+    ARIMAを1回だけ当てはめ、全ホライズンの予測を返す
+    保存済みパラメータ（state）があればフィルタのみ / ウォームスタートで済ませる
+    戻り値: ({days: price}, フィット統計 or None)
+    """
+    if len(prices) < MIN_HISTORY:
+        return {}, None
     try:
-        logger.debug(f"Saving prediction for {symbol} ({prediction_days} days ahead)")
-        cur.execute("""
-            INSERT INTO ensemble_predictions (
-                symbol, prediction_date, prediction_days, current_price,
-                lstm_prediction, arima_prediction, ma_prediction,
-                ensemble_prediction, ensemble_confidence,
-                created_at
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW()
-            )
-            ON CONFLICT (symbol, prediction_date, prediction_days)
-            DO UPDATE SET
-                current_price = EXCLUDED.current_price,
-                lstm_prediction = EXCLUDED.lstm_prediction,
-                arima_prediction = EXCLUDED.arima_prediction,
-                ma_prediction = EXCLUDED.ma_prediction,
-                ensemble_prediction = EXCLUDED.ensemble_prediction,
-                ensemble_confidence = EXCLUDED.ensemble_confidence,
-                created_at = NOW()
-        """, (symbol, prediction_date, prediction_days, current_price,
-              lstm_pred, arima_pred, ma_pred, ensemble_pred, confidence))
-        return True
-    except Exception as e:
-        logger.error(f"Failed to save prediction for {symbol}: {e}")
-        return False
-
-def process_symbol(cur, symbol, company_name, target_date, prediction_days):
-    """1銘柄の予測処理"""
-    # 最新株価取得
-    latest = get_latest_price(cur, symbol)
-    if not latest:
-        return None
-
-    current_price = float(latest['close_price'])
-
-    # 過去株価取得
-    historical = get_historical_prices(cur, symbol, days=60)
-    if len(historical) < 30:
-        return None
-
-    prices = [float(h['close_price']) for h in historical]
-
-    # 各予測を取得/生成
-    lstm_pred = get_lstm_prediction(cur, symbol, target_date, prediction_days)
-    arima_pred = generate_arima_prediction(prices, forecast_days=prediction_days)
-    ma_pred = generate_ma_prediction(prices, window=5)
-
-    # アンサンブル予測計算
-    ensemble_pred, confidence = calculate_ensemble_prediction(
-        lstm_pred, arima_pred, ma_pred, current_price
-    )
-
-    if ensemble_pred is None:
-        return None
-
-    # 保存
-    success = save_ensemble_prediction(
-        cur, symbol, target_date, prediction_days, current_price,
-        lstm_pred, arima_pred, ma_pred, ensemble_pred, confidence
-    )
-
-    return {
-        'symbol': symbol,
-        'company_name': company_name,
-        'current_price': current_price,
-        'lstm': lstm_pred,
-        'arima': arima_pred,
-        'ma': ma_pred,
-        'ensemble': ensemble_pred,
-        'confidence': confidence,
-        'success': success
-    }
+        # ARIMA(1,1,1)モデル
+        fitted, stats = fit_arima(prices, state, today)
+        if fitted is None:
+            return {}, stats
+        forecast = fitted.forecast(steps=max(horizons))
+        return {days: float(forecast[days - 1]) for days in horizons}, stats
+    except Exception:
+        return {}, None
+
+def fit_symbol(task):
+    """
+    1銘柄の ARIMA 予測（ワーカープロセスで実行、DBアクセスなし）
+    task: (symbol, prices, horizons, arima_state, today)
+          prices は終値の ndarray（日付昇順）、arima_state は保存済みARIMAパラメータ（なければ None）
+    戻り値: (symbol, {days: price}, fit_stats)
+    """
+    symbol, prices, horizons, arima_state, today = task
+    arima_preds, fit_stats = generate_arima_forecasts(prices, horizons, arima_state, today)
+    return symbol, arima_preds, fit_stats
+
+def build_batch_rows(histories, lstm_predictions, arima_predictions, prediction_configs):
+    """
+    バッチ全銘柄 × 全ホライズンの MA・アンサンブルを行列演算で計算し、行タプルにする
+    histories: PriceMatrix、arima_predictions: {symbol: {days: price}}
+    戻り値: ensemble_predictions の行タプル（履歴不足の銘柄・予測なしのホライズンは含まない）
+    """
+    symbols = histories.symbols
+    eligible = histories.lengths >= MIN_HISTORY
+    current = histories.values[:, -1]
+
+    # 欠損は NaN（per-symbol 版の None）
+    lstm = np.full((len(symbols), len(prediction_configs)), np.nan)
+    arima = np.full_like(lstm, np.nan)
+    for i, symbol in enumerate(symbols):
+        lstm_preds = lstm_predictions.get(symbol, {})
+        arima_preds = arima_predictions.get(symbol, {})
+        for j, (target_date, prediction_days) in enumerate(prediction_configs):
+            lstm[i, j] = lstm_preds.get((target_date, prediction_days), np.nan)
+            arima[i, j] = arima_preds.get(prediction_days, np.nan)
+
+    # 移動平均予測はホライズンに依存しない
+    ma = ma_matrix(histories.values, histories.lengths, window=5)
+    ensemble, confidence = ensemble_matrix(lstm, arima, ma[:, None], current[:, None])
+
+    def value(x):
+        return None if np.isnan(x) else float(x)
+
+    rows = []
+    for i, j in zip(*np.nonzero(eligible[:, None] & ~np.isnan(ensemble))):
+        target_date, prediction_days = prediction_configs[j]
+        rows.append((symbols[i], target_date, prediction_days, float(current[i]),
+                     value(lstm[i, j]), value(arima[i, j]), value(ma[i]),
+                     float(ensemble[i, j]), float(confidence[i, j])))
+    return rows
+
+def iter_forecasts(executor, tasks, workers):
+    """ワーカー1つなら同一プロセスで、それ以外はプロセスプールで ARIMA を当てはめる"""
+    if executor is None:
+        return map(fit_symbol, tasks)
+    chunksize = max(1, len(tasks) // (workers * 4))
+    return executor.map(fit_symbol, tasks, chunksize=chunksize)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate ensemble predictions for all active symbols")
+    parser.add_argument("--workers", type=int,
+                        default=int(os.getenv("ENSEMBLE_WORKERS", os.cpu_count() or 1)),
+                        help="予測プロセス数（デフォルト: CPUコア数）")
+    parser.add_argument("--batch-size", type=int,
+                        default=int(os.getenv("ENSEMBLE_BATCH_SIZE", 500)),
+                        help="1回の一括読み込み・コミットあたりの銘柄数")
+    parser.add_argument("--fit-report", default=os.getenv("ARIMA_FIT_REPORT"),
+                        help="銘柄ごとのARIMAフィット時間・反復回数をCSVに出力するパス")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--only-stale", action="store_true",
+                      help="最新の株価日付が前回の予測の基になった株価日付より新しい銘柄のみ再計算")
+    mode.add_argument("--incremental", action="store_true",
+                      help="前回の処理以降に株価が追加・修正された銘柄のみ再計算（stock_price_changes）")
+    parser.add_argument("--run-id", type=int, default=None,
+                        help="指定した実行（prediction_runs.run_id）を再開")
+    parser.add_argument("--fresh", action="store_true",
+                        help="同じ日の未完了の実行を再開せず、新しい実行を開始")
+    return parser.parse_args()
+
+def write_fit_report(path, fit_stats):
+    """銘柄ごとのフィット統計をCSVで保存"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['symbol', 'mode', 'fit_ms', 'iterations', 'converged'])
+        for symbol, s in sorted(fit_stats.items()):
+            writer.writerow([symbol, s['mode'], f"{s['fit_seconds'] * 1000:.2f}", s['iterations'], s['converged']])
 
 def main():
+    args = parse_args()
+
     print("=" * 80)
     print("アンサンブル予測統合スクリプト")
     print("=" * 80)
@@ -285,22 +267,51 @@ def main():
         conn.autocommit = False
         cur = conn.cursor(cursor_factory=RealDictCursor)
 
+        # 実行台帳（同じ日の未完了の実行があれば再開）
+        # ARIMA状態・台帳のテーブルは /admin/apply-*-schema で作成（未適用なら最初のバッチ前に止める）
+        today = datetime.now().date()
+        try:
+            load_states(cur, [])
+            run_id, resumed = start_run(cur, LEDGER_SCRIPT, today, run_id=args.run_id, fresh=args.fresh)
+        except psycopg2.errors.UndefinedTable as e:
+            print(f"\nエラー: {e}")
+            print("/admin/apply-arima-state-schema と /admin/apply-prediction-run-ledger-schema を実行してください")
+            conn.close()
+            sys.exit(1)
+        conn.commit()
+
         # アクティブ銘柄取得
         print("-" * 80)
         print("1. アクティブ銘柄取得")
         print("-" * 80)
 
-        symbols = get_active_symbols(cur)
-        print(f"対象銘柄数: {len(symbols)}")
-        print()
+        change_seqs = {}
+        if args.incremental:
+            changed = select_changed_symbols(conn, cur, LEDGER_SCRIPT)
+            if changed is not None:
+                symbols, change_seqs = changed
+            else:
+                print("stock_price_changes が未作成のため --only-stale で代替（/admin/apply-price-change-schema）")
+                args.incremental, args.only_stale = False, True
+        if not args.incremental:
+            symbols = get_stale_symbols(cur) if args.only_stale else get_active_symbols(cur)
+        print(f"対象銘柄数: {len(symbols)}"
+              + ("（前回以降に株価が変わった銘柄のみ）" if args.incremental else "")
+              + ("（新しい株価がある銘柄のみ）" if args.only_stale else ""))
 
         # 予測対象日（明日から14日間）
         prediction_configs = []
-        tomorrow = datetime.now().date() + timedelta(days=1)
+        tomorrow = today + timedelta(days=1)
 
-        for days_ahead in [1, 3, 7, 14]:
+        for days_ahead in PREDICTION_HORIZONS:
             target_date = tomorrow + timedelta(days=days_ahead - 1)
             prediction_configs.append((target_date, days_ahead))
+        horizons = [days for _, days in prediction_configs]
+
+        finished = completed_symbols(cur, run_id, horizons) if resumed else set()
+        pending = [s['symbol'] for s in symbols if s['symbol'] not in finished]
+        print(f"実行ID: {run_id}" + (f"（再開: 完了済み{len(symbols) - len(pending)}銘柄をスキップ）" if resumed else ""))
+        print()
 
         print("-" * 80)
         print("2. 予測生成")
@@ -308,49 +319,87 @@ def main():
         print(f"予測パターン: {len(prediction_configs)}種類")
         for target_date, days in prediction_configs:
             print(f"  {days}日後予測 (予測日: {target_date})")
+        print(f"ワーカー数: {args.workers} / バッチサイズ: {args.batch_size}")
         print()
 
         # 統計
         total_processed = 0
         total_saved = 0
         total_skipped = 0
+        failed_symbols = []
+        started = time.perf_counter()
 
-        for i, symbol_info in enumerate(symbols, 1):
-            symbol = symbol_info['symbol']
-            company_name = symbol_info['company_name']
+        fit_stats = {}
 
-            if i % 10 == 0:
-                print(f"処理中: {i}/{len(symbols)} ({symbol})")
+        writer = EnsembleWriter(conn)
+        executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+        try:
+            for offset in range(0, len(pending), args.batch_size):
+                batch = pending[offset:offset + args.batch_size]
 
-            for target_date, prediction_days in prediction_configs:
                 try:
-                    result = process_symbol(
-                        cur, symbol, company_name, target_date, prediction_days
+                    # 株価履歴・LSTM予測をバッチ単位で一括取得
+                    histories = load_price_histories(conn, batch)
+                    lstm_predictions = load_lstm_predictions(cur, batch, prediction_configs)
+                    arima_states = load_states(cur, batch)
+                    tasks = [
+                        (symbol, histories.row(symbol), horizons, arima_states.get(symbol), today)
+                        for symbol in batch
+                        if len(histories.row(symbol)) >= MIN_HISTORY
+                    ]
+
+                    # ARIMA のみワーカーで当てはめ、MA・アンサンブルはバッチ全体を行列演算で計算
+                    arima_predictions = {}
+                    batch_fits = {}
+                    for symbol, preds, fit in iter_forecasts(executor, tasks, args.workers):
+                        arima_predictions[symbol] = preds
+                        if fit is not None:
+                            batch_fits[symbol] = fit
+                    batch_rows = build_batch_rows(
+                        histories, lstm_predictions, arima_predictions, prediction_configs
                     )
 
-                    if result:
-                        total_processed += 1
-                        if result['success']:
-                            total_saved += 1
-                    else:
-                        total_skipped += 1
+                    # 一時テーブルへCOPY → ARIMAパラメータ・台帳・ウォーターマークと同じトランザクションで反映
+                    writer.stage(batch_rows)
+                    save_states(cur, batch_fits)
+                    advance_watermarks(cur, LEDGER_SCRIPT,
+                                       {s: change_seqs[s] for s in batch if s in change_seqs})
+                    record_price_dates(cur, LEDGER_SCRIPT, run_id,
+                                       {symbol: histories.latest_date(symbol) for symbol in batch})
+                    saved = {(row[0], row[2]) for row in batch_rows}
+                    record_results(cur, run_id, [
+                        (symbol, days, 'saved' if (symbol, days) in saved else 'skipped')
+                        for symbol in batch for days in horizons
+                    ])
+                    writer.merge()
                 except Exception as e:
-                    # エラーが発生した場合はロールバックして続行
-                    conn.rollback()
-                    total_skipped += 1
-                    if i <= 10:
-                        print(f"  エラー ({symbol}): {e}")
-
-            # 10銘柄ごとにコミット
-            if i % 10 == 0:
-                try:
+                    # バッチ単位でロールバックし、失敗として台帳に残す（次回の実行で再試行）
+                    writer.rollback()
+                    logger.error(f"Batch starting at {batch[0]} failed: {e}")
+                    record_results(cur, run_id, [(symbol, days, 'failed') for symbol in batch for days in horizons])
                     conn.commit()
-                except Exception:
-                    conn.rollback()
-
-        # 最終コミット
+                    failed_symbols.extend(batch)
+                    continue
+
+                total_processed += len(batch_rows)
+                total_skipped += len(batch) * len(prediction_configs) - len(batch_rows)
+                for symbol, fit in batch_fits.items():
+                    fit_stats[symbol] = {k: v for k, v in fit.items() if k != 'params'}
+
+                done = min(offset + args.batch_size, len(pending))
+                elapsed = time.perf_counter() - started
+                print(f"処理中: {done}/{len(pending)} ({done / elapsed:.1f} 銘柄/秒)")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        finish_run(cur, run_id, 'partial' if failed_symbols else 'completed', total_symbols=len(symbols))
         conn.commit()
 
+        write_report = writer.report()
+        total_saved = write_report["inserted"] + write_report["updated"]
+        elapsed = time.perf_counter() - started
+
         print()
         print("-" * 80)
         print("3. 処理結果")
@@ -361,6 +410,20 @@ def main():
         print(f"処理成功: {total_processed}")
         print(f"保存成功: {total_saved}")
         print(f"スキップ: {total_skipped}")
+        print(f"失敗銘柄: {len(failed_symbols)}" + (f"（実行ID {run_id} の再実行で再試行）" if failed_symbols else ""))
+        print(f"処理時間: {elapsed:.1f}秒 ({len(pending) / elapsed:.1f} 銘柄/秒, ワーカー{args.workers})"
+              if elapsed > 0 else "処理時間: 0秒")
+        print()
+        print("書き込みレポート:")
+        for line in format_write_report(write_report):
+            print(f"  {line}")
+        print()
+        print("ARIMAフィット:")
+        for line in summarize_fits(fit_stats):
+            print(f"  {line}")
+        if args.fit_report:
+            write_fit_report(args.fit_report, fit_stats)
+            print(f"  銘柄別レポート: {args.fit_report}")
         print()
 
         # サンプル確認
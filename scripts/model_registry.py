@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+銘柄別LSTMモデルのレジストリ
+models/ 以下の CustomLSTMTrainer 成果物（*_metadata.json と同名の .tflite / .h5・_scaler.pkl）を
+銘柄・バージョンで索引し、初回の get() でだけ読み込む。読み込んだモデルはメモリ上限付きの
+LRU に保持し、上限を超えたら最も長く使われていないモデルから解放する
+
+- バージョン: メタデータの version（save_model が付与）、古い成果物は trained_at。
+  最新判定は trained_at 順（models/{symbol}/{version}/ に保存した旧バージョンも索引する）
+- 形式: .tflite のサイドカー（_lite.json）の version がメタデータと一致すれば優先
+  （TensorFlow を import しない）。再学習で .h5 だけ更新された古い .tflite は使わない
+- サイズ: Keras モデルは重みのバイト数、.tflite はファイルサイズで見積もる
+- 同じモデルの同時読み込みは SingleFlight で1回にまとめる
+
+使い方:
+    registry = ModelRegistry('models', max_bytes=512 * 1024 * 1024)
+    trainer = registry.get('AAPL')            # 最新バージョン
+    trainer.predict(recent_df)
+    registry.stats()  # hits / misses / evictions / loads / bytes ...
+"""
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+_SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_SCRIPTS_DIR, '..'))
+sys.path.insert(0, os.path.join(_SCRIPTS_DIR, '..', 'src', 'ml-models'))
+if _SCRIPTS_DIR not in sys.path:
+    # 既定ローダーが custom_lstm_training を import するため（読み込みごとには追加しない）
+    sys.path.insert(0, _SCRIPTS_DIR)
+from single_flight import SingleFlight  # noqa: E402
+from lite_inference import model_version  # noqa: E402
+
+MODEL_REGISTRY_MAX_MB = int(os.getenv('MODEL_REGISTRY_MAX_MB', 512))
+
+_METADATA_SUFFIX = '_metadata.json'
+# lite_inference.metadata_path と同じ命名
+_LITE_SUFFIX = '_lite.json'
+
+
+def _load_trainer(entry: Dict[str, Any]):
+    """既定ローダー: CustomLSTMTrainer に読み込む（TensorFlow/sklearn はここで初めて import）"""
+    from custom_lstm_training import CustomLSTMTrainer
+
+    trainer = CustomLSTMTrainer(
+        symbol=entry['symbol'],
+        lookback_days=entry['lookback_days'],
+        prediction_days=entry['prediction_days'],
+    )
+    trainer.load_model(entry['path'])
+    return trainer
+
+
+def estimate_bytes(loaded, entry: Dict[str, Any]) -> int:
+    """読み込み済みモデルのメモリ見積もり"""
+    model = getattr(loaded, 'model', loaded)
+    if hasattr(model, 'get_weights'):
+        return int(sum(w.nbytes for w in model.get_weights()))
+    return os.path.getsize(entry['path'])
+
+
+class ModelRegistry:
+    """
+    銘柄・バージョン別モデルの遅延読み込み + メモリ上限付き LRU
+
+    max_bytes は保持中モデルの見積もり合計の上限（1モデルが上限を超える場合も
+    そのモデルだけは保持する）
+    """
+
+    def __init__(
+        self,
+        model_dir: str = 'models',
+        max_bytes: int = MODEL_REGISTRY_MAX_MB * 1024 * 1024,
+        loader: Callable[[Dict[str, Any]], Any] = _load_trainer,
+        size_of: Callable[[Any, Dict[str, Any]], int] = estimate_bytes,
+        prefer_lite: bool = True,
+    ):
+        self.model_dir = model_dir
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.size_of = size_of
+        self.prefer_lite = prefer_lite
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        # symbol -> [entry, ...]（trained_at 昇順）
+        self._index: Dict[str, List[Dict[str, Any]]] = {}
+        # (symbol, version) -> (model, bytes)
+        self._live: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'loads': 0,
+                       'load_errors': 0, 'load_seconds': 0.0}
+        self.refresh()
+
+    def refresh(self) -> int:
+        """model_dir を再走査して索引を作り直す（保持中のモデルはそのまま）。戻り値: 索引したモデル数"""
+        index: Dict[str, List[Dict[str, Any]]] = {}
+        pattern = os.path.join(self.model_dir, '**', f'*{_METADATA_SUFFIX}')
+        for metadata_path in glob.glob(pattern, recursive=True):
+            entry = self._entry(metadata_path)
+            if entry is not None:
+                index.setdefault(entry['symbol'], []).append(entry)
+        for entries in index.values():
+            entries.sort(key=lambda e: e['trained_at'])
+        with self._lock:
+            self._index = index
+        return sum(len(entries) for entries in index.values())
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _entry(self, metadata_path: str) -> Optional[Dict[str, Any]]:
+        base = metadata_path[:-len(_METADATA_SUFFIX)]
+        metadata = self._read_json(metadata_path)
+        if metadata is None:
+            return None
+
+        candidates = []
+        if os.path.exists(base + '.tflite'):
+            # サイドカーのバージョンが現在のメタデータと一致する .tflite だけが同じモデル
+            lite = self._read_json(base + _LITE_SUFFIX) or {}
+            if lite.get('version') is not None and lite.get('version') == model_version(metadata):
+                candidates.append(base + '.tflite')
+        if os.path.exists(base + '.h5'):
+            candidates.append(base + '.h5')
+        if not self.prefer_lite:
+            candidates.reverse()
+        if not candidates:
+            return None
+        path = candidates[0]
+
+        return {
+            'symbol': metadata['symbol'],
+            'version': model_version(metadata),
+            'path': path,
+            'format': os.path.splitext(path)[1][1:],
+            'lookback_days': metadata['lookback_days'],
+            'prediction_days': metadata['prediction_days'],
+            'trained_at': metadata['trained_at'],
+        }
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return sorted(self._index)
+
+    def versions(self, symbol: str) -> List[str]:
+        with self._lock:
+            return [e['version'] for e in self._index.get(symbol, [])]
+
+    def resolve(self, symbol: str, version: Optional[str] = None) -> Dict[str, Any]:
+        """索引エントリ（version=None は最新）。見つからなければ KeyError"""
+        with self._lock:
+            entries = self._index.get(symbol)
+        if not entries:
+            raise KeyError(f"No model for {symbol}")
+        if version is None:
+            return entries[-1]
+        for entry in entries:
+            if entry['version'] == version:
+                return entry
+        raise KeyError(f"No model for {symbol} version {version}")
+
+    def get(self, symbol: str, version: Optional[str] = None):
+        """モデルを返す（未読み込みならここで読み込み、LRU に入れる）"""
+        entry = self.resolve(symbol, version)
+        key = (entry['symbol'], entry['version'])
+        with self._lock:
+            live = self._live.get(key)
+            if live is not None:
+                self._live.move_to_end(key)
+                self._stats['hits'] += 1
+                return live[0]
+            self._stats['misses'] += 1
+
+        return self._flight.do(f"{key[0]}:{key[1]}", lambda: self._load(key, entry), label='load')
+
+    def _load(self, key: tuple, entry: Dict[str, Any]):
+        with self._lock:
+            live = self._live.get(key)
+            if live is not None:
+                # 待っている間に別スレッドが読み込み済み
+                return live[0]
+
+        started = time.perf_counter()
+        try:
+            model = self.loader(entry)
+        except Exception:
+            with self._lock:
+                self._stats['load_errors'] += 1
+            raise
+        size = self.size_of(model, entry)
+
+        with self._lock:
+            self._stats['loads'] += 1
+            self._stats['load_seconds'] += time.perf_counter() - started
+            self._live[key] = (model, size)
+            self._bytes += size
+            self._evict()
+        return model
+
+    def _evict(self):
+        """上限を超えている間、最も古いモデルを解放（直前に入れたモデルは残す）"""
+        while self._bytes > self.max_bytes and len(self._live) > 1:
+            _, (_, size) = self._live.popitem(last=False)
+            self._bytes -= size
+            self._stats['evictions'] += 1
+
+    def evict(self, symbol: str) -> int:
+        """銘柄の全バージョンを解放（再学習後など）。戻り値: 解放したモデル数"""
+        with self._lock:
+            keys = [key for key in self._live if key[0] == symbol]
+            for key in keys:
+                self._bytes -= self._live.pop(key)[1]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._live.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+                'live_models': len(self._live),
+                'live_bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'indexed_symbols': len(self._index),
+                'indexed_models': sum(len(entries) for entries in self._index.values()),
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List indexed LSTM models")
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--symbol', help='指定時はその銘柄のバージョン一覧')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.model_dir)
+    if args.symbol:
+        for version in registry.versions(args.symbol):
+            entry = registry.resolve(args.symbol, version)
+            print(f"{args.symbol}  {version}  {entry['format']:<6}  {entry['path']}")
+    else:
+        for symbol in registry.symbols():
+            entry = registry.resolve(symbol)
+            print(f"{symbol:<12} versions={len(registry.versions(symbol))}  latest={entry['version']}  {entry['format']}")
+    print(json.dumps(registry.stats(), indent=2))
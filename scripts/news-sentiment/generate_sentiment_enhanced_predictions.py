@@ -22,6 +22,10 @@ import warnings
 import os
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src', 'ml-models'))
+from price_loader import load_close_matrix
+from sentiment_feature_store import get_features_many, sentiment_summary
+
 warnings.filterwarnings('ignore')
 
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
@@ -36,31 +40,30 @@ DB_CONFIG = {
 }
 
 
-def get_sentiment_for_symbol(cur, symbol):
+def get_sentiment_for_symbols(conn, symbols):
     """
-    銘柄のセンチメントサマリーを取得
+    銘柄ごとのセンチメントサマリーを一括取得（sentiment_features_daily の最新行、
+    スキーマ未適用なら stock_news から同じウィンドウで計算）
 
     Returns:
-        dict: {
+        dict: {symbol: {
             'avg_sentiment': float (-1.0 to 1.0),
             'sentiment_trend': str (bullish/bearish/neutral),
             'sentiment_strength': float (0.0 to 1.0),
             'news_count': int
-        }
+        }}（ニュースのない銘柄は含まない）
     """
-    cur.execute("""
-        SELECT
-            avg_sentiment,
-            sentiment_trend,
-            sentiment_strength,
-            news_count
-        FROM stock_sentiment_summary
-        WHERE symbol = %s
-          AND date = CURRENT_DATE
-    """, (symbol,))
+    features = get_features_many(conn, symbols)
+    return {
+        symbol: sentiment_summary(f)
+        for symbol, f in features.items()
+        if f['news_count'] > 0
+    }
 
-    result = cur.fetchone()
-    return dict(result) if result else None
+
+def get_sentiment_for_symbol(cur, symbol):
+    """銘柄のセンチメントサマリーを取得（ニュースがなければ None）"""
+    return get_sentiment_for_symbols(cur.connection, [symbol]).get(symbol)
 
 
 def calculate_sentiment_adjustment(current_price, base_prediction, sentiment_data):
@@ -114,31 +117,9 @@ def get_active_symbols(cur):
     return cur.fetchall()
 
 
-def get_latest_price(cur, symbol):
-    """最新株価を取得"""
-    cur.execute("""
-        SELECT close_price, date
-        FROM stock_prices
-        WHERE symbol = %s
-        ORDER BY date DESC
-        LIMIT 1
-    """, (symbol,))
-    return cur.fetchone()
-
-
-def get_historical_prices(cur, symbol, days=60):
-    """過去N日分の株価データを取得"""
-    cur.execute("""
-        SELECT date, close_price
-        FROM stock_prices
-        WHERE symbol = %s
-        ORDER BY date DESC
-        LIMIT %s
-    """, (symbol, days))
-    results = cur.fetchall()
-    if not results:
-        return []
-    return sorted(results, key=lambda x: x['date'])
+def get_historical_prices(conn, symbols, days=60):
+    """全銘柄の過去N日分の終値を1回のCOPYで取得（symbols × days の PriceMatrix）"""
+    return load_close_matrix(conn, symbols, last_n=days)
 
 
 def get_lstm_prediction(cur, symbol, prediction_date, prediction_days):
@@ -263,21 +244,12 @@ def save_prediction(cur, symbol, prediction_date, prediction_days,
         return False
 
 
-def process_symbol(cur, symbol, company_name, target_date, prediction_days, sentiment_data):
-    """1銘柄の予測処理（センチメント統合）"""
-    # 最新株価取得
-    latest = get_latest_price(cur, symbol)
-    if not latest:
+def process_symbol(cur, symbol, company_name, target_date, prediction_days, sentiment_data, prices):
+    """1銘柄の予測処理（センチメント統合）  prices: 終値の ndarray（日付昇順）"""
+    if len(prices) < 30:
         return None
 
-    current_price = float(latest['close_price'])
-
-    # 過去株価取得
-    historical = get_historical_prices(cur, symbol, days=60)
-    if len(historical) < 30:
-        return None
-
-    prices = [float(h['close_price']) for h in historical]
+    current_price = float(prices[-1])
 
     # 各予測を取得/生成
     lstm_pred = get_lstm_prediction(cur, symbol, target_date, prediction_days)
@@ -337,15 +309,13 @@ def main():
         symbols = get_active_symbols(cur)
         print(f"対象銘柄数: {len(symbols)}")
 
-        # 各銘柄のセンチメントを事前取得
-        sentiment_cache = {}
-        for symbol_info in symbols:
-            symbol = symbol_info['symbol']
-            sentiment_data = get_sentiment_for_symbol(cur, symbol)
-            if sentiment_data:
-                sentiment_cache[symbol] = sentiment_data
+        # 全銘柄のセンチメントを1回の主キー検索で事前取得
+        sentiment_cache = get_sentiment_for_symbols(conn, [s['symbol'] for s in symbols])
 
         print(f"センチメントデータあり: {len(sentiment_cache)}銘柄")
+
+        # 全銘柄の株価履歴を一括取得
+        price_matrix = get_historical_prices(conn, [s['symbol'] for s in symbols], days=60)
         print()
 
         # 予測対象日
@@ -376,7 +346,8 @@ def main():
             for target_date, prediction_days in prediction_configs:
                 try:
                     result = process_symbol(
-                        cur, symbol, company_name, target_date, prediction_days, sentiment_data
+                        cur, symbol, company_name, target_date, prediction_days, sentiment_data,
+                        price_matrix.row(symbol)
                     )
 
                     if result and result['success']:
@@ -428,11 +399,16 @@ def main():
                 ep.sentiment_adjusted_prediction,
                 ep.news_sentiment,
                 ep.news_impact,
-                ss.sentiment_trend,
-                ss.news_count
+                CASE
+                    WHEN sf.avg_sentiment > 0.3 THEN 'bullish'
+                    WHEN sf.avg_sentiment < -0.3 THEN 'bearish'
+                    ELSE 'neutral'
+                END as sentiment_trend,
+                sf.news_count
             FROM ensemble_predictions ep
             LEFT JOIN stock_master sm ON ep.symbol = sm.symbol
-            LEFT JOIN stock_sentiment_summary ss ON ep.symbol = ss.symbol
+            LEFT JOIN sentiment_features_daily sf
+              ON sf.symbol = ep.symbol AND sf.as_of_date = CURRENT_DATE + 1
             WHERE ep.prediction_date >= CURRENT_DATE
               AND ep.news_sentiment IS NOT NULL
               AND ep.prediction_days = 1
@@ -9,19 +9,26 @@ Alpha Vantage News & Sentiments APIを使用して株価予測に統合
 2. センチメント分析（API提供のスコア）
 3. データベースへの保存
 4. 銘柄別センチメント集計
+
+取得・振り分け・レート制御は news_collector の Alpha Vantage 経路
+（AlphaVantageProvider / NewsCollector）をそのまま使う
 """
 
+import asyncio
 import os
 import sys
 import io
-import requests
-import time
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src', 'ml-models'))
+from news_collector import AlphaVantageProvider, NewsCollector
+from news_store import save_news_batch
+from sentiment_feature_store import get_features_many, sentiment_summary
+
 # Windows encoding fix
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
@@ -29,7 +36,6 @@ load_dotenv()
 
 # 設定
 ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY', 'demo')
-ALPHA_VANTAGE_BASE_URL = 'https://www.alphavantage.co/query'
 
 DB_CONFIG = {
     'host': os.getenv('POSTGRES_HOST', 'localhost'),
@@ -44,260 +50,112 @@ class NewssentimentAnalyzer:
 
     def __init__(self, api_key: str = ALPHA_VANTAGE_API_KEY):
         self.api_key = api_key
-        self.base_url = ALPHA_VANTAGE_BASE_URL
-        self.session = requests.Session()
-
-    def fetch_news(self, symbol: str, time_from: Optional[str] = None,
-                   limit: int = 50) -> List[Dict]:
-        """
-        Alpha Vantage News APIからニュースを取得
+        # レート（NEWS_RATE_ALPHAVANTAGE）・スロットリング時のバックオフは news_collector と共通
+        self.provider = AlphaVantageProvider(api_key=api_key)
+        self.last_run: Dict = {}
 
-        Args:
-            symbol: 株式シンボル (例: "AAPL", "9984.T")
-            time_from: 取得開始日時 (YYYYMMDDTHHMM形式)
-            limit: 取得件数
-
-        Returns:
-            ニュース記事のリスト
+    def calculate_sentiment_summary(self, symbol: str, conn) -> Optional[Dict]:
         """
-        if not time_from:
-            # デフォルトは7日前から
-            time_from = (datetime.now() - timedelta(days=7)).strftime("%Y%m%dT0000")
-
-        params = {
-            'function': 'NEWS_SENTIMENT',
-            'tickers': symbol,
-            'time_from': time_from,
-            'limit': limit,
-            'apikey': self.api_key
-        }
-
-        try:
-            response = self.session.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-
-            if 'feed' in data:
-                return data['feed']
-            elif 'Note' in data:
-                print(f"API制限: {data['Note']}")
-                return []
-            else:
-                print(f"予期しないレスポンス: {data}")
-                return []
-
-        except requests.exceptions.RequestException as e:
-            print(f"APIリクエストエラー ({symbol}): {e}")
-            return []
-        except Exception as e:
-            print(f"ニュース取得エラー ({symbol}): {e}")
-            return []
+        銘柄のセンチメントサマリーを計算
 
-    def parse_news_article(self, article: Dict, symbol: str) -> Optional[Dict]:
-        """
-        ニュース記事をパースして標準形式に変換
+        保存済みニュースの特徴量ストア（sentiment_features_daily）を更新し、
+        最新行からサマリーを導出する（学習・予測と同じ定義）
 
         Args:
-            article: Alpha Vantage APIからの記事データ
-            symbol: 対象銘柄シンボル
+            symbol: 銘柄シンボル
+            conn: データベース接続
 
         Returns:
-            パース済みニュースデータ
+            センチメントサマリー
         """
-        try:
-            # 銘柄固有のセンチメントを抽出
-            ticker_sentiment = None
-            if 'ticker_sentiment' in article:
-                for ts in article['ticker_sentiment']:
-                    if ts.get('ticker') == symbol:
-                        ticker_sentiment = ts
-                        break
-
-            # 記事全体のセンチメントをフォールバック
-            if not ticker_sentiment and 'overall_sentiment_score' in article:
-                ticker_sentiment = {
-                    'ticker_sentiment_score': str(article['overall_sentiment_score']),
-                    'ticker_sentiment_label': article.get('overall_sentiment_label', 'Neutral'),
-                    'relevance_score': '0.5'  # デフォルト
-                }
-
-            if not ticker_sentiment:
-                return None
-
-            # センチメントスコアの変換
-            sentiment_score = float(ticker_sentiment.get('ticker_sentiment_score', 0))
-            sentiment_label = ticker_sentiment.get('ticker_sentiment_label', 'Neutral').lower()
-            relevance_score = float(ticker_sentiment.get('relevance_score', 0))
-
-            # 日時のパース
-            published_at = datetime.strptime(
-                article['time_published'],
-                '%Y%m%dT%H%M%S'
-            )
-
-            # トピックの抽出
-            topics = []
-            if 'topics' in article:
-                topics = [t['topic'] for t in article['topics']]
-
-            return {
-                'symbol': symbol,
-                'title': article.get('title', ''),
-                'url': article.get('url', ''),
-                'source': article.get('source', 'Unknown'),
-                'published_at': published_at,
-                'summary': article.get('summary', ''),
-                'sentiment_score': sentiment_score,
-                'sentiment_label': sentiment_label,
-                'relevance_score': relevance_score,
-                'topics': topics
-            }
-
-        except Exception as e:
-            print(f"記事パースエラー: {e}")
-            return None
+        return self.calculate_sentiment_summaries([symbol], conn).get(symbol)
 
-    def save_news_to_db(self, news_data: List[Dict], conn) -> int:
+    def calculate_sentiment_summaries(self, symbols: List[str], conn) -> Dict[str, Dict]:
         """
-        ニュースデータをデータベースに保存
+        複数銘柄のセンチメントサマリー（ニュースのない銘柄は含まない）
 
         Args:
-            news_data: ニュースデータのリスト
+            symbols: 銘柄シンボルのリスト
             conn: データベース接続
 
         Returns:
-            保存件数
+            {銘柄シンボル: センチメントサマリー}
         """
-        if not news_data:
-            return 0
-
-        cur = conn.cursor()
-        saved_count = 0
-
-        for news in news_data:
-            try:
-                cur.execute("""
-                    INSERT INTO stock_news (
-                        symbol, title, url, source, published_at,
-                        summary, sentiment_score, sentiment_label,
-                        relevance_score, topics
-                    ) VALUES (
-                        %(symbol)s, %(title)s, %(url)s, %(source)s, %(published_at)s,
-                        %(summary)s, %(sentiment_score)s, %(sentiment_label)s,
-                        %(relevance_score)s, %(topics)s
-                    )
-                    ON CONFLICT (symbol, url) DO UPDATE SET
-                        sentiment_score = EXCLUDED.sentiment_score,
-                        sentiment_label = EXCLUDED.sentiment_label,
-                        relevance_score = EXCLUDED.relevance_score,
-                        updated_at = NOW()
-                """, news)
-                saved_count += 1
-            except psycopg2.IntegrityError:
-                # 重複は無視
-                conn.rollback()
-                continue
-            except Exception as e:
-                print(f"保存エラー: {e}")
-                conn.rollback()
-                continue
-
-        conn.commit()
-        cur.close()
-        return saved_count
+        try:
+            # 保存したばかりのニュースは読み出し時に再計算される
+            features = get_features_many(conn, symbols)
+            conn.commit()
+        except Exception as e:
+            print(f"センチメント集計エラー ({', '.join(symbols)}): {e}")
+            conn.rollback()
+            return {}
+
+        return {
+            symbol: sentiment_summary(f)
+            for symbol, f in features.items()
+            if f['news_count'] > 0
+        }
 
-    def calculate_sentiment_summary(self, symbol: str, conn) -> Optional[Dict]:
+    def process_symbol(self, symbol: str, conn) -> Dict:
         """
-        銘柄のセンチメントサマリーを計算
+        1銘柄のニュース分析を実行（process_symbols と同じ経路）
 
         Args:
             symbol: 銘柄シンボル
             conn: データベース接続
 
         Returns:
-            センチメントサマリー
+            処理結果
         """
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        try:
-            cur.execute("""
-                SELECT
-                    COUNT(*) as news_count,
-                    AVG(sentiment_score) as avg_sentiment,
-                    COUNT(*) FILTER (WHERE sentiment_label = 'positive') as positive_count,
-                    COUNT(*) FILTER (WHERE sentiment_label = 'negative') as negative_count,
-                    COUNT(*) FILTER (WHERE sentiment_label = 'neutral') as neutral_count,
-                    CASE
-                        WHEN AVG(sentiment_score) > 0.3 THEN 'bullish'
-                        WHEN AVG(sentiment_score) < -0.3 THEN 'bearish'
-                        ELSE 'neutral'
-                    END as sentiment_trend,
-                    ABS(AVG(sentiment_score)) as sentiment_strength
-                FROM stock_news
-                WHERE symbol = %s
-                  AND published_at >= CURRENT_DATE - INTERVAL '7 days'
-            """, (symbol,))
-
-            result = cur.fetchone()
-            cur.close()
-
-            if result and result['news_count'] > 0:
-                return dict(result)
-            return None
+        return self.process_symbols([symbol], conn)[0]
 
-        except Exception as e:
-            print(f"センチメント集計エラー ({symbol}): {e}")
-            cur.close()
-            return None
-
-    def process_symbol(self, symbol: str, conn) -> Dict:
+    def process_symbols(self, symbols: List[str], conn) -> List[Dict]:
         """
-        1銘柄のニュース分析を実行
+        複数銘柄のニュース分析を実行（NewsCollector の Alpha Vantage 経路で取得・保存）
 
         Args:
-            symbol: 銘柄シンボル
+            symbols: 銘柄シンボルのリスト
             conn: データベース接続
 
         Returns:
-            処理結果
+            銘柄ごとの処理結果（news_fetched / requested / sentiment_summary / error）
+            保存件数などの実行全体の統計は last_run
         """
-        result = {
-            'symbol': symbol,
-            'news_fetched': 0,
-            'news_saved': 0,
-            'sentiment_summary': None,
-            'error': None
+        results = {
+            symbol: {
+                'symbol': symbol,
+                'news_fetched': 0,
+                'sentiment_summary': None,
+                'requested': False,
+                'error': None
+            }
+            for symbol in symbols
         }
+        if not self.provider.enabled():
+            print("ALPHA_VANTAGE_API_KEY が未設定のためニュース取得をスキップ")
+            return [results[symbol] for symbol in symbols]
 
-        try:
-            # ニュース取得
-            articles = self.fetch_news(symbol)
-            result['news_fetched'] = len(articles)
-
-            if not articles:
-                return result
+        def track(done, total, entry):
+            result = results[entry['symbol']]
+            result['news_fetched'] = entry.get('articles', 0)
+            result['requested'] = entry.get('request', False)
+            result['error'] = entry.get('error')
 
-            # パースと保存
-            parsed_news = []
-            for article in articles:
-                parsed = self.parse_news_article(article, symbol)
-                if parsed:
-                    parsed_news.append(parsed)
+        # 既存記事もセンチメントを更新する（update=True）
+        collector = NewsCollector(conn, [self.provider], progress=track, save=save_news_batch)
+        summary = asyncio.run(collector.run([(symbol, symbol) for symbol in symbols]))
+        self.last_run = summary['providers'][self.provider.name]
+        print(f"APIリクエスト: {self.last_run['requests']}回（銘柄数 {len(symbols)}、"
+              f"スロットリング {self.last_run['throttled']}回）")
 
-            result['news_saved'] = self.save_news_to_db(parsed_news, conn)
+        # センチメント集計
+        summaries = self.calculate_sentiment_summaries(
+            [s for s, r in results.items() if r['news_fetched'] > 0], conn
+        )
+        for symbol, summary in summaries.items():
+            results[symbol]['sentiment_summary'] = summary
 
-            # センチメント集計
-            if result['news_saved'] > 0:
-                result['sentiment_summary'] = self.calculate_sentiment_summary(symbol, conn)
-
-            # API制限を考慮して少し待機
-            time.sleep(12)  # Alpha Vantageの無料版は5リクエスト/分
-
-        except Exception as e:
-            result['error'] = str(e)
-            print(f"処理エラー ({symbol}): {e}")
-
-        return result
+        return [results[symbol] for symbol in symbols]
 
 
 def main():
@@ -310,7 +168,7 @@ def main():
     # データベース接続
     try:
         conn = psycopg2.connect(**DB_CONFIG)
-        analyzer = NewsSentimentAnalyzer()
+        analyzer = NewssentimentAnalyzer()
 
         # アクティブ銘柄を取得
         cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -329,25 +187,24 @@ def main():
 
         # 統計
         total_fetched = 0
-        total_saved = 0
         total_with_sentiment = 0
 
-        # 各銘柄を処理
-        for i, symbol_info in enumerate(symbols, 1):
+        # 全銘柄をまとめて取得
+        results = analyzer.process_symbols([s['symbol'] for s in symbols], conn)
+
+        # 各銘柄の結果
+        for i, (symbol_info, result) in enumerate(zip(symbols, results), 1):
             symbol = symbol_info['symbol']
             company_name = symbol_info['company_name']
 
             print(f"[{i}/{len(symbols)}] {symbol} - {company_name}")
 
-            result = analyzer.process_symbol(symbol, conn)
-
             total_fetched += result['news_fetched']
-            total_saved += result['news_saved']
 
             if result['sentiment_summary']:
                 total_with_sentiment += 1
                 summary = result['sentiment_summary']
-                print(f"  ニュース: {result['news_saved']}件保存")
+                print(f"  ニュース: {result['news_fetched']}件")
                 print(f"  センチメント: {summary['sentiment_trend']} "
                       f"(スコア: {summary['avg_sentiment']:.3f}, "
                       f"強度: {summary['sentiment_strength']:.3f})")
@@ -368,7 +225,7 @@ def main():
         print("=" * 80)
         print(f"対象銘柄: {len(symbols)}")
         print(f"ニュース取得: {total_fetched}件")
-        print(f"ニュース保存: {total_saved}件")
+        print(f"ニュース保存: {analyzer.last_run.get('saved', 0)}件（新規）")
         print(f"センチメント計算: {total_with_sentiment}銘柄")
         print()
 
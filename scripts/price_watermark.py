@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+株価更新ウォーターマーク（インクリメンタル予測用）
+stock_prices のトリガーが銘柄ごとに更新する stock_price_changes.change_seq と、
+ジョブごと・銘柄ごとに最後に処理した change_seq（prediction_watermarks）を比較して、
+前回の実行以降に株価が追加・修正された銘柄だけを選ぶ
+
+スキーマ: scripts/database/create_price_change_schema.sql（/admin/apply-price-change-schema）
+"""
+import psycopg2
+from psycopg2.extras import execute_values
+
+
+def load_changed_symbols(cur, script):
+    """
+    前回の処理以降に株価が変わったアクティブ銘柄（cur は RealDictCursor）
+    戻り値: [{'symbol', 'company_name', 'change_seq'}]（スキーマ未適用なら UndefinedTable）
+    """
+    cur.execute("""
+        SELECT m.symbol, m.company_name, c.change_seq
+        FROM stock_master m
+        JOIN stock_price_changes c ON c.symbol = m.symbol
+        LEFT JOIN prediction_watermarks w
+          ON w.script = %s AND w.symbol = m.symbol
+        WHERE m.is_active = TRUE
+          AND c.change_seq > COALESCE(w.change_seq, 0)
+        ORDER BY m.symbol
+    """, (script,))
+    return cur.fetchall()
+
+
+def select_changed_symbols(conn, cur, script):
+    """
+    --incremental の対象銘柄と処理時点の change_seq
+    戻り値: (symbols, {symbol: change_seq})。スキーマ未適用ならロールバックして None
+    （呼び出し側は --only-stale に代替する）
+    """
+    try:
+        symbols = load_changed_symbols(cur, script)
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+        return None
+    return symbols, {s['symbol']: s['change_seq'] for s in symbols}
+
+
+def advance_watermarks(cur, script, change_seqs):
+    """
+    処理済み銘柄のウォーターマークを進める（予測の保存と同じトランザクションで呼ぶ）
+    change_seqs: {symbol: load_changed_symbols() 時点の change_seq}
+    """
+    rows = [(script, symbol, seq) for symbol, seq in change_seqs.items()]
+    if not rows:
+        return 0
+    execute_values(cur, """
+        INSERT INTO prediction_watermarks (script, symbol, change_seq)
+        VALUES %s
+        ON CONFLICT (script, symbol) DO UPDATE SET
+            change_seq = GREATEST(prediction_watermarks.change_seq, EXCLUDED.change_seq),
+            updated_at = CURRENT_TIMESTAMP
+    """, rows)
+    return len(rows)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+予測バッチの実行台帳（チェックポイント）
+銘柄 × ホライズンごとの完了を run_id 付きで prediction_run_ledger に記録し、
+途中で止まった実行（Cloud Run のタイムアウト、DB 切断など）を再起動時に続きから再開する
+
+run のステータス:
+    running:   実行中、または途中で停止（同じ日の次の実行で再開される）
+    partial:   最後まで回ったが失敗したバッチがある（次の実行で failed 分を再試行）
+    completed: 全銘柄完了
+
+台帳のステータス:
+    saved:   予測を保存済み
+    skipped: 履歴不足・予測なしで保存対象外（完了扱い）
+    failed:  バッチがエラーでロールバックされた（未完了扱い）
+
+prediction_price_dates には銘柄ごとに、最後に完了した予測がどの株価日付
+（stock_prices.date の最新）に基づくかを記録する（--only-stale の判定用）
+
+スキーマ: scripts/database/create_prediction_run_ledger_schema.sql（/admin/apply-prediction-run-ledger-schema）
+"""
+from psycopg2.extras import execute_values
+
+DONE_STATUSES = ("saved", "skipped")
+
+
+def start_run(cur, script, run_date, run_id=None, fresh=False):
+    """
+    実行を開始または再開する（cur は RealDictCursor）
+
+    Args:
+        script: 実行元スクリプト名
+        run_date: 予測の基準日（同じ日の未完了 run を再開する）
+        run_id: 指定した run を再開（存在しなければ ValueError）
+        fresh: True なら未完了 run があっても新しい run を作る
+
+    Returns:
+        tuple: (run_id, resumed)
+    """
+    if run_id is not None:
+        cur.execute("""
+            UPDATE prediction_runs
+            SET status = 'running', finished_at = NULL
+            WHERE run_id = %s AND script = %s
+            RETURNING run_id
+        """, (run_id, script))
+        if cur.fetchone() is None:
+            raise ValueError(f"Unknown run_id for {script}: {run_id}")
+        return run_id, True
+
+    if not fresh:
+        cur.execute("""
+            UPDATE prediction_runs
+            SET status = 'running', finished_at = NULL
+            WHERE run_id = (
+                SELECT run_id FROM prediction_runs
+                WHERE script = %s AND run_date = %s AND status <> 'completed'
+                ORDER BY run_id DESC
+                LIMIT 1
+            )
+            RETURNING run_id
+        """, (script, run_date))
+        row = cur.fetchone()
+        if row is not None:
+            return row["run_id"], True
+
+    cur.execute("""
+        INSERT INTO prediction_runs (script, run_date)
+        VALUES (%s, %s)
+        RETURNING run_id
+    """, (script, run_date))
+    return cur.fetchone()["run_id"], False
+
+
+def completed_symbols(cur, run_id, horizons):
+    """全ホライズンが saved / skipped の銘柄（再開時にスキップする）"""
+    cur.execute("""
+        SELECT symbol
+        FROM prediction_run_ledger
+        WHERE run_id = %s
+          AND prediction_days = ANY(%s)
+          AND status = ANY(%s)
+        GROUP BY symbol
+        HAVING COUNT(DISTINCT prediction_days) = %s
+    """, (run_id, list(horizons), list(DONE_STATUSES), len(set(horizons))))
+    return {row["symbol"] for row in cur.fetchall()}
+
+
+def record_results(cur, run_id, entries):
+    """entries: [(symbol, prediction_days, status)]。再試行で上書きされる"""
+    rows = [(run_id, symbol, days, status) for symbol, days, status in entries]
+    if not rows:
+        return 0
+    execute_values(cur, """
+        INSERT INTO prediction_run_ledger (run_id, symbol, prediction_days, status)
+        VALUES %s
+        ON CONFLICT (run_id, symbol, prediction_days) DO UPDATE SET
+            status = EXCLUDED.status,
+            completed_at = CURRENT_TIMESTAMP
+    """, rows)
+    return len(rows)
+
+
+def record_price_dates(cur, script, run_id, price_dates):
+    """
+    予測の基になった最新株価日付を記録（予測の保存と同じトランザクションで呼ぶ）
+    price_dates: {symbol: date}。実行日や created_at ではなく株価の日付を持つので、
+    日付をまたいだ実行や翌日にロードされた海外銘柄の株価でも比較がずれない
+    """
+    rows = [(script, symbol, price_date, run_id) for symbol, price_date in price_dates.items()
+            if price_date is not None]
+    if not rows:
+        return 0
+    execute_values(cur, """
+        INSERT INTO prediction_price_dates (script, symbol, price_date, run_id)
+        VALUES %s
+        ON CONFLICT (script, symbol) DO UPDATE SET
+            price_date = EXCLUDED.price_date,
+            run_id = EXCLUDED.run_id,
+            updated_at = CURRENT_TIMESTAMP
+    """, rows)
+    return len(rows)
+
+
+def load_stale_symbols(cur, script):
+    """
+    最新の株価日付が、最後の予測の基になった株価日付（prediction_price_dates）より
+    新しい（または記録がない）アクティブ銘柄（--only-stale の対象）
+    """
+    cur.execute("""
+        SELECT m.symbol, m.company_name
+        FROM stock_master m
+        CROSS JOIN LATERAL (
+            SELECT MAX(date) AS latest_price
+            FROM stock_prices
+            WHERE symbol = m.symbol
+        ) p
+        LEFT JOIN prediction_price_dates d
+          ON d.script = %s AND d.symbol = m.symbol
+        WHERE m.is_active = TRUE
+          AND p.latest_price IS NOT NULL
+          AND (d.price_date IS NULL OR p.latest_price > d.price_date)
+        ORDER BY m.symbol
+    """, (script,))
+    return cur.fetchall()
+
+
+def finish_run(cur, run_id, status, total_symbols=None):
+    cur.execute("""
+        UPDATE prediction_runs
+        SET status = %s,
+            total_symbols = COALESCE(%s, total_symbols),
+            finished_at = CURRENT_TIMESTAMP
+        WHERE run_id = %s
+    """, (status, total_symbols, run_id))
@@ -0,0 +1,99 @@
+"""
+Request Coalescing (single-flight) for Miraikakaku
+Concurrent identical requests share one in-flight DB query; every waiter gets its result.
+
+Sync handlers (threadpool) use do(), async handlers use do_async().
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent work by key
+
+    label groups metrics (e.g. "details") when the key itself is high-cardinality
+    (e.g. "details:AAPL:3"); it defaults to the key.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self._metrics: Dict[str, Dict[str, int]] = {}
+
+    def _record(self, label: str, leader: bool):
+        metrics = self._metrics.setdefault(label, {"calls": 0, "executions": 0, "coalesced": 0})
+        metrics["calls"] += 1
+        if leader:
+            metrics["executions"] += 1
+        else:
+            metrics["coalesced"] += 1
+
+    def do(self, key: str, fn: Callable[[], Any], label: Optional[str] = None) -> Any:
+        """Run fn once per key among concurrent callers (thread version)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            self._record(label or key, leader)
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]], label: Optional[str] = None) -> Any:
+        """Run fn once per key among concurrent callers (asyncio version)"""
+        with self._lock:
+            task = self._tasks.get(key)
+            leader = task is None
+            if leader:
+                task = asyncio.ensure_future(fn())
+                self._tasks[key] = task
+                task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            self._record(label or key, leader)
+
+        # shield: 1つのリクエストがキャンセルされても共有クエリは継続
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            totals = {"calls": 0, "executions": 0, "coalesced": 0}
+            for metrics in self._metrics.values():
+                for name in totals:
+                    totals[name] += metrics[name]
+            return {
+                "in_flight": len(self._calls) + len(self._tasks),
+                "totals": totals,
+                "by_key": {label: dict(metrics) for label, metrics in self._metrics.items()},
+            }
+
+
+# Global instance shared by the sync and async endpoints
+single_flight = SingleFlight()
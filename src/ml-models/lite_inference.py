@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学習済みLSTMモデルの軽量CPU推論ランタイム（TFLite）
+CustomLSTMTrainer / NewsEnhancedLSTM の Keras モデルを .tflite に書き出し、
+予測時は TensorFlow 本体を import せずに tflite_runtime で順伝播だけを行う
+
+- export_tflite: Keras モデル -> .tflite（量子化: None / 'float16' / 'int8'）
+  'int8' は代表データがあれば活性化も含めて整数化（入出力は float のまま、
+  整数カーネルのない演算は float に残る）、なければ重みのみの動的レンジ量子化
+- LiteModel: keras.Model.predict と同じ呼び出し方（配列または入力名の dict）で使える
+- accuracy_delta: Keras 出力との差分レポート（書き出し時にサイドカー JSON に保存）
+
+推論は tflite_runtime（requirements.txt）で行う。未インストールの開発環境では
+tensorflow.lite にフォールバックする（この場合は TensorFlow を import する）
+"""
+import json
+import os
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:  # pragma: no cover - optional dependency
+    Interpreter = None
+
+QUANTIZATIONS = (None, 'float16', 'int8')
+
+Inputs = Union[np.ndarray, Dict[str, np.ndarray]]
+
+
+def _interpreter_class():
+    if Interpreter is not None:
+        return Interpreter
+    # tflite_runtime がない環境では TensorFlow 同梱のインタプリタを使う（import は重い）
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+def metadata_path(model_path: str) -> str:
+    """.tflite のサイドカー（量子化方式・入力名・精度差分）"""
+    return os.path.splitext(model_path)[0] + '_lite.json'
+
+
+def model_version(metadata: Dict) -> Optional[str]:
+    """学習メタデータのバージョン（version のない旧成果物は trained_at）。サイドカーの version と比較する"""
+    version = metadata.get('version') or metadata.get('trained_at')
+    return str(version) if version is not None else None
+
+
+def _batches(inputs: Dict[str, np.ndarray], batch_size: int):
+    n = len(next(iter(inputs.values())))
+    for start in range(0, n, batch_size):
+        yield {name: value[start:start + batch_size] for name, value in inputs.items()}
+
+
+def accuracy_delta(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """Keras 出力（reference）に対する書き出しモデル出力の誤差"""
+    reference = np.asarray(reference, dtype=np.float64)
+    diff = np.abs(np.asarray(candidate, dtype=np.float64) - reference)
+    scale = np.maximum(np.abs(reference), 1e-8)
+    return {
+        'samples': int(reference.shape[0]),
+        'max_abs_diff': float(diff.max()),
+        'mean_abs_diff': float(diff.mean()),
+        'max_rel_diff': float((diff / scale).max()),
+        'mean_rel_diff': float((diff / scale).mean()),
+    }
+
+
+class LiteModel:
+    """
+    .tflite モデルの推論ラッパー（keras.Model.predict 互換）
+
+    入力は signature の入力名（Keras の Input 名）で受け取り、
+    バッチ次元が変わるとインタプリタ側でテンソルをリサイズする
+    """
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None):
+        self.model_path = model_path
+        self._interpreter = _interpreter_class()(model_path=model_path, num_threads=num_threads)
+        self._runner = self._interpreter.get_signature_runner()
+        details = self._runner.get_input_details()
+        self.input_names = sorted(details)
+        self._input_dtypes = {name: d['dtype'] for name, d in details.items()}
+        self.output_names = sorted(self._runner.get_output_details())
+        path = metadata_path(model_path)
+        self.metadata = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.metadata = json.load(f)
+
+    def _as_dict(self, inputs: Inputs) -> Dict[str, np.ndarray]:
+        if not isinstance(inputs, dict):
+            if len(self.input_names) != 1:
+                raise ValueError(f"Model has inputs {self.input_names}; pass a dict")
+            inputs = {self.input_names[0]: inputs}
+        missing = set(self.input_names) - set(inputs)
+        if missing:
+            raise ValueError(f"Missing model inputs: {sorted(missing)}")
+        return {name: np.asarray(inputs[name], dtype=self._input_dtypes[name]) for name in self.input_names}
+
+    def predict(self, inputs: Inputs, batch_size: Optional[int] = 256, verbose: int = 0) -> np.ndarray:
+        """
+        順伝播（keras.Model.predict と同じ形の出力）
+
+        Args:
+            inputs: 入力配列、または {入力名: 配列}
+            batch_size: 1回の呼び出しで渡す行数（None なら全行）
+            verbose: 互換用（未使用）
+        """
+        inputs = self._as_dict(inputs)
+        n = len(next(iter(inputs.values())))
+        outputs = []
+        for batch in _batches(inputs, batch_size or max(n, 1)):
+            result = self._runner(**batch)
+            outputs.append(np.concatenate([result[name] for name in self.output_names], axis=-1))
+        return np.concatenate(outputs, axis=0)
+
+
+def export_tflite(
+    keras_model,
+    model_path: str,
+    quantization: Optional[str] = None,
+    sample_inputs: Optional[Inputs] = None,
+    version: Optional[str] = None,
+) -> Dict:
+    """
+    Keras モデルを .tflite に書き出し、sample_inputs で精度差分を測ってサイドカーに保存
+
+    Args:
+        keras_model: 学習済み keras.Model
+        model_path: 書き出し先（.tflite）
+        quantization: None / 'float16' / 'int8'
+        sample_inputs: 代表データ兼評価データ（int8 のキャリブレーションにも使う）
+        version: 書き出し元モデルのバージョン（再学習後の古い .tflite を見分けるため記録）
+
+    Returns:
+        dict: サイドカーの内容（version, quantization, inputs, bytes, accuracy）
+    """
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"quantization must be one of {QUANTIZATIONS}")
+
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if quantization is not None:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8' and sample_inputs is not None:
+        names = [t.name.split(':')[0] for t in keras_model.inputs]
+        calibration = sample_inputs if isinstance(sample_inputs, dict) else {names[0]: sample_inputs}
+
+        def representative_dataset():
+            for batch in _batches(calibration, 1):
+                yield [batch[name].astype(np.float32) for name in names]
+
+        # 整数カーネルのない演算は float のまま残す（LSTM の一部など）
+        converter.representative_dataset = representative_dataset
+
+    flatbuffer = converter.convert()
+    os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+    with open(model_path, 'wb') as f:
+        f.write(flatbuffer)
+
+    lite = LiteModel(model_path)
+    metadata = {
+        'version': version,
+        'quantization': quantization,
+        'inputs': lite.input_names,
+        'bytes': len(flatbuffer),
+        'accuracy': None,
+    }
+    if sample_inputs is not None:
+        reference = keras_model.predict(sample_inputs, verbose=0)
+        metadata['accuracy'] = accuracy_delta(reference, lite.predict(sample_inputs))
+
+    with open(metadata_path(model_path), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
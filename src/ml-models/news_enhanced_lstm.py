@@ -2,16 +2,16 @@
 # -*- coding: utf-8 -*-
 """
 ニュースセンチメントを統合したLSTM予測モデル
+TensorFlow は学習・Keras モデル読み込み時にだけ import する
+（.tflite を load_model すると推論は lite_inference.LiteModel で行う）
 """
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras import layers
 from typing import Dict, Tuple, List
 from datetime import datetime, timedelta
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from lite_inference import LiteModel, export_tflite
 from news_feature_extractor import NewsFeatureExtractor
+from price_loader import load_close_matrix, load_price_frame
 
 
 class NewsEnhancedLSTM:
@@ -35,7 +35,7 @@ class NewsEnhancedLSTM:
         self.model = None
         self.news_extractor = NewsFeatureExtractor(db_config)
 
-    def build_model(self) -> keras.Model:
+    def build_model(self) -> 'keras.Model':
         """
         ニュース統合LSTMモデルを構築
 
@@ -44,6 +44,9 @@ class NewsEnhancedLSTM:
         2. ニュース特徴入力 → Dense
         3. 1と2を結合 → Dense → 出力
         """
+        from tensorflow import keras
+        from tensorflow.keras import layers
+
         # 価格系列入力
         price_input = keras.Input(
             shape=(self.price_sequence_length, 1),
@@ -109,42 +112,39 @@ class NewsEnhancedLSTM:
                 目標: 翌日の終値配列
         """
         conn = psycopg2.connect(**self.db_config)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        # 価格データ取得
-        cur.execute("""
-            SELECT date, close_price
-            FROM stock_prices
-            WHERE symbol = %s
-              AND date >= %s
-              AND date <= %s
-            ORDER BY date ASC
-        """, (symbol, start_date - timedelta(days=self.price_sequence_length + 10), end_date))
-
-        prices = cur.fetchall()
-        cur.close()
-        conn.close()
-
-        if len(prices) < self.price_sequence_length + 1:
+        try:
+            # 価格データ取得
+            frame = load_price_frame(
+                conn, [symbol],
+                start_date=start_date - timedelta(days=self.price_sequence_length + 10),
+                end_date=end_date
+            )
+        finally:
+            conn.close()
+
+        if len(frame) < self.price_sequence_length + 1:
             raise ValueError(f"Not enough data for {symbol}")
 
-        price_sequences = []
-        news_features = []
-        targets = []
+        price_values = frame['close_price'].to_numpy()
+        dates = frame.index.get_level_values('date')
 
         # 正規化用の統計
-        price_values = [float(p['close_price']) for p in prices]
         price_mean = np.mean(price_values)
         price_std = np.std(price_values)
+        normalized = (price_values - price_mean) / price_std
 
-        for i in range(self.price_sequence_length, len(prices) - 1):
-            # 価格系列（正規化）
-            seq = price_values[i - self.price_sequence_length:i]
-            normalized_seq = [(p - price_mean) / price_std for p in seq]
-            price_sequences.append(normalized_seq)
+        # 価格系列（正規化）: i = seq_len .. len-2 の各時点の直前 seq_len 日
+        n_samples = len(price_values) - 1 - self.price_sequence_length
+        price_sequences = np.lib.stride_tricks.sliding_window_view(
+            normalized[:-1], self.price_sequence_length
+        )[:n_samples]
+        # 目標値（正規化）: 翌日の終値
+        targets = normalized[self.price_sequence_length + 1:]
 
+        news_features = []
+        for i in range(self.price_sequence_length, len(price_values) - 1):
             # ニュース特徴
-            current_date = prices[i]['date']
+            current_date = dates[i].date()
             news_feat = self.news_extractor.extract_sentiment_features(
                 symbol,
                 datetime.combine(current_date, datetime.min.time()),
@@ -164,11 +164,6 @@ class NewsEnhancedLSTM:
             ]
             news_features.append(news_vector)
 
-            # 目標値（正規化）
-            target_price = price_values[i + 1]
-            normalized_target = (target_price - price_mean) / price_std
-            targets.append(normalized_target)
-
         X_price = np.array(price_sequences).reshape(-1, self.price_sequence_length, 1)
         X_news = np.array(news_features)
         y = np.array(targets)
@@ -239,36 +234,110 @@ class NewsEnhancedLSTM:
             prediction_date = datetime.now()
 
         conn = psycopg2.connect(**self.db_config)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        # 最近の価格データ取得
-        cur.execute("""
-            SELECT date, close_price
-            FROM stock_prices
-            WHERE symbol = %s
-              AND date <= %s
-            ORDER BY date DESC
-            LIMIT %s
-        """, (symbol, prediction_date.date(), self.price_sequence_length))
-
-        prices = list(reversed(cur.fetchall()))
-        cur.close()
-        conn.close()
-
-        if len(prices) < self.price_sequence_length:
+        try:
+            # 最近の価格データ取得
+            price_values = load_close_matrix(
+                conn, [symbol], last_n=self.price_sequence_length, end_date=prediction_date.date()
+            ).row(symbol)
+        finally:
+            conn.close()
+
+        if len(price_values) < self.price_sequence_length:
             raise ValueError(f"Not enough price data for {symbol}")
 
         # 価格系列準備
-        price_values = [float(p['close_price']) for p in prices]
-        price_mean = np.mean(price_values)
-        price_std = np.std(price_values)
-
-        normalized_seq = [(p - price_mean) / price_std for p in price_values]
-        X_price = np.array(normalized_seq).reshape(1, self.price_sequence_length, 1)
+        X_price, price_mean, price_std = self._price_inputs(price_values[np.newaxis, :])
 
         # ニュース特徴準備
         news_feat = self.news_extractor.get_latest_features(symbol)
-        X_news = np.array([[
+        X_news = np.array([self._news_vector(news_feat)])
+
+        # 予測
+        normalized_pred = self.model.predict(
+            {'price_sequence': X_price, 'news_features': X_news},
+            verbose=0
+        )[0][0]
+
+        return self._prediction_result(
+            normalized_pred, price_mean[0], price_std[0], price_values[-1], news_feat
+        )
+
+    def predict_many(
+        self,
+        symbols: List[str],
+        prediction_date: datetime = None,
+        batch_size: int = 256
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        複数銘柄の予測を1回の順伝播で実行
+
+        価格は load_close_matrix、ニュース特徴は get_latest_features_many で
+        それぞれ1回の問い合わせで取得し、全銘柄を (N, seq_len, 1) / (N, 9) の
+        テンソルにまとめて model.predict を1回だけ呼ぶ（predict と同じ値）
+
+        Args:
+            symbols: 銘柄コードのリスト
+            prediction_date: 予測基準日（Noneの場合は最新日）
+            batch_size: model.predict のバッチサイズ
+
+        Returns:
+            dict: {銘柄コード: predict と同じ予測結果}
+                価格データが不足する銘柄は {'error': ...}
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet")
+
+        if prediction_date is None:
+            prediction_date = datetime.now()
+
+        symbols = list(dict.fromkeys(symbols))
+        conn = psycopg2.connect(**self.db_config)
+        try:
+            matrix = load_close_matrix(
+                conn, symbols, last_n=self.price_sequence_length, end_date=prediction_date.date()
+            )
+            news = self.news_extractor.get_latest_features_many(symbols, conn)
+        finally:
+            conn.close()
+
+        results = {}
+        ready = []
+        for i, symbol in enumerate(symbols):
+            if matrix.lengths[i] < self.price_sequence_length:
+                results[symbol] = {'error': f"Not enough price data for {symbol}"}
+            else:
+                ready.append(i)
+
+        if not ready:
+            return results
+
+        price_values = matrix.values[ready]
+        X_price, price_mean, price_std = self._price_inputs(price_values)
+        X_news = np.array([self._news_vector(news[symbols[i]]) for i in ready])
+
+        normalized_preds = self.model.predict(
+            {'price_sequence': X_price, 'news_features': X_news},
+            batch_size=batch_size,
+            verbose=0
+        )[:, 0]
+
+        for row, i in enumerate(ready):
+            results[symbols[i]] = self._prediction_result(
+                normalized_preds[row], price_mean[row], price_std[row],
+                price_values[row, -1], news[symbols[i]]
+            )
+        return results
+
+    def _price_inputs(self, price_values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(N, seq_len) の価格 -> 行ごとに正規化した (N, seq_len, 1) 入力と平均・標準偏差"""
+        price_mean = np.mean(price_values, axis=1)
+        price_std = np.std(price_values, axis=1)
+        normalized = (price_values - price_mean[:, np.newaxis]) / price_std[:, np.newaxis]
+        return normalized.reshape(-1, self.price_sequence_length, 1), price_mean, price_std
+
+    @staticmethod
+    def _news_vector(news_feat: Dict[str, float]) -> List[float]:
+        return [
             news_feat['avg_sentiment'],
             news_feat['sentiment_std'],
             news_feat['bullish_ratio'],
@@ -278,17 +347,13 @@ class NewsEnhancedLSTM:
             news_feat['sentiment_trend'],
             news_feat['max_sentiment'],
             news_feat['min_sentiment']
-        ]])
-
-        # 予測
-        normalized_pred = self.model.predict(
-            {'price_sequence': X_price, 'news_features': X_news},
-            verbose=0
-        )[0][0]
+        ]
 
+    @staticmethod
+    def _prediction_result(normalized_pred, price_mean, price_std, current_price,
+                           news_feat: Dict[str, float]) -> Dict[str, float]:
         # 逆正規化
         predicted_price = normalized_pred * price_std + price_mean
-        current_price = price_values[-1]
 
         # 信頼度計算（ニュース件数とセンチメント標準偏差から）
         news_confidence = min(news_feat['news_count'] / 10.0, 1.0)
@@ -309,6 +374,26 @@ class NewsEnhancedLSTM:
         if self.model is not None:
             self.model.save(filepath)
 
+    def export_lite(self, filepath: str, quantization: str = None, sample_inputs: Dict = None) -> Dict:
+        """
+        推論用 .tflite を書き出し（lite_inference.export_tflite）
+
+        Args:
+            filepath: 書き出し先（.tflite）
+            quantization: None / 'float16' / 'int8'
+            sample_inputs: prepare_training_data の X（キャリブレーションと精度差分に使う）
+
+        Returns:
+            dict: 量子化方式・サイズ・Keras との精度差分
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet")
+        return export_tflite(self.model, filepath, quantization, sample_inputs)
+
     def load_model(self, filepath: str):
-        """モデルを読み込み"""
+        """モデルを読み込み（.tflite は TensorFlow なしで推論する LiteModel）"""
+        if filepath.endswith('.tflite'):
+            self.model = LiteModel(filepath)
+            return
+        from tensorflow import keras
         self.model = keras.models.load_model(filepath)
@@ -8,6 +8,14 @@ from psycopg2.extras import RealDictCursor
 from datetime import datetime, timedelta
 import numpy as np
 from typing import Dict, List, Tuple
+from price_loader import load_price_frame
+from sentiment_window import (
+    compute_window_features,
+    empty_features,
+    features_to_vector,
+    load_news_windows,
+)
+import sentiment_feature_store
 
 
 class NewsFeatureExtractor:
@@ -73,67 +81,19 @@ class NewsFeatureExtractor:
         cur.close()
         conn.close()
 
-        if not news_items or len(news_items) == 0:
-            # ニュースがない場合はゼロベクトル
-            return {
-                'avg_sentiment': 0.0,
-                'sentiment_std': 0.0,
-                'bullish_ratio': 0.0,
-                'bearish_ratio': 0.0,
-                'neutral_ratio': 0.0,
-                'news_count': 0,
-                'sentiment_trend': 0.0,
-                'max_sentiment': 0.0,
-                'min_sentiment': 0.0
-            }
-
-        # センチメントスコアを抽出
+        # センチメントスコアを抽出（新しい順）
         sentiments = [float(n['sentiment_score']) for n in news_items]
         labels = [n['sentiment_label'] for n in news_items]
 
-        # 基本統計
-        avg_sentiment = np.mean(sentiments)
-        sentiment_std = np.std(sentiments) if len(sentiments) > 1 else 0.0
-        max_sentiment = np.max(sentiments)
-        min_sentiment = np.min(sentiments)
-
-        # ラベル分布
-        total_count = len(labels)
-        bullish_count = labels.count('bullish')
-        bearish_count = labels.count('bearish')
-        neutral_count = labels.count('neutral')
-
-        bullish_ratio = bullish_count / total_count if total_count > 0 else 0.0
-        bearish_ratio = bearish_count / total_count if total_count > 0 else 0.0
-        neutral_ratio = neutral_count / total_count if total_count > 0 else 0.0
-
-        # センチメント傾向（最近 vs 過去）
-        recent_days = min(3, len(sentiments) // 2)
-        if len(sentiments) >= 2:
-            recent_sentiment = np.mean(sentiments[:recent_days])
-            past_sentiment = np.mean(sentiments[recent_days:])
-            sentiment_trend = recent_sentiment - past_sentiment
-        else:
-            sentiment_trend = 0.0
-
-        return {
-            'avg_sentiment': float(avg_sentiment),
-            'sentiment_std': float(sentiment_std),
-            'bullish_ratio': float(bullish_ratio),
-            'bearish_ratio': float(bearish_ratio),
-            'neutral_ratio': float(neutral_ratio),
-            'news_count': int(total_count),
-            'sentiment_trend': float(sentiment_trend),
-            'max_sentiment': float(max_sentiment),
-            'min_sentiment': float(min_sentiment)
-        }
+        return compute_window_features(sentiments, labels)
 
     def create_training_dataset(
         self,
         symbols: List[str],
         start_date: datetime,
         end_date: datetime,
-        lookback_days: int = 7
+        lookback_days: int = 7,
+        use_feature_store: bool = True
     ) -> Tuple[np.ndarray, np.ndarray]:
         """
         複数銘柄の学習データセットを作成
@@ -143,6 +103,8 @@ class NewsFeatureExtractor:
             start_date: 開始日
             end_date: 終了日
             lookback_days: ニュース取得期間
+            use_feature_store: sentiment_features_daily から読む（7日窓のみ、
+                スキーマ未適用なら stock_news から計算）
 
         Returns:
             tuple: (特徴量行列, ラベルベクトル)
@@ -150,57 +112,48 @@ class NewsFeatureExtractor:
                 ラベル: 翌日の価格変化率
         """
         conn = self.get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            # 全銘柄の価格データを1回のCOPYで取得
+            frame = load_price_frame(conn, symbols, start_date=start_date, end_date=end_date)
+            history = None
+            if use_feature_store and lookback_days == sentiment_feature_store.LOOKBACK_DAYS:
+                try:
+                    history = sentiment_feature_store.load_feature_history(
+                        conn, symbols,
+                        start_date.date() if isinstance(start_date, datetime) else start_date,
+                        end_date.date() if isinstance(end_date, datetime) else end_date
+                    )
+                except psycopg2.errors.UndefinedTable:
+                    conn.rollback()
+            if history is None:
+                # 全銘柄のニュースを1回だけ読み込み、日ごとの特徴量はスライディングウィンドウで計算
+                windows = load_news_windows(conn, list(symbols), start_date, end_date, lookback_days)
+        finally:
+            conn.close()
 
         X = []  # 特徴量
         y = []  # ラベル（価格変化率）
 
-        for symbol in symbols:
-            # 価格データを取得
-            cur.execute("""
-                SELECT date, close_price
-                FROM stock_prices
-                WHERE symbol = %s
-                  AND date >= %s
-                  AND date <= %s
-                ORDER BY date ASC
-            """, (symbol, start_date, end_date))
-
-            prices = cur.fetchall()
-
-            for i in range(len(prices) - 1):
-                current_date = prices[i]['date']
-                current_price = float(prices[i]['close_price'])
-                next_price = float(prices[i + 1]['close_price'])
-
-                # センチメント特徴量を抽出
-                features = self.extract_sentiment_features(
-                    symbol,
-                    datetime.combine(current_date, datetime.min.time()),
-                    lookback_days
-                )
-
-                # 特徴量ベクトル
-                feature_vector = [
-                    features['avg_sentiment'],
-                    features['sentiment_std'],
-                    features['bullish_ratio'],
-                    features['bearish_ratio'],
-                    features['neutral_ratio'],
-                    features['news_count'],
-                    features['sentiment_trend'],
-                    features['max_sentiment'],
-                    features['min_sentiment']
-                ]
-
-                # ラベル: 翌日の価格変化率
-                price_change = (next_price - current_price) / current_price
-
-                X.append(feature_vector)
-                y.append(price_change)
+        for symbol, prices in frame.groupby(level='symbol', sort=False):
+            close = prices['close_price'].to_numpy()
+            dates = prices.index.get_level_values('date')
 
-        cur.close()
-        conn.close()
+            # ラベル: 翌日の価格変化率
+            price_changes = (close[1:] - close[:-1]) / close[:-1]
+
+            for i in range(len(close) - 1):
+                current_date = dates[i].date()
+
+                # センチメント特徴量（extract_sentiment_features と同じ値）
+                if history is not None:
+                    features = history[symbol].get(current_date) or empty_features()
+                else:
+                    features = windows[symbol].features(
+                        datetime.combine(current_date, datetime.min.time())
+                    )
+
+                X.append(features_to_vector(features))
+                y.append(price_changes[i])
 
         return np.array(X), np.array(y)
 
@@ -208,17 +161,41 @@ class NewsFeatureExtractor:
         """
         最新のセンチメント特徴量を取得（予測用）
 
+        sentiment_features_daily の翌日付の行（当日までのニュース）を主キー検索する
+        （未反映のニュースは読む前に再計算、スキーマ未適用なら同じウィンドウを
+        stock_news から計算）
+
         Args:
             symbol: 銘柄コード
 
         Returns:
             dict: 最新のセンチメント特徴量
         """
-        return self.extract_sentiment_features(
-            symbol,
-            datetime.now(),
-            lookback_days=7
-        )
+        return self.get_latest_features_many([symbol])[symbol]
+
+    def get_latest_features_many(self, symbols: List[str], conn=None) -> Dict[str, Dict[str, float]]:
+        """
+        複数銘柄の最新センチメント特徴量を1回の問い合わせで取得（get_latest_features と同じ値）
+
+        Args:
+            symbols: 銘柄コードのリスト
+            conn: 既存のDB接続（省略時は新規接続）
+
+        Returns:
+            dict: {銘柄コード: 最新のセンチメント特徴量}
+        """
+        own_conn = conn is None
+        if own_conn:
+            conn = self.get_db_connection()
+        try:
+            features = sentiment_feature_store.get_features_many(conn, symbols)
+            if own_conn:
+                # 読み出し時に再計算した行を残す
+                conn.commit()
+            return features
+        finally:
+            if own_conn:
+                conn.close()
 
 
 def create_feature_vector_for_symbol(symbol: str, db_config: Dict) -> np.ndarray:
@@ -235,14 +212,4 @@ def create_feature_vector_for_symbol(symbol: str, db_config: Dict) -> np.ndarray
     extractor = NewsFeatureExtractor(db_config)
     features = extractor.get_latest_features(symbol)
 
-    return np.array([
-        features['avg_sentiment'],
-        features['sentiment_std'],
-        features['bullish_ratio'],
-        features['bearish_ratio'],
-        features['neutral_ratio'],
-        features['news_count'],
-        features['sentiment_trend'],
-        features['max_sentiment'],
-        features['min_sentiment']
-    ])
+    return np.array(features_to_vector(features))
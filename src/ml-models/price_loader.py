@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+株価履歴の一括ローダー
+多銘柄・N日分の stock_prices を1回の COPY ... TO STDOUT で読み込み、
+RealDictCursor の行辞書を作らずに pandas DataFrame / NumPy 行列へ変換する
+"""
+import io
+from datetime import date
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ("open_price", "high_price", "low_price", "close_price", "volume")
+
+
+def _price_query(cur, symbols: List[str], columns: Sequence[str], last_n: Optional[int],
+                 start_date=None, end_date=None) -> str:
+    """
+    銘柄ごとに (symbol, date) インデックスを逆順に読む LATERAL クエリ
+    結果は入力銘柄順 → 日付昇順（行列化のため銘柄が連続して並ぶ）
+    終値が NULL の行は価格として使えないので読まない（last_n も有効な行で数える）
+    """
+    unknown = set(columns) - set(PRICE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown price columns: {sorted(unknown)}")
+
+    filters, params = ["AND close_price IS NOT NULL"], [symbols]
+    if start_date is not None:
+        filters.append("AND date >= %s")
+        params.append(start_date)
+    if end_date is not None:
+        filters.append("AND date <= %s")
+        params.append(end_date)
+    limit = ""
+    if last_n is not None:
+        limit = "LIMIT %s"
+        params.append(last_n)
+
+    sql = f"""
+        SELECT s.symbol, p.date, {', '.join('p.' + c for c in columns)}
+        FROM unnest(%s::text[]) WITH ORDINALITY AS s(symbol, ord)
+        CROSS JOIN LATERAL (
+            SELECT date, {', '.join(columns)}
+            FROM stock_prices
+            WHERE symbol = s.symbol
+              {' '.join(filters)}
+            ORDER BY date DESC
+            {limit}
+        ) p
+        ORDER BY s.ord, p.date
+    """
+    return cur.mogrify(sql, params).decode("utf-8")
+
+
+def load_price_frame(conn, symbols: Iterable[str], columns: Sequence[str] = ("close_price",),
+                     last_n: Optional[int] = None, start_date=None, end_date=None) -> pd.DataFrame:
+    """
+    複数銘柄の株価履歴を1クエリで取得
+
+    Args:
+        conn: psycopg2 接続
+        symbols: 銘柄コード
+        columns: PRICE_COLUMNS から取得する列
+        last_n: 銘柄ごとの直近N日（Noneなら期間全体）
+        start_date / end_date: 期間（いずれも含む）
+
+    Returns:
+        DataFrame: index=(symbol, date)、各列 float64。銘柄は入力順、日付は昇順
+        （終値が NULL の行は含まない。他の列の NULL は NaN）
+    """
+    symbols = list(dict.fromkeys(symbols))
+    columns = list(columns)
+    buf = io.StringIO()
+    with conn.cursor() as cur:
+        query = _price_query(cur, symbols, columns, last_n, start_date, end_date)
+        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", buf)
+    buf.seek(0)
+
+    # "NA" / "NULL" / "None" などの銘柄コードを欠損にしない（空欄だけが NULL）
+    frame = pd.read_csv(
+        buf,
+        dtype={"symbol": str, **{c: "float64" for c in columns}},
+        parse_dates=["date"],
+        keep_default_na=False,
+        na_values={c: [""] for c in columns},
+    )
+    if "close_price" in frame:
+        frame = frame[frame["close_price"].notna()]
+    return frame.set_index(["symbol", "date"])
+
+
+class PriceMatrix:
+    """
+    symbols × days の連続行列（float64）
+    履歴が短い銘柄は左側を NaN で埋め、各行の右端が最新日
+    latest_dates は各行の右端の日付（datetime64、データなしは NaT）
+    """
+
+    def __init__(self, symbols: List[str], values: np.ndarray, lengths: np.ndarray,
+                 latest_dates: Optional[np.ndarray] = None):
+        self.symbols = symbols
+        self.values = values
+        self.lengths = lengths
+        if latest_dates is None:
+            latest_dates = np.full(len(symbols), np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.latest_dates = latest_dates
+        self._positions = {s: i for i, s in enumerate(symbols)}
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._positions
+
+    def row(self, symbol: str) -> np.ndarray:
+        """銘柄の有効な履歴（日付昇順、NaN埋めなし）。データがなければ空配列"""
+        i = self._positions.get(symbol)
+        if i is None:
+            return self.values[:0, 0]
+        return self.values[i, self.values.shape[1] - self.lengths[i]:]
+
+    def latest_date(self, symbol: str) -> Optional[date]:
+        """行の右端（最新）の株価日付。データがなければ None"""
+        i = self._positions.get(symbol)
+        if i is None or np.isnat(self.latest_dates[i]):
+            return None
+        return pd.Timestamp(self.latest_dates[i]).date()
+
+
+def frame_to_matrix(frame: pd.DataFrame, symbols: Sequence[str], width: int,
+                    column: str = "close_price") -> PriceMatrix:
+    """load_price_frame の結果を右寄せの PriceMatrix に変換（Pythonループなし）"""
+    symbols = list(dict.fromkeys(symbols))
+    codes = pd.Categorical(frame.index.get_level_values("symbol"), categories=symbols).codes
+    counts = np.bincount(codes, minlength=len(symbols))
+
+    values = np.full((len(symbols), width), np.nan)
+    latest_dates = np.full(len(symbols), np.datetime64('NaT'), dtype='datetime64[ns]')
+    if len(codes):
+        # 行は銘柄ごとに連続・日付昇順なので、銘柄内の位置 = 通し番号 - 銘柄の開始位置
+        starts = np.cumsum(counts) - counts
+        pos_from_end = counts[codes] - (np.arange(len(codes)) - starts[codes])
+        keep = pos_from_end <= width
+        values[codes[keep], width - pos_from_end[keep]] = frame[column].to_numpy()[keep]
+        has_rows = counts > 0
+        dates = frame.index.get_level_values("date").to_numpy().astype('datetime64[ns]')
+        latest_dates[has_rows] = dates[(starts + counts - 1)[has_rows]]
+    return PriceMatrix(symbols, values, np.minimum(counts, width), latest_dates)
+
+
+def load_close_matrix(conn, symbols: Iterable[str], last_n: int, end_date=None,
+                      column: str = "close_price") -> PriceMatrix:
+    """複数銘柄の直近 last_n 日分を symbols × last_n の行列で取得"""
+    symbols = list(dict.fromkeys(symbols))
+    frame = load_price_frame(conn, symbols, columns=(column,), last_n=last_n, end_date=end_date)
+    return frame_to_matrix(frame, symbols, last_n, column)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日次センチメント特徴量ストア（sentiment_features_daily）
+(symbol, as_of_date) ごとに NewsFeatureExtractor の9特徴量
+（[as_of_date - 7日, as_of_date] の0時〜0時のニュース）を保持し、
+学習・バッチ予測・API は stock_news を集計せずに主キー検索で読む
+
+- 値は RollingSentimentWindow で計算（extract_sentiment_features と同一定義）
+- stock_news のトリガーが影響する日付範囲を sentiment_feature_dirty に記録し、
+  refresh_dirty がその範囲だけ再計算する（ニュース収集ジョブの後に実行）
+- get_features_many は読む前に対象銘柄のダーティ範囲を再計算するので、
+  どの経路で stock_news に書いてもリフレッシュジョブを待たずに最新の値を返す
+- スキーマ未適用時は同じウィンドウを stock_news から直接計算する（読み出し側は
+  スキーマの有無で値が変わらない）
+- 最新の特徴量は as_of_date = 翌日（当日までのニュースを含む）。マークした範囲は
+  翌日以降の日付まで一度に計算するので、日付が変わっても最新行は既に存在する
+- ニュースのないウィンドウは行を持たない（読み出し時はゼロベクトル）
+
+スキーマ: scripts/database/create_sentiment_feature_schema.sql
+（/admin/apply-sentiment-feature-schema）
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from sentiment_window import FEATURE_NAMES, empty_features, features_to_vector, load_news_windows
+
+LOOKBACK_DAYS = 7
+REFRESH_BATCH_SYMBOLS = 200
+
+_COLUMNS = ', '.join(FEATURE_NAMES)
+
+
+def latest_as_of(today: Optional[date] = None) -> date:
+    """最新特徴量の as_of_date（翌日0時 = 当日分までのニュースを含むウィンドウ）"""
+    return (today or date.today()) + timedelta(days=1)
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def _row_features(values: Sequence) -> Dict[str, float]:
+    features = {name: float(value) for name, value in zip(FEATURE_NAMES, values)}
+    features['news_count'] = int(features['news_count'])
+    return features
+
+
+def get_features_many(conn, symbols: Iterable[str],
+                      as_of_date: Optional[date] = None) -> Dict[str, Dict[str, float]]:
+    """
+    銘柄ごとの as_of_date の特徴量（ニュースがなければゼロベクトル）
+
+    読む前に対象銘柄のダーティ範囲を再計算する（呼び出し側のトランザクション内、
+    commit すれば再計算した行が残る）。スキーマ未適用ならロールバックして
+    stock_news から同じウィンドウを計算する
+    """
+    symbols = list(symbols)
+    as_of_date = as_of_date or latest_as_of()
+    try:
+        refresh_pending(conn, symbols)
+        return _read_features(conn, symbols, as_of_date)
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+    return compute_features_many(conn, symbols, as_of_date)
+
+
+def _read_features(conn, symbols: Sequence[str], as_of_date: date) -> Dict[str, Dict[str, float]]:
+    result = {symbol: empty_features() for symbol in symbols}
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT symbol, {_COLUMNS}
+            FROM sentiment_features_daily
+            WHERE symbol = ANY(%s) AND as_of_date = %s
+        """, (list(symbols), as_of_date))
+        for row in cur.fetchall():
+            result[row[0]] = _row_features(row[1:])
+    finally:
+        cur.close()
+    return result
+
+
+def compute_features_many(conn, symbols: Iterable[str],
+                          as_of_date: Optional[date] = None) -> Dict[str, Dict[str, float]]:
+    """ストアの行と同じウィンドウ（as_of_date 0時までの7日）を stock_news から計算"""
+    symbols = list(symbols)
+    at = _midnight(as_of_date or latest_as_of())
+    windows = load_news_windows(conn, symbols, at, at, LOOKBACK_DAYS)
+    return {symbol: windows[symbol].features(at) for symbol in symbols}
+
+
+def get_features(conn, symbol: str, as_of_date: Optional[date] = None) -> Dict[str, float]:
+    """1銘柄・1日の特徴量（主キー検索）"""
+    return get_features_many(conn, [symbol], as_of_date)[symbol]
+
+
+def load_feature_history(conn, symbols: Iterable[str], start_date: date,
+                         end_date: date) -> Dict[str, Dict[date, Dict[str, float]]]:
+    """学習用: {symbol: {as_of_date: 特徴量}}（行のない日は含まない）"""
+    history: Dict[str, Dict[date, Dict[str, float]]] = {symbol: {} for symbol in symbols}
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT symbol, as_of_date, {_COLUMNS}
+            FROM sentiment_features_daily
+            WHERE symbol = ANY(%s) AND as_of_date BETWEEN %s AND %s
+        """, (list(history), start_date, end_date))
+        for row in cur.fetchall():
+            history[row[0]][row[1]] = _row_features(row[2:])
+    finally:
+        cur.close()
+    return history
+
+
+def sentiment_summary(features: Dict[str, float]) -> Dict:
+    """特徴量 -> 旧 stock_sentiment_summary 形式のサマリー（同じ定義から導出）"""
+    count = features['news_count']
+    avg = features['avg_sentiment']
+    if avg > 0.3:
+        trend = 'bullish'
+    elif avg < -0.3:
+        trend = 'bearish'
+    else:
+        trend = 'neutral'
+    return {
+        'news_count': count,
+        'avg_sentiment': avg,
+        'positive_count': int(round(features['bullish_ratio'] * count)),
+        'negative_count': int(round(features['bearish_ratio'] * count)),
+        'neutral_count': int(round(features['neutral_ratio'] * count)),
+        'sentiment_trend': trend,
+        'sentiment_strength': abs(avg),
+    }
+
+
+def refresh_symbols(conn, ranges: Dict[str, Tuple[date, date]]) -> int:
+    """
+    銘柄ごとの [from_date, to_date] の行を再計算（呼び出し側のトランザクション内、commit しない）
+    翌日以降の日付も現在のニュースで計算する（新しいニュースが入ればトリガーが再度マークする）
+    戻り値: 書き込んだ行数
+    """
+    ranges = {s: (f, t) for s, (f, t) in ranges.items() if f <= t}
+    if not ranges:
+        return 0
+
+    start = min(f for f, _ in ranges.values())
+    end = max(t for _, t in ranges.values())
+    windows = load_news_windows(conn, list(ranges), _midnight(start), _midnight(end), LOOKBACK_DAYS)
+
+    rows = []
+    for symbol, (from_date, to_date) in ranges.items():
+        window = windows[symbol]
+        day = from_date
+        while day <= to_date:
+            features = window.features(_midnight(day))
+            if features['news_count']:
+                rows.append((symbol, day, *features_to_vector(features)))
+            day += timedelta(days=1)
+
+    cur = conn.cursor()
+    try:
+        execute_values(cur, """
+            DELETE FROM sentiment_features_daily f
+            USING (VALUES %s) AS r(symbol, from_date, to_date)
+            WHERE f.symbol = r.symbol AND f.as_of_date BETWEEN r.from_date AND r.to_date
+        """, [(s, f, t) for s, (f, t) in ranges.items()], template="(%s, %s::date, %s::date)")
+        if rows:
+            execute_values(cur, f"""
+                INSERT INTO sentiment_features_daily (symbol, as_of_date, {_COLUMNS})
+                VALUES %s
+            """, rows, page_size=1000)
+    finally:
+        cur.close()
+    return len(rows)
+
+
+def refresh_pending(conn, symbols: Sequence[str]) -> int:
+    """
+    読み出し前に、指定銘柄のダーティ範囲を呼び出し側のトランザクション内で再計算
+    （refresh_dirty の実行中の銘柄はそのコミットを待ってから読む。commit しない）
+    戻り値: 書き込んだ行数
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            DELETE FROM sentiment_feature_dirty d
+            USING (
+                SELECT symbol
+                FROM sentiment_feature_dirty
+                WHERE symbol = ANY(%(symbols)s::text[])
+                ORDER BY symbol
+                FOR UPDATE
+            ) claimed
+            WHERE d.symbol = claimed.symbol
+            RETURNING d.symbol, d.from_date, d.to_date
+        """, {'symbols': list(symbols)})
+        claimed = cur.fetchall()
+    finally:
+        cur.close()
+    if not claimed:
+        return 0
+    return refresh_symbols(conn, {s: (f, t) for s, f, t in claimed})
+
+
+def refresh_dirty(conn, symbols: Optional[Sequence[str]] = None,
+                  batch_size: int = REFRESH_BATCH_SYMBOLS) -> Dict[str, int]:
+    """
+    sentiment_feature_dirty の範囲を再計算（batch_size 銘柄ごとに commit）
+    マークした範囲（p::date .. p::date + 7）は未来の日付も含めてすぐに全部計算する
+    symbols を指定するとその銘柄だけ処理する
+    """
+    totals = {'symbols': 0, 'rows': 0}
+    while True:
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                DELETE FROM sentiment_feature_dirty d
+                USING (
+                    SELECT symbol
+                    FROM sentiment_feature_dirty
+                    WHERE %(symbols)s::text[] IS NULL OR symbol = ANY(%(symbols)s::text[])
+                    ORDER BY symbol
+                    LIMIT %(batch)s
+                    FOR UPDATE SKIP LOCKED
+                ) claimed
+                WHERE d.symbol = claimed.symbol
+                RETURNING d.symbol, d.from_date, d.to_date
+            """, {'symbols': list(symbols) if symbols is not None else None, 'batch': batch_size})
+            claimed = cur.fetchall()
+            cur.close()
+            if not claimed:
+                conn.commit()
+                break
+            totals['rows'] += refresh_symbols(conn, {s: (f, t) for s, f, t in claimed})
+            totals['symbols'] += len(claimed)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if len(claimed) < batch_size:
+            break
+    return totals
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    import psycopg2
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Refresh sentiment_features_daily")
+    parser.add_argument('--symbols', help='カンマ区切り（省略時は全ダーティ銘柄）')
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(
+        host=os.getenv('POSTGRES_HOST', 'localhost'),
+        port=int(os.getenv('POSTGRES_PORT', 5433)),
+        database=os.getenv('POSTGRES_DB', 'miraikakaku'),
+        user=os.getenv('POSTGRES_USER', 'postgres'),
+        password=os.getenv('POSTGRES_PASSWORD', 'Miraikakaku2024!'),
+    )
+    try:
+        print(refresh_dirty(conn, args.symbols.split(',') if args.symbols else None))
+    finally:
+        conn.close()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ローリングウィンドウ型センチメント特徴量エンジン
+銘柄のニュースを1回だけ published_at 降順で読み込み、全対象日の9特徴量を
+スライディングウィンドウ（境界は二分探索、ラベル件数は累積和）で計算する
+（従来は対象日ごとにDB接続を開いて7日分を再スキャンしていた）
+
+特徴量の定義は compute_window_features に一本化しており、
+NewsFeatureExtractor.extract_sentiment_features（1日ずつDB問い合わせ）と
+同じ並び・同じ NumPy 演算で計算するため値は完全に一致する
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+FEATURE_NAMES = (
+    'avg_sentiment',
+    'sentiment_std',
+    'bullish_ratio',
+    'bearish_ratio',
+    'neutral_ratio',
+    'news_count',
+    'sentiment_trend',
+    'max_sentiment',
+    'min_sentiment',
+)
+
+LABELS = ('bullish', 'bearish', 'neutral')
+
+
+def empty_features() -> Dict[str, float]:
+    """ニュースがない場合はゼロベクトル"""
+    features = {name: 0.0 for name in FEATURE_NAMES}
+    features['news_count'] = 0
+    return features
+
+
+def compute_window_features(sentiments: Sequence[float], labels: Sequence[str]) -> Dict[str, float]:
+    """
+    ウィンドウ内ニュース（published_at 降順）の9特徴量
+
+    Args:
+        sentiments: センチメントスコア（新しい順）
+        labels: センチメントラベル（新しい順）
+    """
+    if len(sentiments) == 0:
+        return empty_features()
+
+    # 基本統計
+    avg_sentiment = np.mean(sentiments)
+    sentiment_std = np.std(sentiments) if len(sentiments) > 1 else 0.0
+    max_sentiment = np.max(sentiments)
+    min_sentiment = np.min(sentiments)
+
+    # ラベル分布
+    labels = list(labels)
+    total_count = len(labels)
+    bullish_ratio = labels.count('bullish') / total_count
+    bearish_ratio = labels.count('bearish') / total_count
+    neutral_ratio = labels.count('neutral') / total_count
+
+    # センチメント傾向（最近 vs 過去）
+    recent_days = min(3, len(sentiments) // 2)
+    if len(sentiments) >= 2:
+        sentiment_trend = np.mean(sentiments[:recent_days]) - np.mean(sentiments[recent_days:])
+    else:
+        sentiment_trend = 0.0
+
+    return {
+        'avg_sentiment': float(avg_sentiment),
+        'sentiment_std': float(sentiment_std),
+        'bullish_ratio': float(bullish_ratio),
+        'bearish_ratio': float(bearish_ratio),
+        'neutral_ratio': float(neutral_ratio),
+        'news_count': int(total_count),
+        'sentiment_trend': float(sentiment_trend),
+        'max_sentiment': float(max_sentiment),
+        'min_sentiment': float(min_sentiment)
+    }
+
+
+def features_to_vector(features: Dict[str, float]) -> List[float]:
+    """特徴量辞書 -> FEATURE_NAMES 順のベクトル"""
+    return [features[name] for name in FEATURE_NAMES]
+
+
+class RollingSentimentWindow:
+    """
+    1銘柄分のニュース（published_at 降順）に対するスライディングウィンドウ
+
+    各対象日 t のウィンドウは [t - lookback_days, t]（両端含む、extract_sentiment_features と同じ）
+    ラベル件数は累積和で O(1)、平均・標準偏差・最大/最小・傾向は降順の連続スライスに対して
+    計算する（DB問い合わせ結果と同じ要素順なので浮動小数点の丸めも一致）
+    """
+
+    def __init__(self, news: Iterable[Tuple[datetime, float, str]], lookback_days: int = 7):
+        """
+        Args:
+            news: (published_at, sentiment_score, sentiment_label) の降順イテラブル
+            lookback_days: 過去何日分のニュースを見るか
+        """
+        news = list(news)
+        self.lookback = timedelta(days=lookback_days)
+        # 降順の時刻を負にして昇順化（searchsorted 用）
+        self._neg_time = -np.array([n[0] for n in news], dtype='datetime64[us]').astype(np.int64)
+        self._scores = np.array([float(n[1]) for n in news], dtype=np.float64)
+        self._labels = [n[2] for n in news]
+        self._label_counts = {
+            label: np.concatenate(([0], np.cumsum([x == label for x in self._labels])))
+            for label in LABELS
+        }
+        if np.any(np.diff(self._neg_time) < 0):
+            raise ValueError("news must be sorted by published_at descending")
+
+    @staticmethod
+    def _key(moment: datetime) -> int:
+        return -np.datetime64(moment, 'us').astype(np.int64)
+
+    def bounds(self, target_date: datetime) -> Tuple[int, int]:
+        """target_date のウィンドウに入るニュースの [lo, hi) インデックス"""
+        lo = int(np.searchsorted(self._neg_time, self._key(target_date), side='left'))
+        hi = int(np.searchsorted(self._neg_time, self._key(target_date - self.lookback), side='right'))
+        return lo, hi
+
+    def features(self, target_date: datetime) -> Dict[str, float]:
+        lo, hi = self.bounds(target_date)
+        total = hi - lo
+        if total == 0:
+            return empty_features()
+
+        sentiments = self._scores[lo:hi]
+        counts = {label: int(c[hi] - c[lo]) for label, c in self._label_counts.items()}
+
+        recent_days = min(3, total // 2)
+        if total >= 2:
+            sentiment_trend = np.mean(sentiments[:recent_days]) - np.mean(sentiments[recent_days:])
+        else:
+            sentiment_trend = 0.0
+
+        return {
+            'avg_sentiment': float(np.mean(sentiments)),
+            'sentiment_std': float(np.std(sentiments) if total > 1 else 0.0),
+            'bullish_ratio': float(counts['bullish'] / total),
+            'bearish_ratio': float(counts['bearish'] / total),
+            'neutral_ratio': float(counts['neutral'] / total),
+            'news_count': int(total),
+            'sentiment_trend': float(sentiment_trend),
+            'max_sentiment': float(np.max(sentiments)),
+            'min_sentiment': float(np.min(sentiments))
+        }
+
+    def feature_matrix(self, target_dates: Sequence[datetime]) -> np.ndarray:
+        """対象日ごとの特徴量行列 (len(target_dates), 9)"""
+        matrix = np.zeros((len(target_dates), len(FEATURE_NAMES)))
+        for i, target_date in enumerate(target_dates):
+            matrix[i] = features_to_vector(self.features(target_date))
+        return matrix
+
+
+def load_news_windows(conn, symbols: List[str], start_date: datetime, end_date: datetime,
+                      lookback_days: int = 7) -> Dict[str, RollingSentimentWindow]:
+    """
+    全銘柄の [start_date - lookback_days, end_date] のニュースを1回のクエリで読み込み、
+    銘柄ごとの RollingSentimentWindow を返す（ニュースのない銘柄も空ウィンドウを持つ）
+    """
+    news: Dict[str, List[Tuple[datetime, float, str]]] = {symbol: [] for symbol in symbols}
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT symbol, published_at, sentiment_score, sentiment_label
+            FROM stock_news
+            WHERE symbol = ANY(%s)
+              AND published_at >= %s
+              AND published_at <= %s
+            ORDER BY symbol, published_at DESC
+        """, (list(symbols), start_date - timedelta(days=lookback_days), end_date))
+        for symbol, published_at, score, label in cur:
+            news[symbol].append((published_at, score, label))
+    finally:
+        cur.close()
+    return {symbol: RollingSentimentWindow(items, lookback_days) for symbol, items in news.items()}
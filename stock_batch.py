@@ -0,0 +1,32 @@
+"""
+Batch Stock Details Helpers for Miraikakaku
+Shared by the sync and async /api/stocks/batch endpoints.
+
+Per-symbol details live in ranking_cache under details_key(symbol), so the
+single-symbol and batch endpoints read and fill the same entries (both come
+from mv_stock_details, which refresh_ranking_views() refreshes).
+"""
+
+import os
+from typing import List
+
+# Configuration
+DETAILS_BATCH_MAX_SYMBOLS = int(os.getenv("DETAILS_BATCH_MAX_SYMBOLS", 300))
+
+
+def details_key(symbol: str) -> str:
+    return f"details:{symbol.upper()}"
+
+
+def parse_symbols(symbols: str, max_symbols: int = DETAILS_BATCH_MAX_SYMBOLS) -> List[str]:
+    """Comma-separated symbols -> upper-cased, de-duplicated list in request order"""
+    seen = {}
+    for symbol in symbols.split(","):
+        symbol = symbol.strip().upper()
+        if symbol:
+            seen.setdefault(symbol, None)
+    if not seen:
+        raise ValueError("symbols must contain at least one symbol")
+    if len(seen) > max_symbols:
+        raise ValueError(f"Too many symbols: {len(seen)} (max {max_symbols})")
+    return list(seen)
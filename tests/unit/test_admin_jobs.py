@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""admin_jobs バックグラウンドジョブのテスト（DB不要）"""
+import threading
+
+import pytest
+
+from admin_jobs import job_handler, run_job
+
+LEASE = {"worker": "host:1:0", "attempts": 1}
+
+
+class FakeQueue:
+    """JobQueue と同じく (worker, attempts) のリースが一致するときだけ書き込む"""
+
+    def __init__(self, lease=LEASE):
+        self.lease = dict(lease)
+        self.progress_calls = []
+        self.heartbeats = 0
+        self.finished = None
+
+    def _holds(self, worker, attempts):
+        return self.lease == {"worker": worker, "attempts": attempts}
+
+    def progress(self, job_id, done, total, message, results=None, *, worker, attempts):
+        if not self._holds(worker, attempts):
+            return False
+        self.progress_calls.append((job_id, done, total, message, results))
+        return True
+
+    def heartbeat(self, job_id, *, worker, attempts):
+        if not self._holds(worker, attempts):
+            return False
+        self.heartbeats += 1
+        return True
+
+    def finish(self, job_id, result=None, error=None, error_traceback=None, *, worker, attempts):
+        if not self._holds(worker, attempts):
+            return False
+        self.finished = {"id": job_id, "result": result, "error": error, "traceback": error_traceback}
+        return True
+
+
+def _job(job_id, kind, params, **lease):
+    return {"id": job_id, "kind": kind, "params": params, **LEASE, **lease}
+
+
+@job_handler("test-sum")
+def _sum_job(params, job):
+    total = 0
+    for i, value in enumerate(params["values"], 1):
+        total += value
+        job.progress(i, len(params["values"]), f"value {value}", result={"value": value})
+    return {"total": total}
+
+
+@job_handler("test-fail")
+def _fail_job(params, job):
+    job.progress(1, 2, "first", result={"ok": True})
+    raise RuntimeError("boom")
+
+
+@job_handler("test-silent")
+def _silent_job(params, job):
+    # 進捗を報告しない長いジョブ（外部からの合図まで待つ）
+    params["release"].wait(5)
+    return {"done": True}
+
+
+@pytest.mark.unit
+def test_run_job_records_progress_and_result():
+    queue = FakeQueue()
+
+    assert run_job(queue, _job(7, "test-sum", {"values": [1, 2, 3]}))
+
+    assert [c[1] for c in queue.progress_calls] == [1, 2, 3]
+    assert queue.progress_calls[0] == (7, 1, 3, "value 1", [{"value": 1}])
+    assert queue.finished == {"id": 7, "result": {"total": 6}, "error": None, "traceback": None}
+
+
+@pytest.mark.unit
+def test_run_job_failure_keeps_partial_results():
+    queue = FakeQueue()
+
+    assert not run_job(queue, _job(8, "test-fail", {}))
+
+    assert queue.progress_calls == [(8, 1, 2, "first", [{"ok": True}])]
+    assert queue.finished["error"] == "RuntimeError: boom"
+    assert "Traceback" in queue.finished["traceback"]
+
+
+@pytest.mark.unit
+def test_run_job_unknown_kind():
+    queue = FakeQueue()
+
+    assert not run_job(queue, _job(9, "no-such-job", {}))
+    assert queue.finished["error"] == "Unknown job kind: no-such-job"
+
+
+@pytest.mark.unit
+def test_silent_job_keeps_its_lease_with_heartbeats():
+    queue = FakeQueue()
+    release = threading.Event()
+    original = queue.heartbeat
+
+    def heartbeat(job_id, **lease):
+        alive = original(job_id, **lease)
+        if queue.heartbeats >= 3:
+            release.set()
+        return alive
+
+    queue.heartbeat = heartbeat
+
+    assert run_job(queue, _job(10, "test-silent", {"release": release}), heartbeat_interval=0.01)
+
+    assert queue.heartbeats >= 3
+    assert queue.finished["result"] == {"done": True}
+
+
+@pytest.mark.unit
+def test_requeued_attempt_cannot_overwrite_the_rerun():
+    # attempts=1 の実行中に stale 判定で再キューされ、attempts=2 が claim 済み
+    queue = FakeQueue(lease={"worker": "host:2:0", "attempts": 2})
+
+    assert not run_job(queue, _job(11, "test-sum", {"values": [1, 2]}))
+    assert queue.progress_calls == []
+    assert queue.finished is None
+
+    release = threading.Event()
+    release.set()
+    assert not run_job(queue, _job(12, "test-silent", {"release": release}))
+    assert queue.finished is None
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""api_formatters のテスト"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from api_formatters import PRICE_COLUMNS, format_price_columns, format_price_row
+
+
+@pytest.mark.unit
+def test_price_columns_match_row_format():
+    rows = [
+        {"date": date(2025, 10, 2), "open_price": Decimal("10.5"), "high_price": Decimal("11"),
+         "low_price": Decimal("10"), "close_price": Decimal("10.75"), "volume": 1500},
+        {"date": date(2025, 10, 1), "open_price": None, "high_price": None,
+         "low_price": None, "close_price": Decimal("10.25"), "volume": None},
+    ]
+    columns = format_price_columns(rows)
+
+    assert tuple(columns) == PRICE_COLUMNS
+    as_rows = [dict(zip(PRICE_COLUMNS, values)) for values in zip(*columns.values())]
+    assert as_rows == [format_price_row(r) for r in rows]
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""arima_state のテスト（DB不要）"""
+import os
+import sys
+import warnings
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'scripts'))
+
+import arima_state  # noqa: E402
+from arima_state import ARIMA_REFIT_DAYS, MODEL_ORDER, fit_arima, load_states, save_states, summarize_fits  # noqa: E402
+
+TODAY = date(2025, 10, 10)
+
+
+@pytest.fixture(autouse=True)
+def quiet_statsmodels():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        yield
+
+
+@pytest.fixture(scope='module')
+def prices():
+    rng = np.random.default_rng(0)
+    return 100 + np.cumsum(rng.normal(0.05, 1.0, 250))
+
+
+@pytest.fixture(scope='module')
+def yesterday_state(prices):
+    """5営業日前までの窓で推定した状態（前回実行の保存値）"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        _, stats = fit_arima(prices[:-5], today=TODAY - timedelta(days=3))
+    return {'params': stats['params'], 'fitted_on': stats['fitted_on']}
+
+
+class FakeStateCursor:
+    """arima_model_state の upsert / 次数つき SELECT だけを模倣"""
+
+    def __init__(self):
+        self.table = {}
+        self._rows = []
+
+    def insert(self, rows):
+        for symbol, order, params, fitted_on, mode, seconds, iterations, converged in rows:
+            self.table[symbol] = {'symbol': symbol, 'model_order': order, 'params': params,
+                                  'fitted_on': fitted_on, 'fit_mode': mode}
+
+    def execute(self, sql, params=None):
+        symbols, order = params
+        self._rows = [dict(row) for symbol, row in self.table.items()
+                      if symbol in symbols and row['model_order'] == order]
+
+    def fetchall(self):
+        return self._rows
+
+
+@pytest.mark.unit
+def test_cold_fit_without_state(prices):
+    results, stats = fit_arima(prices, today=TODAY)
+
+    assert results is not None
+    assert stats['mode'] == 'cold'
+    assert stats['fitted_on'] == TODAY
+    assert len(stats['params']) == 3
+    assert stats['iterations'] > 0
+
+
+@pytest.mark.unit
+def test_extend_filters_new_observations_like_a_cold_fit(prices, yesterday_state):
+    extended, stats = fit_arima(prices, state=yesterday_state, today=TODAY)
+    cold, _ = fit_arima(prices, today=TODAY)
+
+    assert stats['mode'] == 'extend'
+    assert stats['iterations'] == 0 and stats['converged']
+    # 推定はせず、前回のパラメータと推定日を引き継ぐ
+    assert stats['params'] == pytest.approx(yesterday_state['params'])
+    assert stats['fitted_on'] == yesterday_state['fitted_on']
+    np.testing.assert_allclose(extended.forecast(7), cold.forecast(7), rtol=1e-3)
+
+
+@pytest.mark.unit
+def test_warm_refit_after_refit_days(prices, yesterday_state):
+    state = dict(yesterday_state, fitted_on=TODAY - timedelta(days=ARIMA_REFIT_DAYS))
+
+    _, stats = fit_arima(prices, state=state, today=TODAY)
+    _, cold = fit_arima(prices, today=TODAY)
+
+    assert stats['mode'] == 'warm'
+    assert stats['fitted_on'] == TODAY
+    assert stats['params'] == pytest.approx(cold['params'], rel=1e-3)
+
+
+@pytest.mark.unit
+def test_mismatched_state_falls_back_to_cold(prices):
+    # 次数変更前の保存値などパラメータ数が合わない状態
+    state = {'params': [0.1, 0.2], 'fitted_on': TODAY}
+
+    results, stats = fit_arima(prices, state=state, today=TODAY)
+
+    assert results is not None
+    assert stats['mode'] == 'cold'
+
+
+@pytest.mark.unit
+def test_failed_fit_returns_no_results(monkeypatch, prices):
+    class BrokenARIMA:
+        param_names = ['ar.L1', 'ma.L1', 'sigma2']
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def fit(self, **kwargs):
+            raise np.linalg.LinAlgError('singular')
+
+    monkeypatch.setattr(arima_state, 'ARIMA', BrokenARIMA)
+
+    results, stats = fit_arima(prices, today=TODAY)
+
+    assert results is None
+    assert stats['mode'] == 'failed' and stats['params'] is None
+
+
+@pytest.mark.unit
+def test_state_round_trip(monkeypatch, prices):
+    cur = FakeStateCursor()
+    monkeypatch.setattr(arima_state, 'execute_values', lambda cur, sql, rows: cur.insert(rows))
+    _, stats = fit_arima(prices, today=TODAY)
+    failed = {'mode': 'failed', 'params': None, 'fitted_on': TODAY,
+              'fit_seconds': 0.0, 'iterations': 0, 'converged': False}
+
+    assert save_states(cur, {'AAPL': stats, 'BAD': failed}) == 1
+    assert save_states(cur, {'BAD': failed}) == 0
+    cur.table['OLD'] = dict(cur.table['AAPL'], symbol='OLD', model_order='2,1,2')
+    states = load_states(cur, ['AAPL', 'BAD', 'OLD'])
+
+    assert cur.table['AAPL']['model_order'] == MODEL_ORDER
+    assert states == {'AAPL': {'params': stats['params'], 'fitted_on': TODAY}}
+    _, reused = fit_arima(prices, state=states['AAPL'], today=TODAY + timedelta(days=1))
+    assert reused['mode'] == 'extend'
+
+
+@pytest.mark.unit
+def test_summarize_fits():
+    stats = {
+        'AAPL': {'mode': 'extend', 'fit_seconds': 0.002, 'iterations': 0},
+        'MSFT': {'mode': 'warm', 'fit_seconds': 0.050, 'iterations': 4},
+        'GOOGL': {'mode': 'cold', 'fit_seconds': 0.200, 'iterations': 12},
+    }
+
+    lines = summarize_fits(stats, slowest=2)
+
+    assert lines[0] == "モード別: cold=1, extend=1, warm=1"
+    assert lines[1] == "フィット時間: 合計0.3秒 / 平均84.0ms / p95 50.0ms"
+    assert lines[2] == "反復回数（warm/cold）: 平均8.0 / 最大12"
+    assert lines[3] == "遅い銘柄: GOOGL(cold, 200ms, 12it), MSFT(warm, 50ms, 4it)"
+    assert summarize_fits({}) == ["ARIMAフィットなし"]
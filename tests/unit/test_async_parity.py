@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""同期版（psycopg2）と async版（asyncpg）の読み取りエンドポイントの一致テスト（DB不要）"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import api_predictions
+import api_queries
+import async_endpoints
+import db_async
+from ranking_cache import ranking_cache
+
+TODAY = date(2025, 10, 10)
+ASYNCPG_SQL = {api_queries.asyncpg_sql(value): value
+               for name, value in vars(api_queries).items() if name.endswith("_SQL")}
+
+
+class FakeReadDatabase:
+    """api_queries の SQL 定数ごとに行を返す（呼び出しを記録）"""
+
+    def __init__(self):
+        self.calls = []
+        self.details = [
+            {"symbol": symbol, "company_name": f"{symbol} Inc.", "exchange": "NASDAQ",
+             "current_price": 100.0 + i, "open_price": 99.0, "high_price": 101.5, "low_price": 98.5,
+             "current_volume": 1000 * (i + 1), "ensemble_prediction": 105.0, "ensemble_confidence": 0.8,
+             "predicted_change": 5.0, "last_updated": TODAY}
+            for i, symbol in enumerate(["AAPL", "MSFT"])
+        ]
+        self.rankings = [
+            {"symbol": f"S{i}", "company_name": None, "exchange": "TSE", "sector": "Tech",
+             "current_price": 10.0 + i, "change_percent": 1.5 * i}
+            for i in range(5)
+        ]
+        self.prices = [
+            {"date": TODAY - timedelta(days=i), "open_price": 10.0, "high_price": 11.0,
+             "low_price": 9.0, "close_price": 10.5 + i, "volume": 1000}
+            for i in range(5)
+        ]
+        self.predictions = [
+            {"symbol": "AAPL", "prediction_date": TODAY - timedelta(days=i // 2), "prediction_days": 7 - i % 2,
+             "current_price": 100.0, "lstm_prediction": 101.0, "arima_prediction": 102.0,
+             "ma_prediction": 103.0, "ensemble_prediction": 104.0 + i, "ensemble_confidence": 0.75}
+            for i in range(6)
+        ]
+        self.stats = {"today": TODAY, "total_rows": 6, "min_prediction_date": TODAY - timedelta(days=2),
+                      "max_prediction_date": TODAY, "last_modified": datetime(2025, 10, 10, 3, 0)}
+
+    def answer(self, sql, params):
+        self.calls.append((sql, tuple(params)))
+        q = api_queries
+        if sql == q.HOME_STATS_SQL:
+            return [{"total_symbols": 10, "active_symbols": 9, "symbols_with_future_predictions": 8,
+                     "symbols_with_predictions": 7, "avg_accuracy": 0.9, "models_running": 3}]
+        if sql == q.GAINERS_RANKING_SQL:
+            return self.rankings[:params[0]]
+        if sql == q.STOCK_DETAILS_SQL:
+            return [row for row in self.details if row["symbol"] == params[0].upper()]
+        if sql == q.STOCK_DETAILS_MANY_SQL:
+            return [row for row in self.details if row["symbol"] in params[0]]
+        if sql == q.PRICE_HISTORY_SQL:
+            return self.prices[:params[1]]
+        if sql == q.PREDICTION_STATS_SQL:
+            return [self.stats]
+        if sql == q.PREDICTION_WINDOW_COUNT_SQL:
+            return [{"total": len(self.predictions)}]
+        if sql == q.PREDICTIONS_AFTER_SQL:
+            after = (params[2], params[3])
+            rows = [r for r in self.predictions if (r["prediction_date"], r["prediction_days"]) < after]
+            return rows[:params[4]]
+        if sql == q.PREDICTIONS_PAGE_SQL:
+            return self.predictions[params[3]:params[3] + params[2]]
+        raise AssertionError(f"unexpected query: {sql}")
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        self.rows = self.db.answer(sql, params)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self.db)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAsyncConnection:
+    def __init__(self, db):
+        self.db = db
+
+    async def fetch(self, query, *args):
+        return self.db.answer(ASYNCPG_SQL[query], args)
+
+    async def fetchrow(self, query, *args):
+        rows = self.db.answer(ASYNCPG_SQL[query], args)
+        return rows[0] if rows else None
+
+
+class FakeAcquire:
+    def __init__(self, db):
+        self.db = db
+
+    async def __aenter__(self):
+        return FakeAsyncConnection(self.db)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeAsyncPool:
+    """asyncpg.Pool の acquire() だけを持つフェイク"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def acquire(self, timeout=None):
+        return FakeAcquire(self.db)
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    sync_db, async_db = FakeReadDatabase(), FakeReadDatabase()
+    monkeypatch.setattr(api_predictions, "get_db_connection", lambda: FakeConnection(sync_db))
+    monkeypatch.setattr(db_async, "_pool", FakeAsyncPool(async_db))
+
+    async_app = FastAPI()
+    async_app.include_router(async_endpoints.router)
+    return (TestClient(api_predictions.app), sync_db), (TestClient(async_app), async_db)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("url", [
+    "/api/home/stats/summary",
+    "/api/home/rankings/gainers?limit=3",
+    "/api/stocks/aapl/details",
+    "/api/stocks/NOPE/details",
+    "/api/stocks/batch?symbols=aapl,msft,nope",
+    "/api/stocks/AAPL/price?days=3",
+    "/api/stocks/AAPL/price/columnar?days=3",
+    "/api/stocks/AAPL/predictions?limit=4",
+    "/api/stocks/AAPL/predictions?limit=4&page=3",
+    "/api/stocks/AAPL/predictions?limit=4&count=exact&cursor=eyJkIjoiMjAyNS0xMC0wOSIsIm4iOjd9",
+])
+def test_sync_and_async_endpoints_return_the_same_response(clients, url):
+    (sync_client, sync_db), (async_client, async_db) = clients
+
+    ranking_cache.invalidate()
+    expected = sync_client.get(url)
+    ranking_cache.invalidate()
+    actual = async_client.get(url)
+
+    assert actual.status_code == expected.status_code
+    assert actual.json() == expected.json()
+    assert actual.headers.get("etag") == expected.headers.get("etag")
+    # 同じ SQL 定数を同じパラメータで実行している（asyncpg 側は $n に変換済み）
+    assert async_db.calls == sync_db.calls
+
+
+@pytest.mark.unit
+def test_asyncpg_sql_numbers_placeholders():
+    sql = api_queries.asyncpg_sql(api_queries.PREDICTIONS_AFTER_SQL)
+    assert "%s" not in sql
+    assert [f"${n}" in sql for n in range(1, 6)] == [True] * 5
+    assert "(prediction_date, prediction_days) < ($3::date, $4::int)" in sql
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""baseline_engine のテスト"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'scripts'))
+
+from baseline_engine import (  # noqa: E402
+    calculate_ensemble_prediction,
+    ensemble_matrix,
+    generate_ma_prediction,
+    ma_matrix,
+)
+
+
+def _right_aligned(histories, width):
+    values = np.full((len(histories), width), np.nan)
+    for i, prices in enumerate(histories):
+        if len(prices):
+            values[i, width - len(prices):] = prices
+    return values, np.array([len(p) for p in histories])
+
+
+@pytest.mark.unit
+def test_ma_matrix_matches_per_symbol():
+    rng = np.random.default_rng(0)
+    width = 60
+    histories = [rng.uniform(50, 5000, size=n) for n in (0, 3, 4, 5, 7, 9, 10, 11, 30, 60)]
+    values, lengths = _right_aligned(histories, width)
+
+    result = ma_matrix(values, lengths, window=5)
+
+    for prices, got in zip(histories, result):
+        expected = generate_ma_prediction(prices, window=5)
+        if expected is None:
+            assert np.isnan(got)
+        else:
+            assert got == expected
+
+
+@pytest.mark.unit
+def test_ensemble_matrix_matches_per_symbol():
+    rng = np.random.default_rng(1)
+    n, horizons = 400, 4
+    lstm = rng.uniform(50, 150, size=(n, horizons))
+    arima = rng.uniform(50, 150, size=(n, horizons))
+    ma = rng.uniform(50, 150, size=(n, 1))
+    current = rng.uniform(80, 120, size=(n, 1))
+    # 欠損（NaN）、0 以下、現在価格 0 を混ぜる
+    lstm[rng.random((n, horizons)) < 0.3] = np.nan
+    arima[rng.random((n, horizons)) < 0.3] = np.nan
+    arima[rng.random((n, horizons)) < 0.05] = -1.0
+    ma[rng.random((n, 1)) < 0.2] = np.nan
+    lstm[rng.random((n, horizons)) < 0.05] = 0.0
+    current[rng.random((n, 1)) < 0.05] = 0.0
+
+    ensemble, confidence = ensemble_matrix(lstm, arima, ma, current)
+
+    def as_input(x):
+        return None if np.isnan(x) else float(x)
+
+    for i in range(n):
+        for j in range(horizons):
+            expected = calculate_ensemble_prediction(
+                as_input(lstm[i, j]), as_input(arima[i, j]), as_input(ma[i, 0]), float(current[i, 0])
+            )
+            if expected[0] is None:
+                assert np.isnan(ensemble[i, j])
+                assert confidence[i, j] == 0.0
+            else:
+                assert (ensemble[i, j], confidence[i, j]) == expected
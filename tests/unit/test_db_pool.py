@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""db_pool コネクションプールのテスト（DB不要）"""
+import threading
+import time
+
+import pytest
+from psycopg2 import extensions
+
+from db_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self, *args, **kwargs):
+        conn = self
+
+        class Cursor:
+            def execute(self, sql, params=None):
+                if conn.closed:
+                    raise RuntimeError("closed")
+
+            def close(self):
+                pass
+
+        return Cursor()
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def connect():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    kwargs.setdefault("min_size", 0)
+    kwargs.setdefault("max_size", 2)
+    return ConnectionPool(connect=connect, **kwargs), created
+
+
+@pytest.mark.unit
+def test_connection_is_reused_after_close():
+    pool, created = make_pool()
+    conn = pool.getconn()
+    conn.close()
+    conn = pool.getconn()
+    conn.close()
+
+    assert len(created) == 1
+    stats = pool.stats()
+    assert stats["acquired"] == 2
+    assert stats["idle"] == 1 and stats["in_use"] == 0
+
+
+@pytest.mark.unit
+def test_release_rolls_back_open_transaction_and_resets_autocommit():
+    pool, created = make_pool()
+    conn = pool.getconn()
+    conn.autocommit = True
+    created[0].status = extensions.TRANSACTION_STATUS_INTRANS
+    conn.close()
+
+    assert created[0].rollbacks == 1
+    assert created[0].autocommit is False
+
+
+@pytest.mark.unit
+def test_acquire_timeout_is_counted():
+    pool, _ = make_pool(max_size=1, acquire_timeout=0.05)
+    held = pool.getconn()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+    held.close()
+
+    assert pool.stats()["acquire_timeouts"] == 1
+
+
+@pytest.mark.unit
+def test_waiter_receives_released_connection():
+    pool, created = make_pool(max_size=1, acquire_timeout=2)
+    held = pool.getconn()
+    result = {}
+
+    def worker():
+        conn = pool.getconn()
+        result["conn"] = conn._conn
+        conn.close()
+
+    t = threading.Thread(target=worker)
+    t.start()
+    time.sleep(0.05)
+    held.close()
+    t.join(timeout=2)
+
+    assert result["conn"] is created[0]
+    assert pool.stats()["max_wait_ms"] > 0
+
+
+@pytest.mark.unit
+def test_connections_past_max_lifetime_are_recycled():
+    pool, created = make_pool(max_lifetime=0)
+    pool.getconn().close()
+    pool.getconn().close()
+
+    assert len(created) == 2
+    assert created[0].closed
+    assert pool.stats()["recycled"] >= 1
+
+
+@pytest.mark.unit
+def test_broken_connection_is_replaced_after_health_check():
+    pool, created = make_pool(health_check_interval=0)
+    pool.getconn().close()
+    created[0].closed = 1
+    conn = pool.getconn()
+
+    assert conn._conn is created[1]
+    assert pool.stats()["broken"] == 1
+
+
+@pytest.mark.unit
+def test_unclosed_proxy_is_returned_on_garbage_collection():
+    pool, _ = make_pool(max_size=1, acquire_timeout=0.05)
+    conn = pool.getconn()
+    del conn
+
+    pool.getconn().close()
+    assert pool.stats()["size"] == 1
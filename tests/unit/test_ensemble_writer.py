@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""ensemble_writer のテスト（DB不要）"""
+import csv
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'scripts'))
+
+from ensemble_writer import COLUMNS, STAGING_TABLE, EnsembleWriter, format_write_report  # noqa: E402
+
+
+class FakeMergeConnection:
+    """
+    一時テーブルへの COPY と集合演算 upsert を模した接続
+    merge の DISTINCT ON は ORDER BY に staged_seq DESC があるときだけ最後にステージした行を選ぶ
+    （ないときは PostgreSQL 同様どの行が残るかは保証されないので、最初の行を選ぶ）
+    """
+
+    def __init__(self, existing=()):
+        # COPY された値と同じく文字列で保持
+        self.table = {tuple(str(v) for v in row[:3]): [str(v) for v in row] for row in existing}
+        self.staged = []
+        self.queries = []
+        self.commits = 0
+        self.rollbacks = 0
+        self._result = None
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.queries.append(sql)
+        if sql.startswith("TRUNCATE"):
+            self.staged = []
+        elif "INSERT INTO ensemble_predictions" in sql:
+            self._result = self._merge(sql)
+
+    def copy_expert(self, sql, buf):
+        self.queries.append(sql)
+        for row in csv.reader(io.StringIO(buf.read())):
+            self.staged.append([v or None for v in row])
+
+    def _merge(self, sql):
+        last_wins = "staged_seq DESC" in sql
+        chosen = {}
+        for row in self.staged:
+            key = tuple(row[:3])
+            if last_wins or key not in chosen:
+                chosen[key] = row
+        inserted = sum(1 for key in chosen if key not in self.table)
+        self.table.update(chosen)
+        return inserted, len(chosen) - inserted
+
+    def fetchone(self):
+        return self._result
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.staged = []
+
+
+def _row(symbol, prediction_date, days, ensemble):
+    return (symbol, prediction_date, days, 100.0, 101.0, None, 99.0, ensemble, 0.8)
+
+
+@pytest.mark.unit
+def test_merge_counts_inserted_and_updated_and_last_staged_row_wins():
+    conn = FakeMergeConnection(existing=[_row('AAPL', '2025-10-01', 7, 1.0)])
+    writer = EnsembleWriter(conn)
+
+    writer.stage([_row('AAPL', '2025-10-01', 7, 2.0), _row('MSFT', '2025-10-01', 7, 3.0)])
+    writer.stage([_row('MSFT', '2025-10-01', 7, 4.0)])
+    report = writer.merge()
+
+    assert (report['rows_staged'], report['inserted'], report['updated']) == (3, 1, 1)
+    assert conn.table[('MSFT', '2025-10-01', '7')][7] == '4.0'
+    assert conn.table[('AAPL', '2025-10-01', '7')][7] == '2.0'
+    # 欠損値は空欄（COPY csv の NULL）、列順は COLUMNS
+    assert conn.table[('AAPL', '2025-10-01', '7')][5] is None
+    copy_sql = next(q for q in conn.queries if q.startswith("COPY"))
+    assert f"COPY {STAGING_TABLE} ({', '.join(COLUMNS)}) FROM STDIN" in copy_sql
+    assert any("staged_seq BIGSERIAL" in q for q in conn.queries)
+    assert conn.staged == [] and conn.commits == 2
+
+
+@pytest.mark.unit
+def test_rollback_discards_unmerged_rows_and_report_accumulates():
+    conn = FakeMergeConnection()
+    writer = EnsembleWriter(conn)
+
+    writer.stage([_row('AAPL', '2025-10-01', 7, 1.0)])
+    writer.merge()
+    writer.stage([_row('MSFT', '2025-10-01', 7, 2.0), _row('GOOGL', '2025-10-01', 7, 3.0)])
+    writer.rollback()
+    writer.stage([_row('AAPL', '2025-10-01', 7, 5.0)])
+    report = writer.merge()
+
+    assert conn.rollbacks == 1
+    assert (report['rows_staged'], report['inserted'], report['updated']) == (2, 1, 1)
+    assert set(conn.table) == {('AAPL', '2025-10-01', '7')}
+    assert writer.stage([]) == 0
+    assert format_write_report(report)[:3] == ["ステージング行数: 2", "新規挿入: 1", "更新: 1"]
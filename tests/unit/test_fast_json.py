@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""fast_json のテスト"""
+import json
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from api_formatters import format_price_row
+from fast_json import json_response
+
+
+@pytest.mark.unit
+def test_matches_default_fastapi_encoding():
+    rows = [{"date": date(2025, 10, 1), "open_price": Decimal("1.5"), "high_price": Decimal("2"),
+             "low_price": Decimal("1"), "close_price": Decimal("1.75"), "volume": 1200}]
+    payload = {"prices": [format_price_row(r) for r in rows], "raw": Decimal("0.25"), "total": None}
+
+    fast = json.loads(json_response(payload).body)
+    legacy = json.loads(JSONResponse(content=jsonable_encoder(payload)).body)
+    assert fast == legacy
+
+
+@pytest.mark.unit
+def test_forwards_cache_headers_from_injected_response():
+    injected = Response()
+    injected.headers["ETag"] = 'W/"abc"'
+    injected.headers["Cache-Control"] = "public, max-age=300"
+
+    resp = json_response([], injected)
+    assert resp.headers["etag"] == 'W/"abc"'
+    assert resp.headers["cache-control"] == "public, max-age=300"
+    assert resp.media_type == "application/json"
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""http_cache の ETag / 304 テスト"""
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from http_cache import conditional_response, make_etag
+
+app = FastAPI()
+VERSION = {"value": 1}
+
+
+@app.get("/resource")
+def resource(request: Request, response: Response):
+    etag = make_etag("resource", VERSION["value"])
+    not_modified = conditional_response(request, response, etag, "rankings")
+    return not_modified or {"version": VERSION["value"]}
+
+
+client = TestClient(app)
+
+
+@pytest.mark.unit
+def test_matching_if_none_match_returns_304_with_headers():
+    first = client.get("/resource")
+    assert first.status_code == 200
+    assert first.headers["cache-control"].startswith("public, max-age=")
+
+    second = client.get("/resource", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == first.headers["etag"]
+
+
+@pytest.mark.unit
+def test_weak_comparison_and_etag_lists():
+    etag = client.get("/resource").headers["etag"]
+    strong = etag[2:]
+    response = client.get("/resource", headers={"If-None-Match": f'"other", {strong}'})
+    assert response.status_code == 304
+
+
+@pytest.mark.unit
+def test_changed_version_returns_full_response():
+    etag = client.get("/resource").headers["etag"]
+    VERSION["value"] += 1
+    response = client.get("/resource", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""lite_inference のテスト（TensorFlow / tflite_runtime 不要）"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'ml-models'))
+
+import lite_inference  # noqa: E402
+from lite_inference import LiteModel, _batches, accuracy_delta, export_tflite, metadata_path  # noqa: E402
+
+
+class StubRunner:
+    """NewsEnhancedLSTM と同じ入力名の signature（出力 = 入力の和）"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def get_input_details(self):
+        return {'price_sequence': {'dtype': np.float32}, 'news_features': {'dtype': np.float32}}
+
+    def get_output_details(self):
+        return {'price_prediction': {}}
+
+    def __call__(self, price_sequence, news_features):
+        self.batch_sizes.append(len(price_sequence))
+        return {'price_prediction': price_sequence.sum(axis=(1, 2))[:, None] + news_features.sum(axis=1)[:, None]}
+
+
+class StubInterpreter:
+    def __init__(self, model_path, num_threads=None):
+        self.runner = StubRunner()
+
+    def get_signature_runner(self):
+        return self.runner
+
+
+@pytest.mark.unit
+def test_accuracy_delta_reports_abs_and_relative_error():
+    reference = np.array([[100.0, 200.0], [50.0, -10.0]])
+    candidate = reference + np.array([[1.0, -2.0], [0.0, 0.5]])
+
+    delta = accuracy_delta(reference, candidate)
+
+    assert delta['samples'] == 2
+    assert delta['max_abs_diff'] == 2.0
+    assert delta['mean_abs_diff'] == pytest.approx(3.5 / 4)
+    assert delta['max_rel_diff'] == pytest.approx(0.05)
+
+
+@pytest.mark.unit
+def test_batches_split_every_input_together():
+    inputs = {'price_sequence': np.arange(10).reshape(5, 2), 'news_features': np.arange(5)}
+
+    batches = list(_batches(inputs, 2))
+
+    assert [len(b['news_features']) for b in batches] == [2, 2, 1]
+    assert batches[2]['price_sequence'].tolist() == [[8, 9]]
+
+
+@pytest.mark.unit
+def test_export_rejects_unknown_quantization_before_loading_tensorflow():
+    with pytest.raises(ValueError):
+        export_tflite(None, 'models/AAPL_lstm_model.tflite', quantization='int4')
+    assert metadata_path('models/AAPL_lstm_model.tflite') == 'models/AAPL_lstm_model_lite.json'
+
+
+@pytest.mark.unit
+def test_lite_model_predicts_in_batches_without_importing_tensorflow(monkeypatch, tmp_path):
+    monkeypatch.setattr(lite_inference, 'Interpreter', StubInterpreter)
+    monkeypatch.delitem(sys.modules, 'tensorflow', raising=False)
+    from news_enhanced_lstm import NewsEnhancedLSTM
+
+    model = NewsEnhancedLSTM({})
+    model.load_model(str(tmp_path / 'news_lstm.tflite'))
+    X = {'price_sequence': np.arange(30.0).reshape(5, 3, 2)[:, :, :1], 'news_features': np.ones((5, 9))}
+
+    out = model.model.predict(X, batch_size=2, verbose=0)
+
+    assert isinstance(model.model, LiteModel)
+    assert out.shape == (5, 1)
+    np.testing.assert_allclose(out[:, 0], X['price_sequence'].sum(axis=(1, 2)) + 9)
+    assert model.model._runner.batch_sizes == [2, 2, 1]
+    assert 'tensorflow' not in sys.modules
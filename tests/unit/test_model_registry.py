@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""model_registry のテスト（TensorFlow不要）"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'scripts'))
+
+from model_registry import ModelRegistry  # noqa: E402
+
+
+def _write_model(directory, symbol, trained_at, version=None, formats=('.h5',), lite_version=None):
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f'{symbol}_lstm_model')
+    for ext in formats:
+        with open(base + ext, 'wb') as f:
+            f.write(b'x')
+    if '.tflite' in formats:
+        # export_tflite のサイドカー（書き出し元のバージョン）
+        with open(base + '_lite.json', 'w') as f:
+            json.dump({'version': lite_version or version}, f)
+    metadata = {'symbol': symbol, 'lookback_days': 60, 'prediction_days': 7, 'trained_at': trained_at}
+    if version:
+        metadata['version'] = version
+    with open(base + '_metadata.json', 'w') as f:
+        json.dump(metadata, f)
+
+
+def _registry(tmp_path, max_bytes=100, sizes=None):
+    loaded = []
+
+    def loader(entry):
+        loaded.append((entry['symbol'], entry['version'], entry['format']))
+        return entry['symbol']
+
+    registry = ModelRegistry(str(tmp_path), max_bytes=max_bytes, loader=loader,
+                             size_of=lambda model, entry: (sizes or {}).get(model, 10))
+    return registry, loaded
+
+
+@pytest.mark.unit
+def test_latest_version_prefers_lite_and_loads_once(tmp_path):
+    _write_model(tmp_path, 'AAPL', '2025-09-01T00:00:00')
+    _write_model(tmp_path / 'AAPL' / '20251001000000', 'AAPL', '2025-10-01T00:00:00',
+                 version='20251001000000', formats=('.h5', '.tflite'))
+    registry, loaded = _registry(tmp_path)
+
+    assert registry.versions('AAPL') == ['2025-09-01T00:00:00', '20251001000000']
+    assert registry.get('AAPL') == 'AAPL'
+    assert registry.get('AAPL') == 'AAPL'
+    registry.get('AAPL', '2025-09-01T00:00:00')
+
+    assert loaded == [('AAPL', '20251001000000', 'tflite'), ('AAPL', '2025-09-01T00:00:00', 'h5')]
+    stats = registry.stats()
+    assert (stats['hits'], stats['misses'], stats['loads']) == (1, 2, 2)
+    with pytest.raises(KeyError):
+        registry.get('MSFT')
+
+
+@pytest.mark.unit
+def test_lru_evicts_least_recently_used_by_size(tmp_path):
+    for i, symbol in enumerate(['A', 'B', 'C']):
+        _write_model(tmp_path, symbol, f'2025-10-0{i + 1}T00:00:00')
+    registry, loaded = _registry(tmp_path, max_bytes=100, sizes={'A': 40, 'B': 40, 'C': 40})
+
+    registry.get('A')
+    registry.get('B')
+    registry.get('A')  # A を最近使用にする
+    registry.get('C')  # 120 > 100 -> B を解放
+    registry.get('A')
+    registry.get('B')
+
+    assert [s for s, _, _ in loaded] == ['A', 'B', 'C', 'B']
+    stats = registry.stats()
+    assert stats['evictions'] == 2
+    assert stats['live_models'] == 2 and stats['live_bytes'] == 80
+    assert (stats['hits'], stats['misses']) == (2, 4)
+
+
+@pytest.mark.unit
+def test_lite_export_from_previous_training_is_not_served(tmp_path):
+    # v1 を書き出した後、同じパスの .h5 / scaler / metadata だけが v2 に再学習された状態
+    _write_model(tmp_path, 'AAPL', '2025-10-02T00:00:00', version='v2',
+                 formats=('.h5', '.tflite'), lite_version='v1')
+    _write_model(tmp_path, 'MSFT', '2025-10-02T00:00:00', formats=('.tflite',), lite_version='v1')
+    registry, loaded = _registry(tmp_path)
+
+    registry.get('AAPL')
+
+    assert loaded == [('AAPL', 'v2', 'h5')]
+    assert registry.symbols() == ['AAPL']
+
+
+@pytest.mark.unit
+def test_legacy_metadata_without_version_serves_lite_export(tmp_path):
+    # version を持たない旧メタデータ: export_lite はサイドカーに trained_at を書き、レジストリも trained_at で照合する
+    _write_model(tmp_path, 'AAPL', '2025-09-01T00:00:00', formats=('.h5', '.tflite'),
+                 lite_version='2025-09-01T00:00:00')
+    _write_model(tmp_path, 'MSFT', '2025-09-01T00:00:00', formats=('.h5', '.tflite'))
+    with open(tmp_path / 'MSFT_lstm_model_lite.json', 'w') as f:
+        json.dump({'version': None}, f)
+    registry, loaded = _registry(tmp_path)
+
+    registry.get('AAPL')
+    registry.get('MSFT')
+
+    assert loaded == [('AAPL', '2025-09-01T00:00:00', 'tflite'), ('MSFT', '2025-09-01T00:00:00', 'h5')]
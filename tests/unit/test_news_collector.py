@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""news_collector のテスト（ネットワーク・DB不要）"""
+import asyncio
+
+import pytest
+
+from news_collector import (
+    AlphaVantageProvider,
+    Backoff,
+    NewsCollector,
+    Provider,
+    Throttled,
+    TokenBucket,
+    fan_out_feed,
+    is_alpha_vantage_throttled,
+    parse_rate,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+def test_parse_rate():
+    assert parse_rate("5/60") == (5, 60.0, 5)
+    assert parse_rate("60/60:10") == (60, 60.0, 10)
+    with pytest.raises(ValueError):
+        parse_rate("5 per minute")
+    with pytest.raises(ValueError):
+        parse_rate("0/60")
+
+
+@pytest.mark.unit
+def test_token_bucket_burst_then_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(5, 60, burst=2, clock=clock)
+
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == pytest.approx(12.0)
+
+    clock.now += 12
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire(2) == pytest.approx(24.0)
+
+
+@pytest.mark.unit
+def test_token_bucket_penalize_blocks_and_empties():
+    clock = FakeClock()
+    bucket = TokenBucket(60, 60, burst=10, clock=clock)
+
+    bucket.penalize(30)
+    assert bucket.try_acquire() == pytest.approx(30.0)
+
+    clock.now += 30
+    # ブロック解除直後はトークン0から補充（30秒で30 → 上限10）
+    assert bucket.try_acquire() == 0
+
+
+@pytest.mark.unit
+def test_backoff_doubles_and_resets():
+    backoff = Backoff(base=12, cap=60)
+    assert [backoff.next() for _ in range(4)] == [12, 24, 48, 60]
+    backoff.reset()
+    assert backoff.next() == 12
+
+
+@pytest.mark.unit
+def test_alpha_vantage_throttle_detection():
+    assert is_alpha_vantage_throttled({"Note": "Thank you for using Alpha Vantage! ..."})
+    assert is_alpha_vantage_throttled({"Information": "daily rate limit"})
+    assert not is_alpha_vantage_throttled({"feed": [], "items": "0"})
+    assert not is_alpha_vantage_throttled([])
+
+
+class FakeProvider(Provider):
+    name = "yfinance"
+
+    def __init__(self, throttle_first=0):
+        super().__init__(rate_spec="1000/1")
+        self.backoff = Backoff(base=0.001)
+        self.throttle_first = throttle_first
+        self.calls = []
+
+    def fetch(self, symbol, company_name):
+        self.calls.append(symbol)
+        if self.throttle_first:
+            self.throttle_first -= 1
+            raise Throttled("Note")
+        return [{"symbol": symbol, "url": f"https://example.com/{symbol}"}]
+
+
+@pytest.mark.unit
+def test_collector_retries_after_throttle_and_reports_progress():
+    provider = FakeProvider(throttle_first=1)
+    saved, progress = [], []
+
+    def save(conn, rows):
+        saved.extend(rows)
+        return {"inserted": len(rows), "duplicates": 0}
+
+    async def run():
+        collector = NewsCollector(None, [provider], lambda d, t, e: progress.append((d, t)), save=save)
+        return await collector.run([("7203.T", "トヨタ"), ("6758.T", "ソニー")])
+
+    summary = asyncio.run(run())
+
+    stats = summary["providers"]["yfinance"]
+    assert stats["throttled"] == 1
+    assert stats["saved"] == 2 and stats["errors"] == 0
+    assert sorted(r["symbol"] for r in saved) == ["6758.T", "7203.T"]
+    assert sorted(progress) == [(1, 2), (2, 2)]
+
+
+def _article(url, *tickers):
+    return {
+        "title": url, "url": url, "source": "src", "summary": "",
+        "time_published": "20240105T093000",
+        "ticker_sentiment": [
+            {"ticker": t, "ticker_sentiment_score": "0.25", "ticker_sentiment_label": "Bullish",
+             "relevance_score": "0.5"}
+            for t in tickers
+        ],
+    }
+
+
+@pytest.mark.unit
+def test_fan_out_feed_rows_for_every_tracked_ticker():
+    feed = [_article("u1", "AAPL", "MSFT", "GOOG"), _article("u2", "MSFT"), _article("u1", "AAPL")]
+    feed[1]["topics"] = [{"topic": "Technology", "relevance_score": "1.0"}]
+
+    rows = fan_out_feed(feed, ["AAPL", "MSFT"])
+
+    assert sorted(rows) == ["AAPL", "MSFT"]
+    assert [r["url"] for r in rows["AAPL"]] == ["u1"]
+    assert [r["url"] for r in rows["MSFT"]] == ["u1", "u2"]
+    assert rows["AAPL"][0]["sentiment_score"] == 0.25
+    assert rows["AAPL"][0]["topics"] is None
+    assert rows["MSFT"][1]["topics"] == ["Technology"]
+
+
+class FakeAlphaVantage(AlphaVantageProvider):
+    def __init__(self, feeds):
+        super().__init__(api_key="test", rate_spec="1000/1")
+        self.feeds = feeds
+        self.calls = []
+
+    def fetch_feed(self, tickers=None, limit=50):
+        self.calls.append(tickers)
+        return self.feeds.get(tickers, [])
+
+
+@pytest.mark.unit
+def test_alpha_vantage_sweep_then_fills_uncovered_symbols():
+    provider = FakeAlphaVantage({
+        None: [_article("u1", "AAPL", "MSFT")],
+        "NVDA": [_article("u2", "NVDA", "TSLA")],
+    })
+    saved = []
+
+    def save(conn, rows):
+        saved.extend(rows)
+        return {"inserted": len(rows), "duplicates": 0}
+
+    async def run():
+        collector = NewsCollector(None, [provider], save=save)
+        return await collector.run([("AAPL", "Apple"), ("MSFT", "Microsoft"),
+                                    ("NVDA", "NVIDIA"), ("TSLA", "Tesla")])
+
+    summary = asyncio.run(run())
+
+    # 市場フィード1回 + NVDA 個別1回（TSLA は NVDA の応答でカバー済み）
+    assert provider.calls == [None, "NVDA"]
+    assert sorted((r["symbol"], r["url"]) for r in saved) == [
+        ("AAPL", "u1"), ("MSFT", "u1"), ("NVDA", "u2"), ("TSLA", "u2"),
+    ]
+    stats = summary["providers"]["alphavantage"]
+    assert stats["skipped_requests"] == 3 and stats["saved"] == 4
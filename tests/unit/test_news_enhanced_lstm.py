@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""NewsEnhancedLSTM.predict_many のテスト（TensorFlow・DB不要）"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'ml-models'))
+
+import news_enhanced_lstm  # noqa: E402
+from news_enhanced_lstm import NewsEnhancedLSTM  # noqa: E402
+from price_loader import PriceMatrix  # noqa: E402
+
+SEQ_LEN = 5
+
+HISTORIES = {
+    'AAPL': [100.0, 101.5, 99.0, 102.0, 103.5, 104.0, 102.5],
+    'MSFT': [300.0, 305.0, 302.0, 310.0, 308.0],
+    'SHORT': [10.0, 11.0, 12.0],
+}
+
+FEATURES = {
+    symbol: {
+        'avg_sentiment': 0.1 * i, 'sentiment_std': 0.2, 'bullish_ratio': 0.5, 'bearish_ratio': 0.2,
+        'neutral_ratio': 0.3, 'news_count': 4 + i, 'sentiment_trend': -0.05 * i,
+        'max_sentiment': 0.8, 'min_sentiment': -0.4,
+    }
+    for i, symbol in enumerate(list(HISTORIES) + ['NODATA'])
+}
+
+
+class StubModel:
+    """行ごとに決まる予測（バッチの組み方に依存しない）"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, inputs, batch_size=None, verbose=0):
+        price, news = inputs['price_sequence'], inputs['news_features']
+        self.calls.append(len(price))
+        return (price[:, -1, :] * 0.5 + price[:, 0, :] * 0.25 + news.sum(axis=1, keepdims=True) * 0.1)
+
+
+class StubExtractor:
+    def get_latest_features(self, symbol):
+        return FEATURES[symbol]
+
+    def get_latest_features_many(self, symbols, conn=None):
+        return {symbol: FEATURES[symbol] for symbol in symbols}
+
+
+class FakeConnection:
+    def close(self):
+        pass
+
+
+def fake_load_close_matrix(conn, symbols, last_n, end_date=None):
+    """load_close_matrix と同じ右寄せ・NaN埋めの PriceMatrix"""
+    values = np.full((len(symbols), last_n), np.nan)
+    lengths = np.zeros(len(symbols), dtype=int)
+    for i, symbol in enumerate(symbols):
+        history = HISTORIES.get(symbol, [])[-last_n:]
+        lengths[i] = len(history)
+        if history:
+            values[i, last_n - len(history):] = history
+    return PriceMatrix(list(symbols), values, lengths)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setattr(news_enhanced_lstm, 'load_close_matrix', fake_load_close_matrix)
+    monkeypatch.setattr(news_enhanced_lstm.psycopg2, 'connect', lambda **kwargs: FakeConnection())
+    lstm = NewsEnhancedLSTM({}, price_sequence_length=SEQ_LEN)
+    lstm.news_extractor = StubExtractor()
+    lstm.model = StubModel()
+    return lstm
+
+
+@pytest.mark.unit
+def test_predict_many_matches_predict_per_symbol(model):
+    batched = model.predict_many(['AAPL', 'MSFT', 'AAPL'], batch_size=2)
+
+    assert list(batched) == ['AAPL', 'MSFT']
+    assert model.model.calls == [2]
+    for symbol in ['AAPL', 'MSFT']:
+        single = model.predict(symbol)
+        assert batched[symbol].keys() == single.keys()
+        for key, value in single.items():
+            assert batched[symbol][key] == pytest.approx(value, rel=1e-12), (symbol, key)
+    assert batched['AAPL']['current_price'] == 102.5
+
+
+@pytest.mark.unit
+def test_predict_many_reports_short_history_without_dropping_others(model):
+    batched = model.predict_many(['SHORT', 'MSFT', 'NODATA'])
+
+    assert batched['SHORT'] == {'error': 'Not enough price data for SHORT'}
+    assert batched['NODATA'] == {'error': 'Not enough price data for NODATA'}
+    assert batched['MSFT'] == pytest.approx(model.predict('MSFT'))
+    with pytest.raises(ValueError, match='Not enough price data for SHORT'):
+        model.predict('SHORT')
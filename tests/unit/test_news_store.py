@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""news_store のテスト（DB不要）"""
+from datetime import datetime
+
+import pytest
+
+from news_store import NEWS_COLUMNS, prepare_news_rows, save_news_batch
+
+
+def _row(symbol, url, score=0.1, **extra):
+    row = {"symbol": symbol, "title": f"{symbol} {url}", "url": url, "source": "src",
+           "published_at": datetime(2024, 1, 5, 9, 30), "sentiment_score": score}
+    row.update(extra)
+    return row
+
+
+@pytest.mark.unit
+def test_prepare_news_rows_dedupes_keeping_last_and_counts_invalid():
+    rows = [
+        _row("AAPL", "u1", 0.1),
+        _row("MSFT", "u1", 0.2),
+        _row("AAPL", "u1", 0.3),
+        _row("AAPL", "", 0.4),
+        _row("AAPL", "u2", 0.5, published_at=None),
+    ]
+
+    staged, invalid, duplicates = prepare_news_rows(rows)
+
+    assert invalid == 2 and duplicates == 1
+    score = NEWS_COLUMNS.index("sentiment_score")
+    assert [(r[0], r[2], r[score]) for r in staged] == [("MSFT", "u1", 0.2), ("AAPL", "u1", 0.3)]
+    assert all(len(r) == len(NEWS_COLUMNS) for r in staged)
+
+
+@pytest.mark.unit
+def test_prepare_news_rows_truncates_varchar_columns():
+    staged, _, _ = prepare_news_rows([_row("AAPL", "u1", source="x" * 300, title=None)])
+
+    row = dict(zip(NEWS_COLUMNS, staged[0]))
+    assert len(row["source"]) == 100
+    assert row["title"] == "" and row["topics"] is None
+
+
+@pytest.mark.unit
+def test_save_news_batch_without_valid_rows_skips_database():
+    counts = save_news_batch(None, [_row("AAPL", ""), _row("AAPL", None)])
+
+    assert counts == {"received": 2, "inserted": 0, "updated": 0, "duplicates": 0,
+                      "invalid": 2, "unknown_symbol": 0}
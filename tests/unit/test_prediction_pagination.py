@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""prediction_pagination のテスト"""
+from datetime import date
+
+import pytest
+
+from prediction_pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    estimate_window_count,
+    next_cursor,
+    resolve_count_mode,
+)
+
+
+@pytest.mark.unit
+def test_cursor_roundtrip_and_invalid_cursor():
+    cursor = encode_cursor(date(2025, 10, 1), 7)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (date(2025, 10, 1), 7)
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.unit
+def test_next_cursor_only_on_full_page():
+    rows = [{"prediction_date": date(2025, 10, 2), "prediction_days": 3},
+            {"prediction_date": date(2025, 10, 1), "prediction_days": 14}]
+    assert next_cursor(rows, 3) is None
+    assert decode_cursor(next_cursor(rows, 2)) == (date(2025, 10, 1), 14)
+
+
+@pytest.mark.unit
+def test_estimate_window_count():
+    stats = {"total_rows": 100, "min_prediction_date": date(2025, 1, 1),
+             "max_prediction_date": date(2025, 4, 10)}
+    today = date(2025, 4, 10)
+    assert estimate_window_count(stats, today, 365) == 100
+    assert estimate_window_count(stats, today, 49) == 50
+    assert estimate_window_count(None, today, 365) == 0
+
+
+@pytest.mark.unit
+def test_count_mode_defaults_avoid_the_windowed_count():
+    assert resolve_count_mode(None, None) == "estimate"
+    assert resolve_count_mode(None, "abc") == "none"
+    assert resolve_count_mode("exact", None) == "exact"
+    with pytest.raises(ValueError):
+        resolve_count_mode("all", None)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""price_loader のテスト"""
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'ml-models'))
+
+from price_loader import frame_to_matrix, load_close_matrix, load_price_frame  # noqa: E402
+
+
+def _frame(rows):
+    frame = pd.DataFrame(rows, columns=['symbol', 'date', 'close_price'])
+    frame['date'] = pd.to_datetime(frame['date'])
+    return frame.set_index(['symbol', 'date'])
+
+
+@pytest.mark.unit
+def test_frame_to_matrix_right_aligns_and_pads():
+    frame = _frame([
+        ('7203.T', '2025-10-01', 1.0), ('7203.T', '2025-10-02', 2.0), ('7203.T', '2025-10-03', 3.0),
+        ('AAPL', '2025-10-03', 10.0),
+    ])
+    matrix = frame_to_matrix(frame, ['7203.T', 'AAPL', 'MSFT'], width=2)
+
+    assert matrix.values.shape == (3, 2)
+    assert matrix.values.flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(matrix.row('7203.T'), [2.0, 3.0])
+    np.testing.assert_array_equal(matrix.row('AAPL'), [10.0])
+    assert len(matrix.row('MSFT')) == 0
+    assert np.isnan(matrix.values[1, 0])
+
+
+@pytest.mark.unit
+def test_frame_to_matrix_keeps_latest_price_date_per_symbol():
+    frame = _frame([
+        ('7203.T', '2025-10-01', 1.0), ('7203.T', '2025-10-02', 2.0),
+        ('AAPL', '2025-09-30', 10.0), ('AAPL', '2025-10-01', 11.0), ('AAPL', '2025-10-03', 12.0),
+    ])
+    matrix = frame_to_matrix(frame, ['7203.T', 'MSFT', 'AAPL'], width=2)
+
+    # 行列の幅で切り詰めても最新日は右端の日付
+    assert matrix.latest_date('7203.T') == date(2025, 10, 2)
+    assert matrix.latest_date('AAPL') == date(2025, 10, 3)
+    assert matrix.latest_date('MSFT') is None
+    assert matrix.latest_date('GOOGL') is None
+
+
+class FakeCopyConnection:
+    """COPY ... TO STDOUT の結果として固定の CSV を返す接続"""
+
+    def __init__(self, csv_text):
+        self.csv_text = csv_text
+        self.queries = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def mogrify(self, sql, params):
+        return sql.encode('utf-8')
+
+    def copy_expert(self, sql, buf):
+        self.queries.append(sql)
+        buf.write(self.csv_text)
+
+
+@pytest.mark.unit
+def test_load_price_frame_keeps_na_like_tickers():
+    conn = FakeCopyConnection(
+        "symbol,date,close_price\n"
+        "NA,2025-10-01,1.5\n"
+        "NULL,2025-10-01,2.5\n"
+        "None,2025-10-01,3.5\n"
+    )
+    matrix = load_close_matrix(conn, ['NA', 'NULL', 'None'], last_n=1)
+
+    assert matrix.row('NA').tolist() == [1.5]
+    assert matrix.row('NULL').tolist() == [2.5]
+    assert matrix.row('None').tolist() == [3.5]
+
+
+@pytest.mark.unit
+def test_load_price_frame_drops_rows_without_close():
+    conn = FakeCopyConnection(
+        "symbol,date,open_price,close_price\n"
+        "AAPL,2025-10-01,10.0,11.0\n"
+        "AAPL,2025-10-02,12.0,\n"
+        "AAPL,2025-10-03,,13.0\n"
+    )
+    frame = load_price_frame(conn, ['AAPL'], columns=('open_price', 'close_price'))
+
+    assert frame.loc['AAPL', 'close_price'].tolist() == [11.0, 13.0]
+    assert np.isnan(frame.loc['AAPL', 'open_price'].iloc[1])
+    assert 'close_price IS NOT NULL' in conn.queries[0]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""price_watermark のテスト（DB不要）"""
+import os
+import sys
+
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'scripts'))
+
+import price_watermark  # noqa: E402
+from price_watermark import advance_watermarks, load_changed_symbols, select_changed_symbols  # noqa: E402
+
+SCRIPT = 'ensemble'
+
+
+class FakeWatermarkConnection:
+    """
+    stock_price_changes / prediction_watermarks をトランザクション付きで模倣
+    ウォーターマークの書き込みは commit まで保留し、rollback で破棄する
+    """
+
+    def __init__(self, changes, schema=True):
+        self.changes = dict(changes)
+        self.watermarks = {}
+        self.pending = {}
+        self.schema = schema
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeWatermarkCursor(self)
+
+    def commit(self):
+        self.watermarks.update(self.pending)
+        self.pending = {}
+        self.commits += 1
+
+    def rollback(self):
+        self.pending = {}
+        self.rollbacks += 1
+
+
+class FakeWatermarkCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        if not self.conn.schema:
+            raise psycopg2.errors.UndefinedTable('relation "stock_price_changes" does not exist')
+        (script,) = params
+        seen = {**self.conn.watermarks, **self.conn.pending}
+        self._rows = [
+            {'symbol': symbol, 'company_name': f'{symbol} Inc.', 'change_seq': seq}
+            for symbol, seq in sorted(self.conn.changes.items())
+            if seq > seen.get((script, symbol), 0)
+        ]
+
+    def fetchall(self):
+        return self._rows
+
+
+@pytest.fixture(autouse=True)
+def fake_execute_values(monkeypatch):
+    def execute_values(cur, sql, rows):
+        assert 'GREATEST' in sql
+        for script, symbol, seq in rows:
+            key = (script, symbol)
+            current = cur.conn.pending.get(key, cur.conn.watermarks.get(key, 0))
+            cur.conn.pending[key] = max(current, seq)
+
+    monkeypatch.setattr(price_watermark, 'execute_values', execute_values)
+
+
+@pytest.mark.unit
+def test_only_symbols_changed_since_the_last_commit_are_selected():
+    conn = FakeWatermarkConnection({'AAPL': 3, 'MSFT': 5})
+    cur = conn.cursor()
+
+    symbols, change_seqs = select_changed_symbols(conn, cur, SCRIPT)
+    assert [s['symbol'] for s in symbols] == ['AAPL', 'MSFT']
+    assert change_seqs == {'AAPL': 3, 'MSFT': 5}
+
+    # 予測の保存と同じトランザクションで進める
+    assert advance_watermarks(cur, SCRIPT, {'AAPL': 3}) == 1
+    assert conn.commits == 0
+    conn.commit()
+
+    assert [s['symbol'] for s in load_changed_symbols(cur, SCRIPT)] == ['MSFT']
+    conn.changes['AAPL'] = 4  # 株価の追加・修正でトリガーが change_seq を進める
+    assert [s['symbol'] for s in load_changed_symbols(cur, SCRIPT)] == ['AAPL', 'MSFT']
+    # 他のジョブのウォーターマークとは独立
+    assert len(load_changed_symbols(cur, 'lstm')) == 2
+
+
+@pytest.mark.unit
+def test_failed_batch_rollback_keeps_symbols_pending():
+    conn = FakeWatermarkConnection({'AAPL': 3})
+    cur = conn.cursor()
+    _, change_seqs = select_changed_symbols(conn, cur, SCRIPT)
+
+    advance_watermarks(cur, SCRIPT, change_seqs)
+    conn.rollback()
+
+    assert [s['symbol'] for s in load_changed_symbols(cur, SCRIPT)] == ['AAPL']
+    assert advance_watermarks(cur, SCRIPT, {}) == 0
+
+
+@pytest.mark.unit
+def test_watermark_never_moves_backwards():
+    conn = FakeWatermarkConnection({'AAPL': 7})
+    cur = conn.cursor()
+    advance_watermarks(cur, SCRIPT, {'AAPL': 7})
+    conn.commit()
+
+    # 古い change_seq を読んだ実行が後からコミットしても戻らない
+    advance_watermarks(cur, SCRIPT, {'AAPL': 2})
+    conn.commit()
+
+    assert conn.watermarks[(SCRIPT, 'AAPL')] == 7
+    assert load_changed_symbols(cur, SCRIPT) == []
+
+
+@pytest.mark.unit
+def test_missing_schema_falls_back_after_rollback():
+    conn = FakeWatermarkConnection({'AAPL': 3}, schema=False)
+
+    assert select_changed_symbols(conn, conn.cursor(), SCRIPT) is None
+    assert conn.rollbacks == 1
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""ranking_cache のテスト"""
+import pytest
+
+from ranking_cache import RankingCache
+
+
+@pytest.mark.unit
+def test_smaller_limit_is_sliced_from_cached_ranking():
+    cache = RankingCache(ttl=60, min_fetch=100)
+    rows = list(range(100))
+    cache.put("gainers", rows, cache.generation, cache.fetch_limit(50))
+
+    assert cache.get("gainers", 10) == list(range(10))
+    assert cache.get("gainers", 100) == rows
+    assert cache.get("gainers", 150) is None
+
+
+@pytest.mark.unit
+def test_short_ranking_answers_any_limit():
+    cache = RankingCache(ttl=60, min_fetch=100)
+    cache.put("losers", [1, 2, 3], cache.generation, 100)
+
+    assert cache.get("losers", 500) == [1, 2, 3]
+
+
+@pytest.mark.unit
+def test_invalidate_drops_entries_and_rejects_stale_store():
+    cache = RankingCache(ttl=60, min_fetch=10)
+    generation = cache.generation
+    cache.put("stats_summary", {"totalSymbols": 1}, generation)
+    cache.invalidate()
+
+    assert cache.get("stats_summary") is None
+    # リフレッシュ前に読み始めた結果は保存されない
+    cache.put("stats_summary", {"totalSymbols": 1}, generation)
+    assert cache.get("stats_summary") is None
+    assert cache.stats()["stale_stores"] == 1
+
+
+@pytest.mark.unit
+def test_entries_expire_after_ttl():
+    cache = RankingCache(ttl=0, min_fetch=10)
+    cache.put("volume", [1], cache.generation, 10)
+
+    assert cache.get("volume", 1) is None
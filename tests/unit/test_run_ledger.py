@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""run_ledger のテスト（DB不要）"""
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'scripts'))
+
+import run_ledger  # noqa: E402
+from run_ledger import (completed_symbols, finish_run, load_stale_symbols, record_price_dates,  # noqa: E402
+                        record_results, start_run)
+
+SCRIPT = 'ensemble'
+TODAY = date(2025, 10, 10)
+
+
+class FakeLedgerCursor:
+    """prediction_runs / prediction_run_ledger / prediction_price_dates の各文だけを模倣（RealDictCursor 相当）"""
+
+    def __init__(self, latest_prices=None):
+        self.runs = {}
+        self.ledger = {}
+        self.price_dates = {}
+        # 銘柄 -> stock_prices の最新日付（None は株価なし）
+        self.latest_prices = latest_prices or {}
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        if "INSERT INTO prediction_runs" in sql:
+            script, run_date = params
+            run_id = len(self.runs) + 1
+            self.runs[run_id] = {'script': script, 'run_date': run_date, 'status': 'running', 'total_symbols': None}
+            self._rows = [{'run_id': run_id}]
+        elif "WHERE run_id = %s AND script = %s" in sql:
+            run_id, script = params
+            run = self.runs.get(run_id)
+            if run is not None and run['script'] == script:
+                run['status'] = 'running'
+                self._rows = [{'run_id': run_id}]
+            else:
+                self._rows = []
+        elif "status <> 'completed'" in sql:
+            script, run_date = params
+            unfinished = [run_id for run_id, run in self.runs.items()
+                          if run['script'] == script and run['run_date'] == run_date and run['status'] != 'completed']
+            if unfinished:
+                self.runs[max(unfinished)]['status'] = 'running'
+            self._rows = [{'run_id': max(unfinished)}] if unfinished else []
+        elif "FROM prediction_run_ledger" in sql:
+            run_id, horizons, statuses, needed = params
+            done = {}
+            for (rid, symbol, days), status in self.ledger.items():
+                if rid == run_id and days in horizons and status in statuses:
+                    done.setdefault(symbol, set()).add(days)
+            self._rows = [{'symbol': symbol} for symbol, days in done.items() if len(days) == needed]
+        elif "UPDATE prediction_runs" in sql:
+            status, total_symbols, run_id = params
+            self.runs[run_id].update(status=status, total_symbols=total_symbols)
+        elif "FROM stock_master" in sql:
+            (script,) = params
+            self._rows = [
+                {'symbol': symbol, 'company_name': f'{symbol} Inc.'}
+                for symbol, latest in sorted(self.latest_prices.items())
+                if latest is not None and (
+                    (script, symbol) not in self.price_dates or latest > self.price_dates[(script, symbol)])
+            ]
+        else:
+            raise AssertionError(f"unexpected query: {sql}")
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+
+@pytest.fixture(autouse=True)
+def fake_execute_values(monkeypatch):
+    def execute_values(cur, sql, rows):
+        for row in rows:
+            if "prediction_run_ledger" in sql:
+                run_id, symbol, days, status = row
+                cur.ledger[(run_id, symbol, days)] = status
+            else:
+                script, symbol, price_date, run_id = row
+                cur.price_dates[(script, symbol)] = price_date
+
+    monkeypatch.setattr(run_ledger, 'execute_values', execute_values)
+
+
+@pytest.mark.unit
+def test_stopped_run_resumes_and_skips_completed_symbols():
+    cur = FakeLedgerCursor()
+    run_id, resumed = start_run(cur, SCRIPT, TODAY)
+    assert resumed is False
+
+    # 7203.T は全ホライズン完了、AAPL は1本失敗、MSFT は未着手のまま停止
+    record_results(cur, run_id, [('7203.T', 1, 'saved'), ('7203.T', 7, 'skipped'),
+                                 ('AAPL', 1, 'saved'), ('AAPL', 7, 'failed')])
+    assert start_run(cur, SCRIPT, TODAY) == (run_id, True)
+    assert completed_symbols(cur, run_id, [1, 7]) == {'7203.T'}
+
+    # 失敗分の再試行は同じ行を上書きする
+    record_results(cur, run_id, [('AAPL', 7, 'saved')])
+    assert completed_symbols(cur, run_id, [1, 7]) == {'7203.T', 'AAPL'}
+    assert record_results(cur, run_id, []) == 0
+
+
+@pytest.mark.unit
+def test_completed_or_fresh_runs_start_a_new_run():
+    cur = FakeLedgerCursor()
+    first, _ = start_run(cur, SCRIPT, TODAY)
+    finish_run(cur, first, 'completed', total_symbols=3)
+    assert cur.runs[first]['status'] == 'completed' and cur.runs[first]['total_symbols'] == 3
+
+    second, resumed = start_run(cur, SCRIPT, TODAY)
+    assert second != first and resumed is False
+    third, resumed = start_run(cur, SCRIPT, TODAY, fresh=True)
+    assert third not in (first, second) and resumed is False
+
+    # run_id 指定は完了済みでも再開し、存在しない run はエラー
+    assert start_run(cur, SCRIPT, TODAY, run_id=first) == (first, True)
+    assert cur.runs[first]['status'] == 'running'
+    with pytest.raises(ValueError):
+        start_run(cur, SCRIPT, TODAY, run_id=99)
+
+
+@pytest.mark.unit
+def test_only_stale_selects_symbols_with_newer_prices_than_last_prediction():
+    cur = FakeLedgerCursor(latest_prices={
+        '7203.T': date(2025, 10, 9), 'AAPL': date(2025, 10, 9), 'MSFT': date(2025, 10, 8), 'NEW': None,
+    })
+    assert [s['symbol'] for s in load_stale_symbols(cur, SCRIPT)] == ['7203.T', 'AAPL', 'MSFT']
+
+    run_id, _ = start_run(cur, SCRIPT, TODAY)
+    # 履歴のない銘柄（最新日付 None）は記録しない
+    assert record_price_dates(cur, SCRIPT, run_id, {
+        '7203.T': date(2025, 10, 9), 'AAPL': date(2025, 10, 8), 'MSFT': date(2025, 10, 8), 'NEW': None,
+    }) == 3
+    assert [s['symbol'] for s in load_stale_symbols(cur, SCRIPT)] == ['AAPL']
+    # 別スクリプトの記録とは独立
+    assert [s['symbol'] for s in load_stale_symbols(cur, 'lstm')] == ['7203.T', 'AAPL', 'MSFT']
+
+    cur.latest_prices['7203.T'] = date(2025, 10, 10)
+    assert [s['symbol'] for s in load_stale_symbols(cur, SCRIPT)] == ['7203.T', 'AAPL']
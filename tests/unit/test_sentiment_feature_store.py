@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""sentiment_feature_store のテスト（DB不要）"""
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'ml-models'))
+
+import sentiment_feature_store  # noqa: E402
+from sentiment_feature_store import (  # noqa: E402
+    _row_features,
+    compute_features_many,
+    get_features_many,
+    latest_as_of,
+    refresh_dirty,
+    sentiment_summary,
+)
+from sentiment_window import RollingSentimentWindow, features_to_vector  # noqa: E402
+
+
+@pytest.mark.unit
+def test_latest_as_of_is_next_midnight():
+    assert latest_as_of(date(2025, 10, 31)) == date(2025, 11, 1)
+
+
+@pytest.mark.unit
+def test_stored_row_round_trip_and_summary():
+    window = RollingSentimentWindow([
+        (datetime(2025, 10, 3, 15), 0.6, 'bullish'),
+        (datetime(2025, 10, 2, 9), 0.5, 'bullish'),
+        (datetime(2025, 10, 1, 12), -0.1, 'neutral'),
+    ])
+    features = window.features(datetime(2025, 10, 4))
+
+    # DB の1行（FEATURE_NAMES 順の列）から同じ辞書が復元できる
+    assert _row_features(features_to_vector(features)) == features
+
+    summary = sentiment_summary(features)
+    assert summary['news_count'] == 3
+    assert summary['positive_count'] == 2 and summary['neutral_count'] == 1
+    assert summary['negative_count'] == 0
+    assert summary['sentiment_trend'] == 'bullish'
+    assert summary['sentiment_strength'] == pytest.approx(1.0 / 3)
+
+
+class FakeStoreConnection:
+    """sentiment_feature_dirty の取り出しと stock_news の期間検索だけを再現する接続"""
+
+    def __init__(self, dirty, news):
+        self.dirty = dirty
+        self.news = news
+        self.commits = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params):
+        if 'sentiment_feature_dirty' in sql:
+            self.rows, self.dirty = self.dirty[:params['batch']], self.dirty[params['batch']:]
+        else:
+            symbols, start, end = params
+            # ORDER BY symbol, published_at DESC
+            self.rows = sorted(
+                (n for n in self.news if n[0] in symbols and start <= n[1] <= end),
+                key=lambda n: (n[0], -n[1].timestamp()),
+            )
+
+    def fetchall(self):
+        return self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def close(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+@pytest.mark.unit
+def test_refresh_dirty_computes_the_whole_marked_range(monkeypatch):
+    # 2025-10-01 の記事は as_of_date 10-02 .. 10-08 の行に影響する（トリガーのマーク範囲）
+    written = []
+    monkeypatch.setattr(sentiment_feature_store, 'execute_values',
+                        lambda cur, sql, rows, **kw: written.append((sql, list(rows))))
+    conn = FakeStoreConnection(
+        dirty=[('AAPL', date(2025, 10, 1), date(2025, 10, 8))],
+        news=[('AAPL', datetime(2025, 10, 1, 10), 0.4, 'bullish'),
+              ('MSFT', datetime(2025, 10, 1, 11), -0.2, 'bearish')],
+    )
+
+    totals = refresh_dirty(conn)
+
+    assert totals == {'symbols': 1, 'rows': 7}
+    (delete_sql, deleted), (insert_sql, inserted) = written
+    assert 'DELETE' in delete_sql and deleted == [('AAPL', date(2025, 10, 1), date(2025, 10, 8))]
+    assert [r[1] for r in inserted] == [date(2025, 10, 2) + timedelta(days=d) for d in range(7)]
+    assert all(r[0] == 'AAPL' and r[2] == 0.4 for r in inserted)
+    assert conn.dirty == [] and conn.commits == 1
+
+
+class FakeFeatureDatabase:
+    """
+    stock_news（挿入でトリガーがダーティ範囲をマーク）・sentiment_feature_dirty・
+    sentiment_features_daily を持つ接続。schema=False はストア未適用の環境
+    """
+
+    def __init__(self, schema=True):
+        self.schema = schema
+        self.news = []
+        self.dirty = {}
+        self.features = {}
+
+    def insert_news(self, symbol, published_at, score, label):
+        self.news.append((symbol, published_at, score, label))
+        if self.schema:
+            from_date, to_date = self.dirty.get(symbol, (published_at.date(), published_at.date()))
+            self.dirty[symbol] = (min(from_date, published_at.date()),
+                                  max(to_date, published_at.date() + timedelta(days=7)))
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params):
+        if 'stock_news' in sql:
+            symbols, start, end = params
+            self.rows = sorted(
+                (n for n in self.news if n[0] in symbols and start <= n[1] <= end),
+                key=lambda n: (n[0], -n[1].timestamp()),
+            )
+        elif not self.schema:
+            raise psycopg2.errors.UndefinedTable('relation does not exist')
+        elif 'sentiment_feature_dirty' in sql:
+            claimed = [s for s in sorted(self.dirty) if s in params['symbols']]
+            self.rows = [(s, *self.dirty.pop(s)) for s in claimed]
+        else:
+            symbols, as_of_date = params
+            self.rows = [(s, *self.features[(s, d)]) for s, d in self.features
+                         if s in symbols and d == as_of_date]
+
+    def execute_values(self, cur, sql, rows, **kwargs):
+        if 'DELETE' in sql:
+            for symbol, from_date, to_date in rows:
+                self.features = {k: v for k, v in self.features.items()
+                                 if not (k[0] == symbol and from_date <= k[1] <= to_date)}
+        else:
+            for symbol, as_of_date, *values in rows:
+                self.features[(symbol, as_of_date)] = values
+
+    def fetchall(self):
+        return self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def close(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('schema', [True, False])
+def test_reads_see_news_written_without_running_the_refresh_job(monkeypatch, schema):
+    db = FakeFeatureDatabase(schema=schema)
+    monkeypatch.setattr(sentiment_feature_store, 'execute_values', db.execute_values)
+    today = date(2025, 10, 10)
+    as_of = latest_as_of(today)
+
+    db.insert_news('AAPL', datetime(2025, 10, 9, 15), 0.6, 'bullish')
+    first = get_features_many(db, ['AAPL', 'MSFT'], as_of)
+    # 別経路（アーカイブの収集スクリプトなど）が書いた当日のニュース
+    db.insert_news('AAPL', datetime(2025, 10, 10, 9), -0.4, 'bearish')
+    second = get_features_many(db, ['AAPL', 'MSFT'], as_of)
+
+    assert first['AAPL']['news_count'] == 1
+    assert second['AAPL']['news_count'] == 2
+    assert second['AAPL']['avg_sentiment'] == pytest.approx(0.1)
+    assert second['MSFT']['news_count'] == 0
+    # スキーマの有無にかかわらず、ストアの行と同じウィンドウの値
+    assert second == compute_features_many(db, ['AAPL', 'MSFT'], as_of)
+    assert db.dirty == {}
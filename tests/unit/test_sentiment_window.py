@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""sentiment_window のテスト（extract_sentiment_features とのパリティ）"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'ml-models'))
+
+from news_feature_extractor import NewsFeatureExtractor  # noqa: E402
+from sentiment_window import FEATURE_NAMES, RollingSentimentWindow  # noqa: E402
+
+
+class FakeNewsConnection:
+    """stock_news の期間検索（published_at DESC）だけを再現する接続"""
+
+    def __init__(self, news):
+        self.news = news
+
+    def cursor(self, cursor_factory=None):
+        return self
+
+    def execute(self, sql, params):
+        symbol, start, end = params
+        rows = [n for n in self.news if n['symbol'] == symbol and start <= n['published_at'] <= end]
+        self.rows = sorted(rows, key=lambda n: n['published_at'], reverse=True)
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+def _random_news(seed, days=40, per_day=4):
+    rng = np.random.default_rng(seed)
+    base = datetime(2025, 9, 1)
+    news = []
+    for minute in sorted(rng.choice(days * 24 * 60, size=days * per_day, replace=False)):
+        news.append({
+            'symbol': '7203.T',
+            'published_at': base + timedelta(minutes=int(minute)),
+            'sentiment_score': float(rng.uniform(-1, 1)),
+            'sentiment_label': str(rng.choice(['bullish', 'bearish', 'neutral', 'positive'])),
+        })
+    # ウィンドウ境界ちょうど（0時）の記事
+    news.append({'symbol': '7203.T', 'published_at': base + timedelta(days=10),
+                 'sentiment_score': 0.5, 'sentiment_label': 'bullish'})
+    return sorted(news, key=lambda n: n['published_at'])
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_rolling_window_matches_extract_sentiment_features(seed):
+    news = _random_news(seed)
+    extractor = NewsFeatureExtractor({})
+    extractor.get_db_connection = lambda: FakeNewsConnection(news)
+
+    window = RollingSentimentWindow(
+        [(n['published_at'], n['sentiment_score'], n['sentiment_label']) for n in reversed(news)]
+    )
+    targets = [datetime(2025, 8, 28) + timedelta(days=d) for d in range(50)]
+
+    for target in targets:
+        expected = extractor.extract_sentiment_features('7203.T', target, 7)
+        actual = window.features(target)
+        # 浮動小数点も含めて完全一致
+        assert actual == expected, target
+        assert list(actual) == list(FEATURE_NAMES)
+
+
+@pytest.mark.unit
+def test_rolling_window_rejects_unsorted_news():
+    with pytest.raises(ValueError):
+        RollingSentimentWindow([
+            (datetime(2025, 10, 1), 0.1, 'bullish'),
+            (datetime(2025, 10, 2), 0.2, 'bearish'),
+        ])
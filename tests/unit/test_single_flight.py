@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""single_flight のテスト"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+@pytest.mark.unit
+def test_concurrent_threads_share_one_execution():
+    flight = SingleFlight()
+    executions = []
+    start = threading.Event()
+
+    def load():
+        executions.append(1)
+        time.sleep(0.1)
+        return ["row"]
+
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(flight.do("gainers:200:0", load, label="rankings:gainers"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    start.set()
+    for t in threads:
+        t.join()
+
+    assert len(executions) == 1
+    assert results == [["row"]] * 8
+    metrics = flight.stats()["by_key"]["rankings:gainers"]
+    assert metrics == {"calls": 8, "executions": 1, "coalesced": 7}
+
+
+@pytest.mark.unit
+def test_error_is_delivered_to_waiters_and_key_is_released():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("db down")
+
+    with pytest.raises(ValueError):
+        flight.do("details:AAPL", fail)
+    assert flight.do("details:AAPL", lambda: "ok") == "ok"
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.unit
+def test_concurrent_coroutines_share_one_execution():
+    flight = SingleFlight()
+    executions = []
+
+    async def load():
+        executions.append(1)
+        await asyncio.sleep(0.05)
+        return {"symbol": "AAPL"}
+
+    async def main():
+        return await asyncio.gather(*[flight.do_async("details:AAPL", load) for _ in range(20)])
+
+    results = asyncio.run(main())
+
+    assert len(executions) == 1
+    assert all(r == {"symbol": "AAPL"} for r in results)
+    assert flight.stats()["by_key"]["details:AAPL"]["coalesced"] == 19
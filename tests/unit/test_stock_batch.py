@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""stock_batch のテスト"""
+import pytest
+
+from stock_batch import details_key, parse_symbols
+
+
+@pytest.mark.unit
+def test_parse_symbols_normalizes_and_dedupes():
+    assert parse_symbols(" aapl,7203.T,,AAPL , msft") == ["AAPL", "7203.T", "MSFT"]
+    assert details_key("aapl") == details_key("AAPL")
+
+
+@pytest.mark.unit
+def test_parse_symbols_rejects_empty_and_oversized():
+    with pytest.raises(ValueError):
+        parse_symbols(" , ")
+    with pytest.raises(ValueError):
+        parse_symbols("A,B,C", max_symbols=2)
@@ -9,20 +9,10 @@ import json
 import asyncio
 from datetime import datetime
 from auth_utils import get_current_user_from_token
-import psycopg2
 from psycopg2.extras import RealDictCursor
+from db_pool import get_db_connection
 import os
 
-# Database configuration
-DB_CONFIG = {
-    'host': os.getenv('POSTGRES_HOST', 'localhost'),
-    'port': int(os.getenv('POSTGRES_PORT', 5432)),
-    'dbname': os.getenv('POSTGRES_DB', 'miraikakaku'),
-    'user': os.getenv('POSTGRES_USER', 'postgres'),
-    'password': os.getenv('POSTGRES_PASSWORD', 'Miraikakaku2024!')
-}
-
-
 class ConnectionManager:
     """
     WebSocket Connection Manager
@@ -73,11 +63,6 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
-def get_db_connection():
-    """データベース接続を取得"""
-    return psycopg2.connect(**DB_CONFIG)
-
-
 async def check_price_alerts(user_id: str) -> List[dict]:
     """
     価格アラートをチェックして、トリガーされたアラートを返す